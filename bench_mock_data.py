@@ -0,0 +1,312 @@
+"""Benchmarks for the mock_data pipeline.
+
+Times each stage on its own at configurable scale, writes the results as JSON
+and compares throughput against a stored baseline:
+    
+    python3 bench_mock_data.py --num-trends 50 --date-range-days 365
+    python3 bench_mock_data.py --update-baseline      # record current numbers
+    python3 bench_mock_data.py --threshold 0.2        # fail if >20% slower
+    python3 bench_mock_data.py --startup-only         # just the trend_cli.py startup budget
+
+Every run also starts the light trend_cli.py subcommands in fresh interpreters
+and fails if any of them takes longer than --startup-budget-ms.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+import mock_data
+import research_parser
+from mock_data import (DatasetSerializer, TikTokTrendMockDataGenerator, json_default, lttb_indices, merge_parsed_data,
+                       minmax_indices, parse_input_file, parse_research_text, simulate_trend_curves,
+                       write_dataset_stream)
+from trend_cli import STARTUP_BUDGET_MS
+from trend_forecast import fit_phase_models
+
+DEFAULT_RESULTS = "bench_results.json"
+DEFAULT_BASELINE = "bench_baseline.json"
+_REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _time_best(func: Callable[[], Any], repeat: int) -> float:
+    """Best wall time of func over repeat runs"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _write_research_file(directory: str, size_kb: int) -> str:
+    """Write a research file of roughly size_kb, padding the real research context"""
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "perplexity_research.txt"),
+              'r', encoding='utf-8') as f:
+        research = f.read()
+    
+    # Pad the context section so the parser has to scan the extra text
+    padding_line = ("Creators pair the chorus with dance transitions, POV storytelling and "
+                    "aesthetic lifestyle clips while the challenge keeps trending.\n")
+    padding = padding_line * max(0, (size_kb * 1024 - len(research)) // len(padding_line))
+    research = research.replace("Mood:", padding + "\nMood:", 1)
+    
+    path = os.path.join(directory, f"research_{size_kb}kb.txt")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(research)
+    return path
+
+# The original per-field regex parser, kept as the reference the parse stages are compared with
+_REFERENCE_FIELD_RES = {
+    'artist': re.compile(r'Artist(?:\s+Name)?:\s*(.+?)(?:\n|$)', re.IGNORECASE),
+    'song_title': re.compile(r'Song(?:\s+(?:Title|Name))?:\s*(.+?)(?:\n|$)', re.IGNORECASE),
+    'age': re.compile(r'Age(?:\s+Demographics)?:(.*?)(?:Gender|$)', re.IGNORECASE | re.DOTALL),
+    'gender': re.compile(r'Gender(?:\s+Demographics)?:(.*?)(?:Region|Location|Additional|$)',
+                         re.IGNORECASE | re.DOTALL),
+    'genre': re.compile(r'Genre:\s*(.+?)(?:\n|$)', re.IGNORECASE),
+    'context': re.compile(r'Context:(.*?)(?:Demographics|$)', re.IGNORECASE | re.DOTALL),
+    'mood': re.compile(r'(?:Mood|Vibe|Style):(.*?)(?:\n\n|$)', re.IGNORECASE | re.DOTALL),
+}
+
+def _reference_parse(content: str) -> Dict[str, Any]:
+    fields = {name: pattern.search(content) for name, pattern in _REFERENCE_FIELD_RES.items()}
+    demographics = {}
+    if fields['age']:
+        demographics['age'] = {age_range: float(match.group(1)) / 100 for age_range in
+                               ('13-17', '18-24', '25-34', '35-44', '45+')
+                               for match in [re.search(re.escape(age_range) + r'[:\s]+(\d+)%?',
+                                                       fields['age'].group(1))] if match}
+    if fields['gender']:
+        demographics['gender'] = {gender: float(match.group(1)) / 100 for gender in ('female', 'male', 'other')
+                                  for match in [re.search(rf'^{gender}[:\s]+(\d+)%?', fields['gender'].group(1),
+                                                          re.IGNORECASE | re.MULTILINE)] if match}
+    context = fields['context'].group(1).strip() if fields['context'] else ""
+    mood_text = fields['mood'].group(1).lower() if fields['mood'] else ""
+    return {
+        'artist': fields['artist'].group(1).strip() if fields['artist'] else "Unknown Artist",
+        'song_title': fields['song_title'].group(1).strip() if fields['song_title'] else "Unknown Song",
+        'demographics': demographics,
+        'genre': fields['genre'].group(1).strip() if fields['genre'] else None,
+        'context': context,
+        'mood_keywords': [mood for mood in research_parser._POSSIBLE_MOODS if mood in mood_text],
+        'trend_types': [trend_type for trend_type, words in research_parser._TREND_TYPE_KEYWORDS.items()
+                        if any(word in context.lower() for word in words)]
+    }
+
+def _new_generator(parsed: Dict, params: Dict) -> TikTokTrendMockDataGenerator:
+    generator = TikTokTrendMockDataGenerator(parsed['song_title'], parsed['artist'],
+                                             mock_data.REAL_CREATIVE_EXAMPLE, parsed, seed=params["seed"])
+    generator.config["num_trends"] = params["num_trends"]
+    generator.set_analysis_window(params["date_range_days"], params["granularity"])
+    return generator
+
+def run_benchmarks(params: Dict[str, int], repeat: int = 5) -> Dict[str, Dict[str, Any]]:
+    """Time every pipeline stage; returns {stage: {seconds, items, unit, throughput}}"""
+    results = {}
+    
+    def record(stage: str, func: Callable[[], Any], items: float, unit: str):
+        seconds = _time_best(func, repeat)
+        results[stage] = {
+            "seconds": round(seconds, 6),
+            "items": items,
+            "unit": unit,
+            "throughput": round(items / seconds, 3) if seconds > 0 else None
+        }
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        research_path = _write_research_file(tmp, params["research_kb"])
+        research_mb = os.path.getsize(research_path) / (1024 * 1024)
+        parsed = parse_input_file(research_path)
+        other = parse_input_file(research_path)
+        
+        record("parse_input_file", lambda: parse_input_file(research_path), research_mb, "MB/s")
+        with open(research_path, 'r', encoding='utf-8') as f:
+            research = f.read()
+        if _reference_parse(research) != parse_research_text(research):
+            raise AssertionError("parse_research_text disagrees with the reference regex parser")
+        record("parse_research_text", lambda: parse_research_text(research), research_mb, "MB/s")
+        record("parse_reference_regex", lambda: _reference_parse(research), research_mb, "MB/s")
+        record("merge_parsed_data", lambda: [merge_parsed_data(parsed, other) for _ in range(1000)],
+               1000, "merges/s")
+        
+        generator = _new_generator(parsed, params)
+        num_trends, days = params["num_trends"], params["date_range_days"]
+        # One batch covering each virality profile and decline shape
+        levels = ([5, 3, 2] * num_trends)[:num_trends]
+        trend_types = (["dance", "storytelling", "challenge"] * num_trends)[:num_trends]
+        rng = np.random.default_rng(params["seed"])
+        record("time_series", lambda: simulate_trend_curves(levels, [days] * num_trends, trend_types, [0] * num_trends, rng),
+               num_trends * days, "points/s")
+        fit_curves = simulate_trend_curves(([5, 3, 2] * params["fit_trends"])[:params["fit_trends"]],
+                                           [days] * params["fit_trends"], ["dance"] * params["fit_trends"],
+                                           [0] * params["fit_trends"], rng)
+        record("phase_fit", lambda: fit_phase_models(fit_curves).forecast(7), params["fit_trends"], "trends/s")
+        # A year of hourly points per trend, thinned to the default display budget
+        hourly = rng.poisson(20, (num_trends, mock_data.MAX_WINDOW_DAYS * 24))
+        budget = mock_data.DEFAULT_DISPLAY_POINTS
+        record("downsample_minmax", lambda: [minmax_indices(series, budget) for series in hourly],
+               hourly.size, "points/s")
+        record("downsample_lttb", lambda: [lttb_indices(series, budget) for series in hourly],
+               hourly.size, "points/s")
+        record("_generate_trend", lambda: [generator._generate_trend(i) for i in range(num_trends)],
+               num_trends, "trends/s")
+        record("video_examples", lambda: generator._generate_video_examples(params["video_examples"]),
+               params["video_examples"], "videos/s")
+        record("video_corpus", lambda: generator.generate_video_corpus(params["video_corpus"]).top_k(3),
+               params["video_corpus"], "videos/s")
+        record("scenario_bands", lambda: generator.scenario_bands(params["scenarios"]),
+               params["scenarios"] * num_trends, "scenarios/s")
+        record("generate_complete_dataset", lambda: _new_generator(parsed, params).generate_complete_dataset(),
+               num_trends, "trends/s")
+        
+        dataset = _new_generator(parsed, params).generate_complete_dataset()
+        output_path = os.path.join(tmp, "output.json")
+        
+        def dump():
+            with open(output_path, 'w') as f:
+                json.dump(dataset, f, indent=2, default=json_default)
+        
+        dump()
+        output_mb = os.path.getsize(output_path) / (1024 * 1024)
+        record("json_write", dump, output_mb, "MB/s")
+        
+        def stream():
+            with open(output_path, 'w') as f:
+                write_dataset_stream(_new_generator(parsed, params), f)
+        
+        record("stream_write", stream, num_trends, "trends/s")
+        
+        compact = DatasetSerializer(indent=None, float_digits=4, gzip_level=6)
+        record("compact_gzip_write", lambda: compact.write(output_path, dataset), output_mb, "MB/s")
+    return results
+
+def measure_cli_startup(repeat: int = 5) -> Dict[str, Dict[str, Any]]:
+    """Cold-start time of the trend_cli.py subcommands that should never load NumPy, each in a fresh interpreter"""
+    cli = os.path.join(_REPO_DIR, "trend_cli.py")
+    commands = {
+        "startup_help": ["--help"],
+        "startup_parse": ["parse", os.path.join(_REPO_DIR, "perplexity_research.txt"), "--compact"],
+        "startup_regions": ["regions", "show", os.path.join(_REPO_DIR, "trend_analysis_output.json"), "--top", "1"],
+    }
+    results = {}
+    for stage, args in commands.items():
+        seconds = _time_best(lambda: subprocess.run([sys.executable, cli, *args], check=True,
+                                                    stdout=subprocess.DEVNULL), repeat)
+        results[stage] = {
+            "seconds": round(seconds, 6),
+            "items": 1,
+            "unit": "runs/s",
+            "throughput": round(1 / seconds, 3)
+        }
+    return results
+
+def compare_to_baseline(results: Dict, baseline: Dict, threshold: float) -> list:
+    """Stages whose throughput fell more than threshold below the baseline"""
+    regressions = []
+    for stage, current in results["stages"].items():
+        previous = baseline["stages"].get(stage)
+        if not previous or not previous.get("throughput") or current["throughput"] is None:
+            continue
+        ratio = current["throughput"] / previous["throughput"]
+        if ratio < 1 - threshold:
+            regressions.append((stage, previous["throughput"], current["throughput"], ratio))
+    return regressions
+
+def _check_baseline(results: Dict, args: argparse.Namespace) -> bool:
+    """Record or compare against the baseline; True if throughput regressed"""
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return False
+    
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one")
+        return False
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    if baseline.get("params") != results["params"]:
+        print(f"Baseline was recorded with different parameters {baseline.get('params')}; skipping comparison")
+        return False
+    
+    regressions = compare_to_baseline(results, baseline, args.threshold)
+    if regressions:
+        print(f"\nThroughput regressions beyond {args.threshold:.0%}:")
+        for stage, before, after, ratio in regressions:
+            print(f"  {stage}: {before:,.1f} -> {after:,.1f} ({ratio - 1:+.1%})")
+        return True
+    print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return False
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the mock_data pipeline stage by stage")
+    parser.add_argument("--num-trends", type=int, default=30)
+    parser.add_argument("--date-range-days", type=int, default=30)
+    parser.add_argument("--granularity", choices=mock_data.GRANULARITIES, default="day")
+    parser.add_argument("--video-examples", type=int, default=1000)
+    parser.add_argument("--video-corpus", type=int, default=100000, help="videos drawn by the bulk corpus stage")
+    parser.add_argument("--fit-trends", type=int, default=10000, help="curves fitted at once by the phase_fit stage")
+    parser.add_argument("--scenarios", type=int, default=1000, help="scenarios per trend in the percentile band stage")
+    parser.add_argument("--research-kb", type=int, default=64, help="size of the synthetic research file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per stage; the best time is kept")
+    parser.add_argument("--output", default=DEFAULT_RESULTS, help="machine-readable results file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="stored baseline to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="fail when a stage's throughput drops by more than this fraction")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--startup-budget-ms", type=float, default=STARTUP_BUDGET_MS,
+                        help="fail when a light trend_cli.py subcommand takes longer than this to run")
+    parser.add_argument("--startup-only", action="store_true", help="skip the pipeline stages")
+    args = parser.parse_args(argv)
+    
+    params = {
+        "num_trends": args.num_trends,
+        "date_range_days": args.date_range_days,
+        "granularity": args.granularity,
+        "video_examples": args.video_examples,
+        "video_corpus": args.video_corpus,
+        "scenarios": args.scenarios,
+        "fit_trends": args.fit_trends,
+        "research_kb": args.research_kb,
+        "seed": args.seed,
+        "startup_only": args.startup_only
+    }
+    stages = {} if args.startup_only else run_benchmarks(params, args.repeat)
+    stages.update(measure_cli_startup(args.repeat))
+    results = {
+        "params": params,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "timestamp": datetime.now().isoformat(),
+        "stages": stages
+    }
+    
+    for stage, result in results["stages"].items():
+        print(f"{stage:<28} {result['seconds'] * 1000:>10.2f} ms  {result['throughput']:>14,.1f} {result['unit']}")
+    
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    
+    # Baseline first, so a machine over the startup budget can still record one
+    failed = _check_baseline(results, args)
+    
+    slow = [(stage, result["seconds"] * 1000) for stage, result in stages.items()
+            if stage.startswith("startup_") and result["seconds"] * 1000 > args.startup_budget_ms]
+    if slow:
+        print(f"\nStartup over the {args.startup_budget_ms:.0f} ms budget:")
+        for stage, ms in slow:
+            print(f"  {stage}: {ms:.1f} ms")
+    if failed or slow:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,226 @@
+"""Regional distribution checks for generated trend datasets.
+
+With no arguments, prints the top 3 regions of every trend in
+trend_analysis_output.json. For whole catalogs, an inverted index maps
+country code -> (song, trend, percentage, video_count, engagement) so
+queries don't re-parse every output file:
+    
+    python3 check_regions.py index batch_output
+    python3 check_regions.py top BR --dir batch_output
+    python3 check_regions.py where MX --min 0.30 --dir batch_output
+
+The index is a SQLite file inside the output directory. Every query first
+refreshes it, re-reading only files whose mtime or size changed.
+"""
+import argparse
 import json
+import os
+import sqlite3
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_FILE = "trend_analysis_output.json"
+INDEX_FILENAME = ".region_index.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    song TEXT,
+    artist TEXT
+);
+CREATE TABLE IF NOT EXISTS regions (
+    path TEXT NOT NULL,
+    song TEXT,
+    trend_index INTEGER NOT NULL,
+    trend_name TEXT,
+    code TEXT NOT NULL,
+    country TEXT,
+    percentage REAL,
+    video_count INTEGER,
+    engagement REAL
+);
+CREATE INDEX IF NOT EXISTS regions_by_code ON regions (code, percentage DESC);
+CREATE INDEX IF NOT EXISTS regions_by_path ON regions (path);
+"""
+
+def show_file(filename: str = DEFAULT_FILE, top: int = 3):
+    """Print the top regions of every trend in one dataset"""
+    with open(filename, 'r') as f:
+        data = json.load(f)
+    
+    print('Regional distribution for trends:')
+    for i, trend in enumerate(data['trends']):
+        print(f'\nTrend {i+1}: {trend["name"]}')
+        for region in trend['regional_distribution'][:top]:
+            print(f'  {region["country"]}: {region["percentage"]*100:.1f}%')
 
-with open('trend_analysis_output.json', 'r') as f:
-    data = json.load(f)
+def _read_dataset(path: str) -> Tuple[Optional[Dict], List[Dict]]:
+    """(song_metadata, trends) of a JSON or NDJSON dataset; (None, []) if the file isn't one"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if path.endswith('.ndjson'):
+                song, trends = None, []
+                for line in f:
+                    record = json.loads(line)
+                    if record.get("record") == "song":
+                        song = record.get("song_metadata")
+                    elif record.get("record") == "trend":
+                        trends.append(record["trend"])
+                return song, trends
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: skipping {path}: {e}")
+        return None, []
+    if not isinstance(data, dict) or not isinstance(data.get("trends"), list):
+        return None, []
+    # Shard manifests only carry headlines; regions are in each trend's shard
+    trends = []
+    for trend in data["trends"]:
+        if isinstance(trend, dict) and "shard" in trend:
+            trend = _read_shard(os.path.join(os.path.dirname(path), trend["shard"])) or trend
+        trends.append(trend)
+    return data.get("song_metadata"), trends
+
+def _read_shard(path: str) -> Optional[Dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: unreadable shard {path}: {e}")
+        return None
+
+def _dataset_files(directory: str) -> Iterator[str]:
+    for dirpath, _, filenames in os.walk(directory):
+        for name in filenames:
+            if name.endswith(('.json', '.ndjson')):
+                yield os.path.join(dirpath, name)
+
+class RegionIndex:
+    """Persistent country-code index over a directory of generated datasets"""
+    
+    def __init__(self, directory: str, index_path: Optional[str] = None):
+        self.directory = directory
+        self.index_path = index_path or os.path.join(directory, INDEX_FILENAME)
+        self.db = sqlite3.connect(self.index_path)
+        self.db.executescript(_SCHEMA)
+    
+    def close(self):
+        self.db.close()
+    
+    def __enter__(self):
+        return self
     
-print('Regional distribution for trends:')
-for i, trend in enumerate(data['trends']):
-    print(f'\nTrend {i+1}: {trend["name"]}')
-    for region in trend['regional_distribution'][:3]:
-        print(f'  {region["country"]}: {region["percentage"]*100:.1f}%')
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def refresh(self) -> Tuple[int, int]:
+        """Re-index files whose mtime or size changed and drop deleted ones; returns (updated, removed)"""
+        known = {path: (mtime_ns, size) for path, mtime_ns, size in
+                 self.db.execute("SELECT path, mtime_ns, size FROM files")}
+        updated = 0
+        with self.db:
+            seen = set()
+            for path in _dataset_files(self.directory):
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                seen.add(path)
+                if known.get(path) == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                self._index_file(path, stat)
+                updated += 1
+            
+            removed = [path for path in known if path not in seen]
+            for path in removed:
+                self.db.execute("DELETE FROM regions WHERE path = ?", (path,))
+                self.db.execute("DELETE FROM files WHERE path = ?", (path,))
+        return updated, len(removed)
+    
+    def _index_file(self, path: str, stat: os.stat_result):
+        song, trends = _read_dataset(path)
+        song = song or {}
+        self.db.execute("DELETE FROM regions WHERE path = ?", (path,))
+        # Non-dataset JSON files are recorded too, so they aren't re-read on every refresh
+        self.db.execute("INSERT OR REPLACE INTO files (path, mtime_ns, size, song, artist) VALUES (?, ?, ?, ?, ?)",
+                        (path, stat.st_mtime_ns, stat.st_size, song.get("title"), song.get("artist")))
+        self.db.executemany(
+            "INSERT INTO regions (path, song, trend_index, trend_name, code, country, percentage, video_count, engagement)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(path, song.get("title"), i, trend.get("name"), region.get("code"), region.get("country"),
+              region.get("percentage"), region.get("video_count"), region.get("avg_engagement_rate"))
+             for i, trend in enumerate(trends)
+             for region in trend.get("regional_distribution", [])
+             if region.get("code")])
+    
+    def query(self, code: str, min_percentage: Optional[float] = None, order_by: str = "percentage",
+              limit: Optional[int] = None) -> List[sqlite3.Row]:
+        """Trends in a country, best first; with min_percentage, only those whose share is above it"""
+        if order_by not in ("percentage", "video_count", "engagement"):
+            raise ValueError(f"cannot order by {order_by!r}")
+        self.db.row_factory = sqlite3.Row
+        sql = ("SELECT song, trend_name, trend_index, path, percentage, video_count, engagement FROM regions"
+               " WHERE code = ?")
+        params = [code.upper()]
+        if min_percentage is not None:
+            sql += " AND percentage > ?"
+            params.append(min_percentage)
+        sql += f" ORDER BY {order_by} DESC, song, trend_index"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self.db.execute(sql, params).fetchall()
+
+def _print_rows(rows: List[sqlite3.Row], code: str):
+    if not rows:
+        print(f"No trends found for {code.upper()}")
+        return
+    for row in rows:
+        print(f"  {row['percentage']*100:5.1f}%  {row['video_count']:>5} videos  "
+              f"{row['engagement']:.3f} eng  {row['song']} - {row['trend_name']}")
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Regional distribution checks for generated datasets")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    show = subparsers.add_parser("show", help="top regions per trend of one dataset")
+    show.add_argument("file", nargs="?", default=DEFAULT_FILE)
+    show.add_argument("--top", type=int, default=3)
+    
+    index = subparsers.add_parser("index", help="build or refresh the region index for a directory")
+    index.add_argument("dir")
+    index.add_argument("--index", help=f"index file (default: DIR/{INDEX_FILENAME})")
+    
+    top = subparsers.add_parser("top", help="top songs/trends in a country")
+    top.add_argument("code", help="country code, e.g. BR")
+    top.add_argument("--dir", default=".")
+    top.add_argument("--index")
+    top.add_argument("--limit", type=int, default=10)
+    top.add_argument("--by", choices=["percentage", "video_count", "engagement"], default="percentage")
+    
+    where = subparsers.add_parser("where", help="all trends whose share in a country is above --min")
+    where.add_argument("code", help="country code, e.g. MX")
+    where.add_argument("--min", type=float, required=True, help="share to exceed, e.g. 0.30 for more than 30%%")
+    where.add_argument("--dir", default=".")
+    where.add_argument("--index")
+    
+    args = parser.parse_args(argv)
+    if args.command in (None, "show"):
+        show_file(getattr(args, "file", DEFAULT_FILE), getattr(args, "top", 3))
+        return
+    
+    with RegionIndex(args.dir, args.index) as region_index:
+        updated, removed = region_index.refresh()
+        if args.command == "index":
+            total = region_index.db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            print(f"Indexed {total} files ({updated} updated, {removed} removed) in {region_index.index_path}")
+        elif args.command == "top":
+            print(f"Top trends in {args.code.upper()} by {args.by}:")
+            _print_rows(region_index.query(args.code, order_by=args.by, limit=args.limit), args.code)
+        else:
+            print(f"Trends with {args.code.upper()} > {args.min*100:.0f}%:")
+            _print_rows(region_index.query(args.code, min_percentage=args.min), args.code)
+
+if __name__ == "__main__":
+    main()
@@ -1,203 +1,969 @@
+import functools
+import gzip
+import hashlib
+import heapq
+import io
 import json
-import random
+import os
 import re
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import contextlib
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterator, Sequence
 import numpy as np
 
-def parse_input_file(filename: str) -> Dict[str, Any]:
-    """Parse input file to extract artist, song, and context information"""
-    try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Extract artist name
-        artist_match = re.search(r'Artist(?:\s+Name)?:\s*(.+?)(?:\n|$)', content, re.IGNORECASE)
-        artist = artist_match.group(1).strip() if artist_match else "Unknown Artist"
-        
-        # Extract song title
-        song_match = re.search(r'Song(?:\s+(?:Title|Name))?:\s*(.+?)(?:\n|$)', content, re.IGNORECASE)
-        song_title = song_match.group(1).strip() if song_match else "Unknown Song"
-        
-        # Extract demographics if present
-        demographics = {}
-        
-        # Age demographics
-        age_section = re.search(r'Age(?:\s+Demographics)?:(.*?)(?:Gender|$)', content, re.IGNORECASE | re.DOTALL)
-        if age_section:
-            age_text = age_section.group(1)
-            demographics['age'] = {}
-            # Look for age ranges and percentages
-            age_patterns = [
-                (r'13-17[:\s]+(\d+)%?', '13-17'),
-                (r'18-24[:\s]+(\d+)%?', '18-24'),
-                (r'25-34[:\s]+(\d+)%?', '25-34'),
-                (r'35-44[:\s]+(\d+)%?', '35-44'),
-                (r'45\+[:\s]+(\d+)%?', '45+')
-            ]
-            for pattern, age_range in age_patterns:
-                match = re.search(pattern, age_text)
-                if match:
-                    demographics['age'][age_range] = float(match.group(1)) / 100
+import research_parser
+from research_parser import (_is_url, ingest_research, ingest_research_async, merge_parsed_data,
+                             merge_research_sources, parse_directory, parse_input_file, parse_research_text)
+import spotify_streams
+from spotify_streams import DEFAULT_STREAMS_CSV, StreamSeries, StreamsReader, streams_by_date
+
+# Phase split (discovery, growth, peak, decline) of the active window, the
+# discovery-phase base range (videos/day) and the peak multiplier range
+PHASE_PROFILES = {
+    "viral": ((0.10, 0.20, 0.25, 0.45), (5, 15), (8, 12)),      # faster growth, shorter peak
+    "moderate": ((0.15, 0.25, 0.20, 0.40), (3, 10), (5, 8)),
+    "slow_burn": ((0.25, 0.30, 0.30, 0.15), (2, 5), (3, 5)),    # longer discovery, sustained plateau
+}
+
+def _virality_profile(virality_level: int) -> str:
+    """Map a virality level to its phase profile name"""
+    if virality_level >= 4:
+        return "viral"
+    if virality_level == 3:
+        return "moderate"
+    return "slow_burn"
+
+def _curve_draws(rng: np.random.Generator, base_range: np.ndarray, multiplier_range: np.ndarray,
+                 low: np.ndarray, high: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Discovery base, peak multiplier, weekday multipliers and daily noise, in the order one stream draws them"""
+    discovery_base = np.floor(rng.uniform(base_range[..., 0], base_range[..., 1] + 1))
+    multiplier = rng.uniform(multiplier_range[..., 0], multiplier_range[..., 1])
+    return discovery_base, multiplier, rng.uniform(low, high), rng.uniform(0.95, 1.05, size=np.shape(low))
+
+def simulate_trend_curves(virality_levels, days, trend_types, start_weekdays, rng=None) -> np.ndarray:
+    """Simulate daily video counts for a batch of trends in a few array operations.
+
+    Row i covers days[i] days starting on weekday start_weekdays[i] (Monday=0).
+    Returns an int64 matrix of shape (len(days), max(days)); cells past the end
+    of a row are 0. rng may also be a list of one Generator per row; each row
+    then draws from its own, and comes out as if simulated alone.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    days = np.asarray(days, dtype=np.int64)
+    n = len(days)
+    width = int(days.max()) if n else 0
+    
+    profiles = [PHASE_PROFILES[_virality_profile(int(v))] for v in virality_levels]
+    fractions = np.array([p[0] for p in profiles], dtype=float).reshape(n, 4)
+    base_range = np.array([p[1] for p in profiles], dtype=float).reshape(n, 2)
+    multiplier_range = np.array([p[2] for p in profiles], dtype=float).reshape(n, 2)
+    
+    # Phase lengths and boundaries as column vectors so they broadcast over days
+    phases = (days[:, None] * fractions).astype(np.int64)
+    discovery_phase, growth_phase, peak_phase, decline_phase = (phases[:, k:k + 1] for k in range(4))
+    growth_end = discovery_phase + growth_phase
+    peak_end = growth_end + peak_phase
+    
+    i = np.arange(width)[None, :]
+    
+    # Weekly patterns - Fridays +5-10%, weekends +10-20%, weekdays ±5%
+    day_of_week = (np.asarray(start_weekdays, dtype=np.int64).reshape(n, 1) + i) % 7
+    low = np.where(day_of_week == 4, 1.05, np.where(day_of_week >= 5, 1.10, 0.95))
+    high = np.where(day_of_week == 4, 1.10, np.where(day_of_week >= 5, 1.20, 1.05))
+    if isinstance(rng, np.random.Generator):
+        discovery_base, multiplier, day_multiplier, daily_noise = _curve_draws(rng, base_range, multiplier_range,
+                                                                               low, high)
+    else:
+        discovery_base, multiplier = np.empty(n), np.empty(n)
+        day_multiplier, daily_noise = np.ones((n, width)), np.ones((n, width))
+        for k, (row_rng, d) in enumerate(zip(rng, days)):
+            discovery_base[k], multiplier[k], day_multiplier[k, :d], daily_noise[k, :d] = _curve_draws(
+                row_rng, base_range[k], multiplier_range[k], low[k, :d], high[k, :d])
+    discovery_base = discovery_base[:, None]
+    peak_value = discovery_base * multiplier[:, None]
+    
+    # Discovery phase - slow initial growth
+    discovery = discovery_base * (0.5 + 0.5 * (i / np.maximum(discovery_phase, 1)))
+    # Growth phase - exponential growth
+    growth_progress = (i - discovery_phase) / np.maximum(growth_phase, 1)
+    growth = discovery_base + (peak_value - discovery_base) * growth_progress ** 2
+    # Peak phase - high but with a slight decline
+    peak = peak_value * (1 - 0.2 * (i - growth_end) / np.maximum(peak_phase, 1))
+    # Decline phase - dance trends decline more gradually, challenges drop off more quickly
+    decline_progress = np.clip((i - peak_end) / np.maximum(decline_phase, 1), 0, None)
+    is_dance = np.array(["dance" in t for t in trend_types], dtype=bool).reshape(n, 1)
+    is_challenge = np.array(["challenge" in t for t in trend_types], dtype=bool).reshape(n, 1)
+    decline_factor = np.where(is_dance, 1 - 0.7 * decline_progress,
+                              np.where(is_challenge, 1 - 0.85 * decline_progress ** 0.5,
+                                       1 - 0.8 * decline_progress))
+    decline = peak_value * 0.8 * decline_factor
+    
+    base_value = np.select([i < discovery_phase, i < growth_end, i < peak_end],
+                           [discovery, growth, peak], decline)
+    
+    # Weekday multipliers with minimal daily variance for smoother curves
+    values = np.maximum(1, (base_value * day_multiplier * daily_noise).astype(np.int64))
+    values[i >= days[:, None]] = 0
+    return values
+
+# Output field prefix for each named rollup window; integer windows use "window"
+_ROLLUP_PREFIXES = {"day": "day", "week": "week", "month": "month"}
+
+def rollup_series(values, start_date, windows=("day", "week", "month")) -> Dict[Any, List[Dict]]:
+    """Aggregate a contiguous daily series into several window sizes at once.
+
+    windows holds "day", "week" (7 days from the first date, like weekly_summary),
+    "month" (calendar months) or an int window length in days. Each window gets a
+    list of records shaped like weekly_summary entries, with "{prefix}_start" and
+    "{prefix}_end" dates. A single cumulative sum serves every window's totals.
+    """
+    values = np.asarray(values, dtype=np.int64)
+    n = len(values)
+    if isinstance(start_date, datetime):
+        start_date = start_date.date()
+    day0 = np.datetime64(start_date, 'D')
+    cumulative = np.concatenate(([0], np.cumsum(values)))
+    
+    rollups = {}
+    for window in windows:
+        if n == 0:
+            rollups[window] = []
+            continue
+        if window == "month":
+            months = (day0 + np.arange(n)).astype('datetime64[M]')
+            starts = np.flatnonzero(np.concatenate(([True], months[1:] != months[:-1])))
+        else:
+            starts = np.arange(0, n, {"day": 1, "week": 7}.get(window, window))
+        ends = np.append(starts[1:], n)
         
-        # Gender demographics
-        gender_section = re.search(r'Gender(?:\s+Demographics)?:(.*?)(?:Region|Location|Additional|$)', content, re.IGNORECASE | re.DOTALL)
-        if gender_section:
-            gender_text = gender_section.group(1)
-            demographics['gender'] = {}
-            gender_patterns = [
-                (r'^Female[:\s]+(\d+)%?', 'female'),
-                (r'^Male[:\s]+(\d+)%?', 'male'),
-                (r'^Other[:\s]+(\d+)%?', 'other')
-            ]
-            for pattern, gender in gender_patterns:
-                # Search in multiline mode to match at line start
-                match = re.search(pattern, gender_text, re.IGNORECASE | re.MULTILINE)
-                if match:
-                    demographics['gender'][gender] = float(match.group(1)) / 100
+        totals = cumulative[ends] - cumulative[starts]
+        peaks = np.maximum.reduceat(values, starts)
+        averages = totals / (ends - starts)
         
-        # Extract genre if present
-        genre_match = re.search(r'Genre:\s*(.+?)(?:\n|$)', content, re.IGNORECASE)
-        genre = genre_match.group(1).strip() if genre_match else None
+        # Period-over-period growth; 100% when growing from zero
+        previous = totals[:-1]
+        growth = np.zeros(len(totals))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            growth[1:] = np.where(previous == 0, np.where(totals[1:] > 0, 100.0, 0.0),
+                                  (totals[1:] - previous) / previous * 100)
         
-        # Extract any additional context
-        context_section = re.search(r'Context:(.*?)(?:Demographics|$)', content, re.IGNORECASE | re.DOTALL)
-        context = context_section.group(1).strip() if context_section else ""
+        prefix = _ROLLUP_PREFIXES.get(window, "window")
+        rollups[window] = [
+            {
+                f"{prefix}_start": period_start,
+                f"{prefix}_end": period_end,
+                "total_videos": total,
+                "avg_daily_videos": round(average, 1),
+                "peak_day_videos": peak,
+                "growth_rate": round(rate, 1)
+            }
+            for period_start, period_end, total, average, peak, rate in zip(
+                (day0 + starts).astype(str).tolist(), (day0 + ends - 1).astype(str).tolist(),
+                totals.tolist(), averages.tolist(), peaks.tolist(), growth.tolist())
+        ]
+    return rollups
+
+class TimeSeries:
+    """Counts as parallel arrays: int64 days (or hours, with unit "h") since 1970-01-01 and int32 values.
+
+    Trends carry these internally; the count_by_date records ({"date", "value"}
+    dicts) are only built by to_records() when the dataset is serialized.
+    Hourly series write their dates as "YYYY-MM-DDTHH:00".
+    """
+    
+    __slots__ = ("days", "values", "unit")
+    
+    def __init__(self, days: np.ndarray, values: np.ndarray, unit: str = "D"):
+        self.days = days
+        self.values = values
+        self.unit = unit
+    
+    @classmethod
+    def from_start(cls, start_date, values, unit: str = "D") -> "TimeSeries":
+        """A contiguous series whose first value falls on start_date (its midnight, for hourly series)"""
+        if isinstance(start_date, datetime):
+            start_date = start_date.date()
+        step0 = np.datetime64(start_date, 'D').astype(f'datetime64[{unit}]').astype(np.int64)
+        return cls(step0 + np.arange(len(values), dtype=np.int64), np.asarray(values, dtype=np.int32), unit)
+    
+    @classmethod
+    def from_records(cls, records: List[Dict]) -> "TimeSeries":
+        """Parse count_by_date (or count_by_hour) records, e.g. from a dataset read back from disk"""
+        unit = "h" if records and "T" in records[0]["date"] else "D"
+        days = np.array([r["date"] for r in records], dtype=f'datetime64[{unit}]').astype(np.int64)
+        return cls(days, np.fromiter((r["value"] for r in records), dtype=np.int32, count=len(records)), unit)
+    
+    @classmethod
+    def coerce(cls, series) -> "TimeSeries":
+        return series if isinstance(series, cls) else cls.from_records(series)
+    
+    def __len__(self) -> int:
+        return len(self.days)
+    
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, TimeSeries):
+            return NotImplemented
+        return (self.unit == other.unit and np.array_equal(self.days, other.days)
+                and np.array_equal(self.values, other.values))
+    
+    def daily(self) -> "TimeSeries":
+        """The series summed per calendar day"""
+        if self.unit == "D" or not len(self.days):
+            return self
+        day = self.days // 24
+        totals = np.bincount(day - day[0], weights=self.values).astype(np.int32)
+        return TimeSeries(day[0] + np.arange(len(totals), dtype=np.int64), totals)
+    
+    def date_strings(self) -> List[str]:
+        if self.unit == "h":
+            return (self.days * 60).astype('datetime64[m]').astype(str).tolist()
+        return self.days.astype('datetime64[D]').astype(str).tolist()
+    
+    def to_records(self) -> List[Dict]:
+        return [{"date": d, "value": v} for d, v in zip(self.date_strings(), self.values.tolist())]
+    
+    def take(self, indices: np.ndarray) -> "TimeSeries":
+        return TimeSeries(self.days[indices], self.values[indices], self.unit)
+
+DOWNSAMPLE_METHODS = ("minmax", "lttb")
+DEFAULT_DISPLAY_POINTS = 500
+
+def _bucket_matrix(values: np.ndarray, edges: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(indices, values) of each bucket [edges[i], edges[i+1]) as rows, NaN-padded to the widest bucket"""
+    width = int(np.max(np.diff(edges)))
+    indices = edges[:-1, None] + np.arange(width)
+    inside = indices < edges[1:, None]
+    indices = np.where(inside, indices, edges[:-1, None])
+    return indices, np.where(inside, values[indices], np.nan)
+
+def minmax_indices(values, budget: int) -> np.ndarray:
+    """Sorted indices of at most `budget` points: the ends plus every bucket's minimum and maximum.
+
+    Every local peak and trough survives in its bucket, so spikes stay visible
+    however long the series is.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n <= budget:
+        return np.arange(n)
+    buckets = max(1, (budget - 2) // 2)
+    edges = np.linspace(1, n - 1, buckets + 1).astype(np.int64)
+    indices, padded = _bucket_matrix(values, edges)
+    rows = np.arange(len(indices))
+    lows = indices[rows, np.nanargmin(padded, axis=1)]
+    highs = indices[rows, np.nanargmax(padded, axis=1)]
+    return np.unique(np.concatenate(([0], lows, highs, [n - 1])))
+
+def lttb_indices(values, budget: int) -> np.ndarray:
+    """Sorted indices of `budget` points picked by Largest-Triangle-Three-Buckets.
+
+    Each bucket keeps the point forming the largest triangle with the previous
+    pick and the next bucket's mean. Picks depend on the previous one, so this
+    loops once per output point; the per-bucket work is vectorized.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n <= budget or budget < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, budget - 1).astype(np.int64)
+    indices, padded = _bucket_matrix(values, edges)
+    counts = np.diff(edges)
+    # Mean point of each bucket; the last bucket's successor is the final point
+    mean_x = np.append(edges[:-1] + (counts - 1) / 2, n - 1)
+    mean_y = np.append(np.add.reduceat(values[:n - 1], edges[:-1]) / counts, values[-1])
+    
+    picked = np.empty(len(indices) + 2, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    for b in range(len(indices)):
+        ax, ay = picked[b], values[picked[b]]
+        areas = np.abs((ax - mean_x[b + 1]) * (padded[b] - ay) - (ax - indices[b]) * (mean_y[b + 1] - ay))
+        picked[b + 1] = indices[b, np.nanargmax(areas)]
+    return picked
+
+def downsample_series(series: TimeSeries, budget: int, method: str = "minmax") -> Optional[TimeSeries]:
+    """A display copy of series thinned to about `budget` points, or None if it already fits"""
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"downsample method must be one of {', '.join(DOWNSAMPLE_METHODS)}, got {method!r}")
+    if not budget or len(series) <= budget:
+        return None
+    pick = minmax_indices if method == "minmax" else lttb_indices
+    return series.take(pick(series.values, budget))
+
+class VideoExample:
+    """One example video; to_dict() gives the top_examples JSON shape"""
+    
+    __slots__ = ("id", "author_uid", "music_id", "desc", "share_url", "create_time", "region", "thumbnail",
+                 "play_count", "share_count", "comment_count", "like_count")
+    
+    def __init__(self, id: str, author_uid: str, music_id: str, desc: str, share_url: str, create_time: int,
+                 region: str, thumbnail: str, play_count: int, share_count: int, comment_count: int, like_count: int):
+        self.id = id
+        self.author_uid = author_uid
+        self.music_id = music_id
+        self.desc = desc
+        self.share_url = share_url
+        self.create_time = create_time
+        self.region = region
+        self.thumbnail = thumbnail
+        self.play_count = play_count
+        self.share_count = share_count
+        self.comment_count = comment_count
+        self.like_count = like_count
+    
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "author_uid": self.author_uid,
+            "music_id": self.music_id,
+            "desc": self.desc,
+            "share_url": self.share_url,
+            "create_time": self.create_time,
+            "region": self.region,
+            "thumbnail": self.thumbnail,
+            "statistics": {
+                "play_count": self.play_count,
+                "share_count": self.share_count,
+                "comment_count": self.comment_count,
+                "like_count": self.like_count
+            }
+        }
+
+class VideoCorpus:
+    """Example videos held as columns, for corpora of 10^5-10^6 videos.
+
+    IDs are int64 columns, desc and region are indices into small lookup lists,
+    and rows only become VideoExample records or JSON when asked for.
+    """
+    
+    _INT_COLUMNS = ("id", "author_uid", "video_id", "thumbnail_id", "create_time",
+                    "play_count", "share_count", "comment_count", "like_count")
+    
+    def __init__(self, columns: Dict[str, np.ndarray], music_id: str, descriptions: List[str], regions: List[str]):
+        self.columns = columns
+        self.music_id = music_id
+        self.descriptions = descriptions
+        self.regions = regions
+    
+    def __len__(self) -> int:
+        return len(self.columns["id"])
+    
+    def example(self, i: int) -> VideoExample:
+        c = self.columns
+        return VideoExample(
+            id=str(c["id"][i]),
+            author_uid=str(c["author_uid"][i]),
+            music_id=self.music_id,
+            desc=self.descriptions[c["desc"][i]],
+            share_url=f"https://www.tiktok.com/@creator{i}/video/{c['video_id'][i]}",
+            create_time=int(c["create_time"][i]),
+            region=self.regions[c["region"][i]],
+            thumbnail=f"https://tiktokthumbnails.s3.us-east-2.amazonaws.com/thumb_{c['thumbnail_id'][i]}.png",
+            play_count=int(c["play_count"][i]),
+            share_count=int(c["share_count"][i]),
+            comment_count=int(c["comment_count"][i]),
+            like_count=int(c["like_count"][i])
+        )
+    
+    def top_indices(self, k: int, by: str = "play_count") -> np.ndarray:
+        """Rows of the k largest values of column `by`, largest first; O(n + k log k)"""
+        values = self.columns[by]
+        k = min(k, len(values))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        top = np.argpartition(values, len(values) - k)[len(values) - k:]
+        # Stable descending order of the k survivors, ties broken by row like a full stable sort
+        return top[np.lexsort((top, -values[top]))]
+    
+    def top_k(self, k: int, by: str = "play_count") -> List[VideoExample]:
+        return [self.example(int(i)) for i in self.top_indices(k, by)]
+    
+    def write_jsonl(self, f, chunk_size: int = 65536):
+        """Write one compact JSON object per video, in the top_examples shape"""
+        c = self.columns
+        # Per-row work is string formatting only; the few distinct strings are JSON-encoded once
+        descriptions = [json.dumps(d) for d in self.descriptions]
+        regions = [json.dumps(r) for r in self.regions]
+        line = ('{{"id":"{}","author_uid":"{}","music_id":' + json.dumps(self.music_id) + ',"desc":{},'
+                '"share_url":"https://www.tiktok.com/@creator{}/video/{}","create_time":{},"region":{},'
+                '"thumbnail":"https://tiktokthumbnails.s3.us-east-2.amazonaws.com/thumb_{}.png",'
+                '"statistics":{{"play_count":{},"share_count":{},"comment_count":{},"like_count":{}}}}}\n')
+        for start in range(0, len(self), chunk_size):
+            rows = slice(start, start + chunk_size)
+            f.write(''.join(
+                line.format(video, author, descriptions[desc], i, video_id, created, regions[region],
+                            thumbnail, plays, shares, comments, likes)
+                for i, video, author, desc, video_id, created, region, thumbnail, plays, shares, comments, likes in zip(
+                    range(start, start + chunk_size), *(c[name][rows].tolist() for name in (
+                        "id", "author_uid", "desc", "video_id", "create_time", "region", "thumbnail_id",
+                        "play_count", "share_count", "comment_count", "like_count")))))
+    
+    def save(self, path: str):
+        """Write the corpus to path: .jsonl/.ndjson as JSON lines, anything else as .npz columns"""
+        tmp_path = f"{path}.tmp"
+        if path.endswith(('.jsonl', '.ndjson')):
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                self.write_jsonl(f)
+        else:
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, music_id=np.array(self.music_id), descriptions=np.array(self.descriptions, dtype=str),
+                         regions=np.array(self.regions, dtype=str), **self.columns)
+        os.replace(tmp_path, path)
+
+def json_default(value: Any) -> Any:
+    """json `default` hook producing the JSON shape of the generator's internal types"""
+    if isinstance(value, TimeSeries):
+        return value.to_records()
+    if isinstance(value, VideoExample):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _round_floats(value: Any, digits: int) -> Any:
+    if isinstance(value, float):
+        return round(value, digits)
+    if isinstance(value, dict):
+        return {key: _round_floats(item, digits) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_round_floats(item, digits) for item in value]
+    return value  # TimeSeries and VideoExample hold only ints and strings
+
+class _TeeWriter:
+    """Text stream writing to a file and its compressed copy at once"""
+    
+    def __init__(self, f, compressed):
+        self.f = f
+        self.compressed = compressed
+    
+    def write(self, text: str):
+        self.f.write(text)
+        self.compressed.write(text)
+    
+    def flush(self):
+        # Flushing the compressed copy mid-stream would cost ratio and change its bytes
+        self.f.flush()
+
+class DatasetSerializer:
+    """How datasets are encoded: indentation, float precision and a precompressed sibling.
+    
+    indent=None writes compact separators, which also lets json use its C
+    encoder (several times faster than indented output). float_digits rounds
+    every float before encoding. With gzip_level, open() writes path.gz from
+    the same text as path, with a fixed header mtime so reruns are byte-identical.
+    """
+    
+    def __init__(self, indent: Optional[int] = 2, float_digits: Optional[int] = None,
+                 gzip_level: Optional[int] = None):
+        self.indent = indent
+        self.float_digits = float_digits
+        self.gzip_level = gzip_level
+        self.separators = (',', ': ') if indent else (',', ':')
+    
+    @property
+    def name(self) -> str:
+        """Identifies the encoding in dataset cache keys"""
+        return f"indent={self.indent},float_digits={self.float_digits}"
+    
+    def newline(self, level: int) -> str:
+        return "\n" + " " * (self.indent * level) if self.indent else ""
+    
+    def dumps(self, value: Any, level: int = 0) -> str:
+        """Encode value to sit `level` levels deep in a larger document"""
+        if self.float_digits is not None:
+            value = _round_floats(value, self.float_digits)
+        text = json.dumps(value, indent=self.indent, separators=self.separators, default=json_default)
+        return text.replace("\n", self.newline(level)) if self.indent and level else text
+    
+    @contextmanager
+    def open(self, path: str) -> Iterator[Any]:
+        """Text stream to path (and path.gz), both replaced atomically once the block completes"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            if self.gzip_level is None:
+                yield f
+            else:
+                with open(f"{path}.gz.tmp", "wb") as raw, \
+                        gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=self.gzip_level, mtime=0) as compressed, \
+                        io.TextIOWrapper(compressed, encoding="utf-8") as gz:
+                    yield _TeeWriter(f, gz)
+        os.replace(tmp_path, path)
+        if self.gzip_level is not None:
+            os.replace(f"{path}.gz.tmp", f"{path}.gz")
+    
+    def write(self, path: str, value: Any):
+        with self.open(path) as f:
+            f.write(self.dumps(value))
+
+DEFAULT_SERIALIZER = DatasetSerializer()
+
+class StageProfiler:
+    """Records wall time, call counts and tracemalloc peak per named stage.
+
+    Stage times are inclusive: a stage's numbers include the stages it calls.
+    Memory peaks are measured relative to the traced memory when the stage
+    started, and tracing is only active between start() and stop() (or inside
+    a with block).
+    """
+    
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.stats = {}
+        self.wall_time = 0.0
+        self._stack = []            # [traced bytes at stage start, highest peak seen so far]
+        self._started_at = None
+        self._owns_tracing = False
+    
+    def start(self):
+        import tracemalloc
         
-        # Extract mood/vibe keywords
-        mood_keywords = []
-        mood_section = re.search(r'(?:Mood|Vibe|Style):(.*?)(?:\n\n|$)', content, re.IGNORECASE | re.DOTALL)
-        if mood_section:
-            mood_text = mood_section.group(1).lower()
-            # Common mood keywords
-            possible_moods = ['energetic', 'emotional', 'upbeat', 'chill', 'dramatic', 'melancholic', 
-                            'aggressive', 'romantic', 'nostalgic', 'dark', 'happy', 'sad', 'powerful', 'vulnerable']
-            mood_keywords = [mood for mood in possible_moods if mood in mood_text]
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+        self._started_at = time.perf_counter()
+        return self
+    
+    def stop(self):
+        import tracemalloc
         
-        # Extract trend types mentioned in context
-        trend_types = []
-        context_lower = context.lower()
-        if any(word in context_lower for word in ['dance', 'choreography', 'moves']):
-            trend_types.append('dance')
-        if any(word in context_lower for word in ['transformation', 'transition', 'reveal', 'before/after']):
-            trend_types.append('transformation')
-        if any(word in context_lower for word in ['pov', 'story', 'scenario', 'relatable']):
-            trend_types.append('storytelling')
-        if any(word in context_lower for word in ['aesthetic', 'vibe', 'mood', 'lifestyle']):
-            trend_types.append('lifestyle')
-        if any(word in context_lower for word in ['challenge', 'trend']):
-            trend_types.append('challenge')
+        if self._started_at is not None:
+            self.wall_time += time.perf_counter() - self._started_at
+            self._started_at = None
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+    
+    __enter__ = start
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+    
+    @contextmanager
+    def stage(self, name: str):
+        import tracemalloc
         
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            # Resetting the peak below would lose the enclosing stage's peak so far; keep it on its frame
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            self._stack.append([current, current])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            stats = self.stats.setdefault(name, {"calls": 0, "total_s": 0.0, "peak_bytes": 0})
+            stats["calls"] += 1
+            stats["total_s"] += elapsed
+            if tracing:
+                baseline, peak_before = self._stack.pop()
+                peak = max(tracemalloc.get_traced_memory()[1], peak_before)
+                stats["peak_bytes"] = max(stats["peak_bytes"], peak - baseline)
+                if self._stack:
+                    self._stack[-1][1] = max(self._stack[-1][1], peak)
+    
+    def instrument(self, obj: Any, names: List[str]):
+        """Replace obj's methods named in names with versions timed as stages of the same name"""
+        for name in names:
+            setattr(obj, name, self._wrap(name, getattr(obj, name)))
+    
+    def _wrap(self, name: str, method: Callable) -> Callable:
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            with self.stage(name):
+                return method(*args, **kwargs)
+        return timed
+    
+    def report(self) -> Dict[str, Any]:
+        """Structured report, slowest stages first"""
+        stages = {}
+        for name, stats in sorted(self.stats.items(), key=lambda item: item[1]["total_s"], reverse=True):
+            stages[name] = {
+                "calls": stats["calls"],
+                "total_s": round(stats["total_s"], 6),
+                "mean_ms": round(stats["total_s"] / stats["calls"] * 1000, 4),
+                "peak_bytes": stats["peak_bytes"] if self.trace_memory else None
+            }
         return {
-            'artist': artist,
-            'song_title': song_title,
-            'demographics': demographics,
-            'genre': genre,
-            'context': context,
-            'mood_keywords': mood_keywords,
-            'trend_types': trend_types
+            "wall_time_s": round(self.wall_time, 6),
+            "tracemalloc": self.trace_memory,
+            "stages": stages
         }
-        
-    except FileNotFoundError:
-        print(f"Warning: {filename} not found. Using default values.")
-        return None
-    except Exception as e:
-        print(f"Error parsing {filename}: {e}. Using default values.")
-        return None
 
-def merge_parsed_data(data1: Optional[Dict], data2: Optional[Dict]) -> Dict[str, Any]:
-    """Merge data from two input files, averaging demographics and combining other fields"""
-    # If one is missing, return the other
-    if not data1:
-        return data2 or {
-            'artist': 'Unknown Artist',
-            'song_title': 'Unknown Song',
-            'demographics': {},
-            'genre': None,
-            'context': '',
-            'mood_keywords': [],
-            'trend_types': []
+# Trend templates and the text generated for each trend type. Strings are
+# str.format templates over the song fields (song_title, artist, song_tag,
+# song_tag_lower, artist_tag). Text tables map variant -> trend type -> value,
+# with "*" as the fallback type; a JSON file with the same layout can replace
+# any top-level section (see load_template_registry).
+DEFAULT_TEMPLATES = {
+    "regions": ["US", "UK", "CA", "AU", "BR", "MX", "FR", "DE", "JP", "KR"],
+    "countries": {
+        "US": "United States",
+        "UK": "United Kingdom",
+        "CA": "Canada",
+        "AU": "Australia",
+        "BR": "Brazil",
+        "MX": "Mexico",
+        "FR": "France",
+        "DE": "Germany",
+        "JP": "Japan",
+        "KR": "South Korea"
+    },
+    "trend_templates": [
+        {
+            "type": "dance",
+            "keywords": ["dance", "choreography", "moves", "sync", "routine"],
+            "content_types": ["dance", "lip sync", "music", "choreography"]
+        },
+        {
+            "type": "transformation",
+            "keywords": ["transition", "transformation", "reveal", "before/after", "glow up"],
+            "content_types": ["transformation", "fashion", "transition effects", "outfit change"]
+        },
+        {
+            "type": "storytelling",
+            "keywords": ["POV", "story", "scenario", "relatable", "comedy"],
+            "content_types": ["POV", "comedy", "storytelling", "acting", "skit"]
+        },
+        {
+            "type": "lifestyle",
+            "keywords": ["aesthetic", "vibe", "mood", "daily", "routine"],
+            "content_types": ["lifestyle", "aesthetic", "vlog", "daily routine"]
+        },
+        {
+            "type": "challenge",
+            "keywords": ["challenge", "try", "attempt", "fail", "success"],
+            "content_types": ["challenge", "competition", "reaction", "attempt"]
         }
-    if not data2:
-        return data1
-    
-    # Start with basic info from first file
-    merged = {
-        'artist': data1['artist'],
-        'song_title': data1['song_title'],
-        'genre': data1['genre'] or data2['genre'],
-            'context': '',
-        'mood_keywords': [],
-        'trend_types': [],
-        'demographics': {}
-    }
+    ],
+    # Research mentioning the "magnetic pull" gets its first trends in this order:
+    # Couples Dance first, Car Trend second, Glow Up third
+    "magnetic_pull_order": ["dance", "storytelling", "transformation"],
+    "trend_names": {
+        "generic": {
+            "dance": "Synchronized {song_title} Dance",
+            "transformation": "{song_title} Transformation Challenge",
+            "storytelling": "POV {song_title} Stories",
+            "lifestyle": "{song_title} Aesthetic Vibes",
+            "challenge": "{song_title} Challenge",
+            "*": "{song_title} Trend"
+        },
+        "magnetic_pull": {
+            "dance": "Me Jalo 'Pull' Couples Dance",
+            "transformation": "Me Jalo Glow Up",
+            "storytelling": "Me Jalo 'Pull' Car Trend",
+            "lifestyle": "Me Jalo Golden Hour Aesthetic",
+            "challenge": "Me Jalo Challenge",
+            "*": "{song_title} Trend"
+        }
+    },
+    "trend_summaries": {
+        "generic": {
+            "dance": "Dance moves synced to {song_title}.",
+            "transformation": "Quick outfit changes timed to beat drops.",
+            "storytelling": "POV scenarios with {song_title}.",
+            "lifestyle": "Aesthetic vibes matching the song mood.",
+            "challenge": "Viral challenge using {song_title}.",
+            "*": "Viral trend using {song_title}"
+        },
+        "magnetic_pull": {
+            "dance": "Couples recreate the iconic 'magnetic pull' gesture.",
+            "transformation": "Dramatic outfit reveals synced to chorus drops.",
+            "storytelling": "Creators recreate the viral 'pull' dance but with their cars.",
+            "lifestyle": "Golden hour couple content showcasing romantic aesthetics.",
+            "challenge": "The viral magnetic pull dance move challenge.",
+            "*": "Viral trend using {song_title}"
+        }
+    },
+    "descriptions": {
+        "generic": {
+            "dance": "This trend features creators performing synchronized choreography to {song_title}. The dance includes signature moves that match the song's rhythm and energy. Groups and solo performers alike showcase their interpretation, often adding personal flair while maintaining core choreographic elements.",
+            "transformation": "Creators use {song_title} to showcase dramatic transformations, typically synced to beat drops or emotional peaks in the music. Common themes include outfit changes, makeup transformations, room reveals, and before/after scenarios that surprise and delight viewers.",
+            "storytelling": "This narrative-driven trend uses {song_title} as a backdrop for relatable POV scenarios. Creators act out situations ranging from everyday experiences to fantastical scenarios, using facial expressions and gestures to bring stories to life.",
+            "lifestyle": "Content creators capture aesthetic moments and vibes that complement {song_title}'s mood. This includes morning routines, study sessions, travel montages, and slice-of-life content that resonates with the song's emotional tone.",
+            "challenge": "A viral challenge format where creators interpret {song_title} through specific tasks or creative constraints. Participants put their own spin on the challenge while maintaining recognizable elements that tie back to the original concept.",
+            "*": "A creative trend utilizing {song_title} by {artist}."
+        }
+    },
+    "creative_analysis": {
+        # Used when the research has context
+        "context": {
+            "dance": {
+                "description": "This trend revolves around the iconic 'magnetic pull' gesture, where partners create a drawn-forward effect. It's a duo/couple format that dominates the trend, relying on synchronized movements and dramatic flair.",
+                "content_strategy": "Peak performance comes from precise timing with the music: accordion intro (0:00-0:20) for setup, main chorus (0:45-1:15) for choreography, and the bridge (1:20-1:40) for spins/dips. Facial expressions conveying passion are crucial."
+            },
+            "storytelling": {
+                "description": "The trend thrives on the forbidden romance narrative of 'el otro' (the other man). Creators use the song's lyrics to act out scenarios of dropping everything for a secret lover, making it highly relatable.",
+                "content_strategy": "The most successful videos use the 'Que yo me voy pa' allá' refrain (1:20-1:40) for the climax. The narrative arc should build with the song's intensity, using text overlays to clarify the secret relationship."
+            },
+            "transformation": {
+                "description": "Creators leverage the song's dramatic build from the accordion intro to the chorus drop for high-impact reveals. The theme of romantic rebellion inspires 'becoming who you really are' transformations.",
+                "content_strategy": "High contrast between 'before' and 'after' states is essential. The reveal must be perfectly synced to the chorus drop at 0:45. A second transformation can be added at the 2:15 chorus for a multi-stage reveal."
+            },
+            "challenge": {
+                "description": "The #mejalo dance challenge is centered on the signature 'magnetic pull' move. Its accessibility and room for personal flair have driven widespread participation, especially among families.",
+                "content_strategy": "Success requires hitting key timestamps for the moves (0:20, 0:45, 1:20). While the base moves are simple, adding unique personal touches or including multiple generations of family members increases engagement."
+            },
+            "lifestyle": {
+                "description": "This trend captures the song's romantic yearning through aesthetics. Golden hour filming, couple activities, and a blend of Mexican culture with modern visuals are key to its success.",
+                "content_strategy": "The bicultural appeal is a major factor. Mixing English captions with the Spanish audio performs well. The content should feel authentic, using the main chorus (0:45-1:15) for the most visually appealing moments."
+            },
+            "*": {
+                "description": "A creative trend using the song's key audio moments.",
+                "content_strategy": "Success depends on syncing actions to the music's emotional peaks."
+            }
+        },
+        "generic": {
+            "*": {
+                "description": "This trend revolves around comedic timing and relatable scenarios using trending audio. Creators act out everyday situations with exaggerated reactions that sync perfectly with the audio cues.",
+                "content_strategy": "The trend thrives on relatability and perfect comedic timing. Top performing content uses the audio to highlight universal experiences that viewers instantly recognize."
+            }
+        }
+    },
+    "creative_brief": {
+        "context": {
+            "dance": {
+                "quick_steps": [
+                    "Set up phone at eye level with good lighting",
+                    "Practice the 'magnetic pull' at the chorus drop (0:45)",
+                    "Sync backward steps and shoulder shimmies with partner"
+                ],
+                "key_tips": [
+                    "Duo/couple format works best",
+                    "Use dramatic spins and dips at the bridge (1:20)",
+                    "Express passion through facial expressions"
+                ]
+            },
+            "storytelling": {
+                "quick_steps": [
+                    "Set up a 'forbidden romance' scenario",
+                    "Act out dropping everything at 'me voy pa' allá' (1:20)",
+                    "Use intense, emotional facial expressions"
+                ],
+                "key_tips": [
+                    "Use text overlays to explain the secret relationship",
+                    "Build the story's intensity with the music",
+                    "Focus on relatability and the 'el otro' theme"
+                ]
+            },
+            "transformation": {
+                "quick_steps": [
+                    "Show 'before' state during accordion intro (0:00-0:20)",
+                    "Time the reveal to the main chorus drop (0:45)",
+                    "Ensure a high-contrast, impactful 'after' look"
+                ],
+                "key_tips": [
+                    "Use a smooth transition technique (e.g., spin, swipe)",
+                    "Consider a second reveal at the 2:15 chorus",
+                    "Embody a confident, rebellious attitude"
+                ]
+            },
+            "*": {
+                "quick_steps": [
+                    "Set up phone at eye level with good lighting",
+                    "Practice audio timing (0:04, 0:08, 0:12)",
+                    "Build emotional intensity throughout"
+                ],
+                "key_tips": [
+                    "Natural lighting works best",
+                    "Film in 1080p minimum",
+                    "Post 8-10 PM for best reach"
+                ]
+            }
+        },
+        "generic": {
+            "*": {
+                "quick_steps": [
+                    "Set up phone at eye level with good lighting",
+                    "Practice audio timing (0:04, 0:08, 0:12)",
+                    "Build emotional intensity throughout"
+                ],
+                "key_tips": [
+                    "Natural lighting works best",
+                    "Film in 1080p minimum",
+                    "Post 8-10 PM for best reach"
+                ]
+            }
+        }
+    },
+    # Type tags: trend type -> {context keyword: tags}; the first keyword found in
+    # the research context wins, "*" otherwise
+    "hashtags": {
+        "context": {
+            "dance": {"couple": ["#dance", "#duo", "#couples"], "*": ["#dance", "#choreography"]},
+            "transformation": {"*": ["#transformation", "#glowup", "#beforeandafter"]},
+            "storytelling": {"el otro": ["#pov", "#elotro", "#romance"], "*": ["#pov", "#storytime"]},
+            "lifestyle": {"golden hour": ["#aesthetic", "#goldenhour", "#mexicanculture"], "*": ["#aesthetic", "#vibes"]},
+            "challenge": {"*": ["#challenge", "#{song_tag_lower}challenge"]},
+            "*": {"*": []}
+        },
+        "generic": {
+            "dance": {"*": ["#dance", "#choreography", "#dancechallenge"]},
+            "transformation": {"*": ["#transformation", "#transition", "#beforeandafter"]},
+            "storytelling": {"*": ["#pov", "#storytime", "#relatable"]},
+            "lifestyle": {"*": ["#aesthetic", "#vibes", "#lifestyle"]},
+            "challenge": {"*": ["#challenge", "#trend", "#attempt"]},
+            "*": {"*": []}
+        }
+    },
+    "generic_base_hashtags": ["#{song_tag}", "#{artist_tag}", "#fyp", "#foryoupage", "#viral"],
+    "video_descriptions": [
+        "Wait for it... 😱 #{song_tag} #viral #fyp",
+        "POV: {pov} ✨ #relatable",
+        "{song_title} hits different 🔥 #trend #foryou",
+        "Nobody: ... Me: *does this* 💀 #{artist_tag}",
+        "Which one are you? 👀 #challenge #viral"
+    ],
+    "pov_openers": ["you finally get it", "its 3am and", "your friend says"]
+}
+
+# Context phrases checked by the generator itself, besides the hashtag conditions
+_CONTEXT_KEYWORDS = ("magnetic pull", "#mejalo", "fuerzaregida", "grupofrontera")
+
+def _render(value: Any, fields: Dict[str, str]) -> Any:
+    """Format every string in a template value"""
+    if isinstance(value, str):
+        return value.format(**fields)
+    if isinstance(value, list):
+        return [_render(item, fields) for item in value]
+    if isinstance(value, dict):
+        return {key: _render(item, fields) for key, item in value.items()}
+    return value
+
+class TemplateRegistry:
+    """Trend templates and text tables, compiled once and shared by every generator"""
     
-    # Combine contexts
-    contexts = []
-    if data1['context']:
-        contexts.append(f"[Research 1]: {data1['context']}")
-    if data2['context']:
-        contexts.append(f"[Research 2]: {data2['context']}")
-    merged['context'] = '\n\n'.join(contexts)
-    
-    # Combine mood keywords (unique)
-    merged['mood_keywords'] = list(set(data1['mood_keywords'] + data2['mood_keywords']))
-    
-    # Combine trend types (unique)
-    merged['trend_types'] = list(set(data1.get('trend_types', []) + data2.get('trend_types', [])))
-    
-    # Merge demographics by averaging
-    # Age demographics
-    if data1['demographics'].get('age') and data2['demographics'].get('age'):
-        merged_age = {}
-        all_age_ranges = set(list(data1['demographics']['age'].keys()) + list(data2['demographics']['age'].keys()))
-        for age_range in all_age_ranges:
-            val1 = data1['demographics']['age'].get(age_range, 0)
-            val2 = data2['demographics']['age'].get(age_range, 0)
-            # Average the two values
-            merged_age[age_range] = (val1 + val2) / 2
-        
-        # Normalize to ensure sum is 1
-        total = sum(merged_age.values())
-        if total > 0:
-            merged['demographics']['age'] = {k: v/total for k, v in merged_age.items()}
-    elif data1['demographics'].get('age'):
-        merged['demographics']['age'] = data1['demographics']['age']
-    elif data2['demographics'].get('age'):
-        merged['demographics']['age'] = data2['demographics']['age']
-    
-    # Gender demographics
-    if data1['demographics'].get('gender') and data2['demographics'].get('gender'):
-        merged_gender = {}
-        all_genders = set(list(data1['demographics']['gender'].keys()) + list(data2['demographics']['gender'].keys()))
-        
-        # Count how many files have each gender
-        for gender in all_genders:
-            val1 = data1['demographics']['gender'].get(gender, 0)
-            val2 = data2['demographics']['gender'].get(gender, 0)
-            count = (1 if val1 > 0 else 0) + (1 if val2 > 0 else 0)
-            # Average only the values that exist
-            if count > 0:
-                merged_gender[gender] = (val1 + val2) / count
-        
-        # Normalize to ensure sum is 1
-        total = sum(merged_gender.values())
-        if total > 0:
-            merged['demographics']['gender'] = {k: round(v/total, 3) for k, v in merged_gender.items()}
-    elif data1['demographics'].get('gender'):
-        merged['demographics']['gender'] = data1['demographics']['gender']
-    elif data2['demographics'].get('gender'):
-        merged['demographics']['gender'] = data2['demographics']['gender']
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+        self.regions = data["regions"]
+        self.countries = data["countries"]
+        self.trend_templates = data["trend_templates"]
+        self.by_type = {template["type"]: template for template in self.trend_templates}
+        self.magnetic_pull_order = data["magnetic_pull_order"]
+        self.context_keywords = tuple(dict.fromkeys(_CONTEXT_KEYWORDS + tuple(
+            keyword for variant in data["hashtags"].values() for tags in variant.values()
+            for keyword in tags if keyword != "*")))
+    
+    def template(self, trend_type: str) -> Dict[str, Any]:
+        """Template for a trend type, or the first template for unknown types"""
+        return self.by_type.get(trend_type, self.trend_templates[0])
+    
+    @functools.lru_cache(maxsize=1024)
+    def context_flags(self, context: str) -> frozenset:
+        """The context keywords a research context mentions"""
+        context_lower = context.lower()
+        return frozenset(keyword for keyword in self.context_keywords if keyword in context_lower)
+
+@functools.lru_cache(maxsize=None)
+def load_template_registry(path: Optional[str] = None) -> TemplateRegistry:
+    """Build the template registry once per process; sections in a JSON file at path replace the defaults"""
+    data = dict(DEFAULT_TEMPLATES)
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            data.update(json.load(f))
+    return TemplateRegistry(data)
+
+def _randint(rng: np.random.Generator, low: int, high: int) -> int:
+    """Integer in [low, high], both ends inclusive like random.randint"""
+    return int(rng.integers(low, high, endpoint=True))
+
+def _choice(rng: np.random.Generator, options: List[Any]) -> Any:
+    return options[int(rng.integers(len(options)))]
+
+_SPOTIFY_ID_CHARS = '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+# Child stream keys under a generator's SeedSequence. Every song-level stage and
+# every (trend, stage) pair draws from its own stream, so results don't depend on
+# the order, or the thread, in which stages run.
+_SONG_STREAM = 0
+_TREND_STREAM = 1
+_DEFAULT_STREAM = 2
+_SCENARIO_STREAM = 3
+
+# Analysis windows and time-series resolutions the generator supports
+MIN_WINDOW_DAYS = 7
+MAX_WINDOW_DAYS = 366
+GRANULARITIES = ("day", "hour")
+# Relative TikTok activity by hour of day, quiet overnight and peaking in the evening
+_HOURLY_PROFILE = np.array([0.60, 0.40, 0.30, 0.25, 0.25, 0.30, 0.50, 0.70, 0.80, 0.85, 0.90, 0.95,
+                            1.00, 1.00, 0.95, 0.95, 1.00, 1.10, 1.25, 1.40, 1.50, 1.45, 1.20, 0.90])
+
+# Distribute 2000 videos across 3 trends proportionally based on virality, as
+# (virality level, detected_videos range); the first trend (real data based) performs best
+_TREND_TIERS = [
+    (5, 900, 1100),  # First trend - forced viral, ~45-55% of total
+    (3, 500, 700),   # Second trend - moderate performer, ~25-35% of total
+    (2, 200, 400),   # Third and later trends - lowest performers, ~10-20% of total
+]
+# Average views per video by virality profile
+_VIEWS_PER_VIDEO = {
+    "viral": (30000, 50000),     # 30-50K per video for viral
+    "moderate": (10000, 25000),  # 10-25K per video for moderate
+    "slow_burn": (2000, 8000),   # 2-8K per video for niche
+}
+_SONG_STAGES = {"music_id": 0, "spotify": 1, "song_metadata": 2, "video_corpus": 3}
+_TREND_STAGES = {"trend": 0, "time_series": 1, "examples": 2, "demographics": 3, "creators": 4, "regions": 5,
+                 "hourly": 6}
+
+# Trends whose series iter_trends() simulates per simulate_trend_curves call
+_SERIES_BATCH = 256
+
+def _rescale_counts(values: np.ndarray, total: int) -> np.ndarray:
+    """Scale daily counts to add up to about total, keeping every day at 1 or more"""
+    actual_total = int(values.sum())
+    if actual_total > 0:
+        values = np.maximum(1, (values * (total / actual_total)).astype(np.int64))
+    return values
+
+class _TrendPlan:
+    """A trend's draws that its series depends on; see _plan_trend()"""
+    __slots__ = ("index", "streams", "trend_type", "variant", "virality_level", "detected_videos", "start_offset",
+                 "days_active", "start_date")
+    
+    def __init__(self, index: int, streams: Dict[str, np.random.Generator], trend_type: str, variant: str,
+                 virality_level: int, detected_videos: int, start_offset: int, days_active: int,
+                 start_date: datetime):
+        self.index = index
+        self.streams = streams
+        self.trend_type = trend_type
+        self.variant = variant
+        self.virality_level = virality_level
+        self.detected_videos = detected_videos
+        self.start_offset = start_offset
+        self.days_active = days_active
+        self.start_date = start_date
+
+class _TrendStreams(dict):
+    """A trend's per-stage RNG streams, each spawned the first time its stage asks for it"""
+    
+    def __init__(self, generator: "TikTokTrendMockDataGenerator", trend_index: int):
+        super().__init__()
+        self.generator = generator
+        self.trend_index = trend_index
     
-    return merged
+    def __missing__(self, stage: str) -> np.random.Generator:
+        stream = self[stage] = self.generator._stream(_TREND_STREAM, self.trend_index, _TREND_STAGES[stage])
+        return stream
 
 class TikTokTrendMockDataGenerator:
     def __init__(self, song_title: str, artist: str, real_creative_example: str = None, 
-                 parsed_data: Dict = None):
+                 parsed_data: Dict = None, stream_series: Optional[StreamSeries] = None,
+                 seed: Optional[int] = None, templates: Optional[TemplateRegistry] = None):
         self.song_title = song_title
         self.artist = artist
         self.real_creative_example = real_creative_example
-        self.music_id = self._generate_id()
+        
+        # All randomness comes from child streams seeded with this entropy; without a
+        # seed, fresh OS entropy is used, but streams stay consistent within the instance.
+        # Streams are only derived once a stage asks for one
+        self.entropy = secrets.randbits(128) if seed is None else seed
+        
+        # Real Spotify stream export (see spotify_streams.py); random streams are used without one
+        self.stream_series = stream_series
         
         # Store parsed data for use in generation
         self.parsed_data = parsed_data or {}
@@ -207,169 +973,172 @@ class TikTokTrendMockDataGenerator:
         self.mood_keywords = self.parsed_data.get('mood_keywords', [])
         self.suggested_trend_types = self.parsed_data.get('trend_types', [])
         
-        # Configuration for trend generation
+        # Shared templates and text; only song-specific fields are filled in per generator
+        self.templates = templates or load_template_registry()
+        self.context_flags = self.templates.context_flags(self.input_context) if self.input_context else frozenset()
+        self.regional_mexican = bool(self.input_genre and "mexican" in self.input_genre.lower())
+        self._fields = {
+            "song_title": song_title,
+            "artist": artist,
+            "song_tag": song_title.replace(' ', ''),
+            "song_tag_lower": song_title.replace(' ', '').lower(),
+            "artist_tag": artist.replace(' ', '')
+        }
+        self._rendered = {}
+        
+        # Simulated series of an earlier run keyed by their inputs, reused by watch()
+        # instead of re-simulating; series_memo records this run's for the next one
+        self.series_reuse = {}
+        self.series_memo = None
+        
+        # Configuration for trend generation. The window ends at today's midnight, so
+        # seeded runs on the same day match down to every create_time
+        now = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         self.config = {
             "num_trends": 3,
-            "date_range_days": 30,  # 30-day analysis period
-            "start_date": datetime.now() - timedelta(days=30),  # Start 30 days ago
-            "end_date": datetime.now(),
-            "regions": ["US", "UK", "CA", "AU", "BR", "MX", "FR", "DE", "JP", "KR"],
-            "trend_templates": [
-                {
-                    "type": "dance",
-                    "keywords": ["dance", "choreography", "moves", "sync", "routine"],
-                    "content_types": ["dance", "lip sync", "music", "choreography"]
-                },
-                {
-                    "type": "transformation",
-                    "keywords": ["transition", "transformation", "reveal", "before/after", "glow up"],
-                    "content_types": ["transformation", "fashion", "transition effects", "outfit change"]
-                },
-                {
-                    "type": "storytelling",
-                    "keywords": ["POV", "story", "scenario", "relatable", "comedy"],
-                    "content_types": ["POV", "comedy", "storytelling", "acting", "skit"]
-                },
-                {
-                    "type": "lifestyle",
-                    "keywords": ["aesthetic", "vibe", "mood", "daily", "routine"],
-                    "content_types": ["lifestyle", "aesthetic", "vlog", "daily routine"]
-                },
-                {
-                    "type": "challenge",
-                    "keywords": ["challenge", "try", "attempt", "fail", "success"],
-                    "content_types": ["challenge", "competition", "reaction", "attempt"]
-                }
-            ]
+            "date_range_days": 30,  # 30-day analysis period; see set_analysis_window()
+            "start_date": now - timedelta(days=30),  # Start 30 days ago
+            "end_date": now,
+            "granularity": "day",
+            "display_points": DEFAULT_DISPLAY_POINTS,  # *_display series budget; see set_display_series()
+            "display_method": "minmax",
+            "regions": self.templates.regions,
+            "trend_templates": self.templates.trend_templates
         }
     
-    def _generate_id(self) -> str:
+    def set_analysis_window(self, days: int, granularity: str = "day"):
+        """Analyse the `days` days up to now, with daily or hourly trend series"""
+        if not MIN_WINDOW_DAYS <= days <= MAX_WINDOW_DAYS:
+            raise ValueError(f"analysis window must be {MIN_WINDOW_DAYS}-{MAX_WINDOW_DAYS} days, got {days}")
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}, got {granularity!r}")
+        self.config["date_range_days"] = days
+        self.config["start_date"] = self.config["end_date"] - timedelta(days=days)
+        self.config["granularity"] = granularity
+    
+    def set_display_series(self, points: int, method: str = "minmax"):
+        """Add count_by_date_display / count_by_hour_display of about `points` points for longer series; 0 turns it off"""
+        if points and points < 3:
+            raise ValueError(f"display series needs at least 3 points, got {points}")
+        if method not in DOWNSAMPLE_METHODS:
+            raise ValueError(f"downsample method must be one of {', '.join(DOWNSAMPLE_METHODS)}, got {method!r}")
+        self.config["display_points"] = points
+        self.config["display_method"] = method
+    
+    @functools.cached_property
+    def rng(self) -> np.random.Generator:
+        """Stream for stages called on their own rather than through _generate_trend"""
+        return self._stream(_DEFAULT_STREAM)
+    
+    @functools.cached_property
+    def music_id(self) -> str:
+        """TikTok-style ID taken straight from its stream's seed state, without building a Generator"""
+        state = np.random.SeedSequence(self.entropy, spawn_key=(_SONG_STREAM, _SONG_STAGES["music_id"]))
+        return str(7400000000000000000 + int(state.generate_state(1, np.uint64)[0]) % 200000000000000000)
+    
+    def _stream(self, *key: int) -> np.random.Generator:
+        """Independent RNG stream derived from the generator's seed and key alone"""
+        return np.random.default_rng(np.random.SeedSequence(self.entropy, spawn_key=key))
+    
+    def _text(self, section: str, variant: str, trend_type: str) -> Any:
+        """Registry text for a trend type, rendered for this song the first time it's needed"""
+        table = self._rendered.get((section, variant))
+        if table is None:
+            table = self._rendered[(section, variant)] = _render(self.templates.data[section][variant], self._fields)
+        return table.get(trend_type, table["*"])
+    
+    def _song_stream(self, stage: str) -> np.random.Generator:
+        return self._stream(_SONG_STREAM, _SONG_STAGES[stage])
+    
+    def _trend_streams(self, trend_index: int) -> Dict[str, np.random.Generator]:
+        """One RNG stream per stage of a trend, created only for the stages that run"""
+        return _TrendStreams(self, trend_index)
+    
+    def _generate_id(self, rng: Optional[np.random.Generator] = None) -> str:
         """Generate a TikTok-style ID"""
-        return str(random.randint(7400000000000000000, 7599999999999999999))
+        rng = self.rng if rng is None else rng
+        return str(_randint(rng, 7400000000000000000, 7599999999999999999))
     
-    def _generate_spotify_data(self) -> Dict:
+    def _generate_spotify_data(self, rng: Optional[np.random.Generator] = None) -> Dict:
         """Generate Spotify streaming data"""
-        base_streams = random.randint(10000000, 500000000)
-        daily_streams = random.randint(500000, 5000000)
+        rng = self._song_stream("spotify") if rng is None else rng
+        base_streams = _randint(rng, 10000000, 500000000)
+        daily_streams = _randint(rng, 500000, 5000000)
         
-        return {
-            "spotify_id": ''.join(random.choices('0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ', k=22)),
+        streams_over_window = None
+        if self.stream_series is not None and len(self.stream_series):
+            # Use the real export, resampled onto the same daily grid as count_by_date
+            days = self.config["date_range_days"]
+            cumulative, change = self.stream_series.resample(self.config["start_date"], days)
+            base_streams = int(cumulative[-1])
+            reported = change[change > 0]
+            daily_streams = int(reported.mean()) if len(reported) else int(self.stream_series.filled().change[-1])
+            if self.stream_series.overlaps(self.config["start_date"], days):
+                streams_over_window = streams_by_date(self.stream_series, self.config["start_date"], days)
+            else:
+                # A series of zeros would read as a song nobody streamed
+                first, last = self.stream_series.date_strings()[[0, -1]]
+                print(f"Warning: the Spotify export covers {first} to {last}, outside the analysis window; "
+                      f"streams_by_date omitted and stream totals taken from its nearest day")
+        
+        spotify_data = {
+            "spotify_id": ''.join(_choice(rng, _SPOTIFY_ID_CHARS) for _ in range(22)),
             "total_streams": base_streams,
             "daily_streams": daily_streams,
-            "monthly_listeners": random.randint(1000000, 20000000),
-            "playlist_adds": random.randint(10000, 500000),
-            "save_rate": round(random.uniform(0.15, 0.45), 3),
-            "skip_rate": round(random.uniform(0.20, 0.40), 3),
-            "replay_rate": round(random.uniform(0.25, 0.55), 3),
+            "monthly_listeners": _randint(rng, 1000000, 20000000),
+            "playlist_adds": _randint(rng, 10000, 500000),
+            "save_rate": round(rng.uniform(0.15, 0.45), 3),
+            "skip_rate": round(rng.uniform(0.20, 0.40), 3),
+            "replay_rate": round(rng.uniform(0.25, 0.55), 3),
             "discovery_source": {
-                "algorithmic_playlists": round(random.uniform(0.30, 0.50), 2),
-                "user_playlists": round(random.uniform(0.15, 0.25), 2),
-                "search": round(random.uniform(0.10, 0.20), 2),
-                "artist_profile": round(random.uniform(0.05, 0.15), 2),
-                "other": round(random.uniform(0.10, 0.20), 2)
+                "algorithmic_playlists": round(rng.uniform(0.30, 0.50), 2),
+                "user_playlists": round(rng.uniform(0.15, 0.25), 2),
+                "search": round(rng.uniform(0.10, 0.20), 2),
+                "artist_profile": round(rng.uniform(0.05, 0.15), 2),
+                "other": round(rng.uniform(0.10, 0.20), 2)
             }
         }
+        if streams_over_window is not None:
+            spotify_data["streams_by_date"] = streams_over_window
+        return spotify_data
     
-    def _generate_time_series(self, virality_level: int, start_date: datetime, days: int, trend_type: str) -> List[Dict]:
-        """Generate realistic time series data for trend growth over 30 days"""
-        dates = []
-        
-        # Define trend phases for a 30-day period
-        discovery_phase = int(days * 0.15)  # ~4-5 days
-        growth_phase = int(days * 0.25)     # ~7-8 days
-        peak_phase = int(days * 0.20)       # ~6 days
-        decline_phase = int(days * 0.40)    # ~12 days
-        
-        # Adjust phases based on virality level - scaled for 2000 total videos
-        if virality_level >= 4:  # Viral trend - faster growth, shorter peak
-            discovery_phase = int(days * 0.10)  # ~3 days
-            growth_phase = int(days * 0.20)     # ~6 days
-            peak_phase = int(days * 0.25)       # ~7-8 days
-            decline_phase = int(days * 0.45)    # ~13-14 days
-            
-            # Base values for viral trends (scaled down for 2000 video analysis)
-            discovery_base = random.randint(5, 15)  # Start with 5-15 videos per day
-            peak_multiplier = random.uniform(8, 12)  # Peak at 40-180 videos per day
-            
-        elif virality_level == 3:  # Moderate trend
-            discovery_base = random.randint(3, 10)  # Start with 3-10 videos per day
-            peak_multiplier = random.uniform(5, 8)   # Peak at 15-80 videos per day
-            
-        else:  # Slow burn trend - longer discovery, sustained plateau
-            discovery_phase = int(days * 0.25)  # ~7-8 days
-            growth_phase = int(days * 0.30)     # ~9 days
-            peak_phase = int(days * 0.30)       # ~9 days
-            decline_phase = int(days * 0.15)    # ~4-5 days
-            
-            discovery_base = random.randint(2, 5)   # Start with 2-5 videos per day
-            peak_multiplier = random.uniform(3, 5)  # Peak at 6-25 videos per day
-        
-        peak_value = discovery_base * peak_multiplier
-        
-        # Generate daily values
-        for i in range(days):
-            current_date = start_date + timedelta(days=i)
-            
-            # Determine which phase we're in
-            if i < discovery_phase:
-                # Discovery phase - slow initial growth
-                phase_progress = i / discovery_phase
-                base_value = discovery_base * (0.5 + 0.5 * phase_progress)
-                
-            elif i < discovery_phase + growth_phase:
-                # Growth phase - exponential growth
-                phase_progress = (i - discovery_phase) / growth_phase
-                base_value = discovery_base + (peak_value - discovery_base) * (phase_progress ** 2)
-                
-            elif i < discovery_phase + growth_phase + peak_phase:
-                # Peak phase - high but variable
-                phase_progress = (i - discovery_phase - growth_phase) / peak_phase
-                # Add slight decline during peak phase
-                base_value = peak_value * (1 - 0.2 * phase_progress)
-                
-            else:
-                # Decline phase - gradual decrease
-                phase_progress = (i - discovery_phase - growth_phase - peak_phase) / decline_phase
-                # Different decline patterns based on trend type
-                if "dance" in trend_type:
-                    # Dance trends decline more gradually
-                    decline_factor = 1 - (0.7 * phase_progress)
-                elif "challenge" in trend_type:
-                    # Challenges drop off more quickly
-                    decline_factor = 1 - (0.85 * phase_progress ** 0.5)
-                else:
-                    # Standard decline
-                    decline_factor = 1 - (0.8 * phase_progress)
-                
-                base_value = peak_value * 0.8 * decline_factor
-            
-            # Weekly patterns - weekends see 10-20% more activity (reduced variance)
-            day_of_week = current_date.weekday()
-            if day_of_week == 4:  # Friday
-                day_multiplier = random.uniform(1.05, 1.10)
-            elif day_of_week >= 5:  # Weekend
-                day_multiplier = random.uniform(1.10, 1.20)
-            else:  # Weekday
-                day_multiplier = random.uniform(0.95, 1.05)
-            
-            # Add minimal daily variance for smoother curves
-            daily_noise = random.uniform(0.95, 1.05)
-            
-            # Calculate final value
-            value = int(base_value * day_multiplier * daily_noise)
-            
-            # Ensure minimum value
-            value = max(1, value)
-            
-            dates.append({
-                "date": current_date.strftime("%Y-%m-%d"),
-                "value": value
-            })
-        
-        return dates
+    def _simulate_time_series(self, virality_level: int, start_date: datetime, days: int, trend_type: str,
+                              total_videos: Optional[int] = None,
+                              rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """Simulate daily video counts, optionally rescaled to add up to about total_videos"""
+        rng = self.rng if rng is None else rng
+        values = simulate_trend_curves([virality_level], [days], [trend_type], [start_date.weekday()], rng)[0, :days]
+        return values if total_videos is None else _rescale_counts(values, total_videos)
+    
+    def _simulate_trend_series(self, plans: List[_TrendPlan]) -> List[np.ndarray]:
+        """Daily counts of each planned trend, rescaled to its detected_videos, from one simulate_trend_curves call"""
+        curves = simulate_trend_curves([plan.virality_level for plan in plans], [plan.days_active for plan in plans],
+                                       [plan.trend_type for plan in plans],
+                                       [plan.start_date.weekday() for plan in plans],
+                                       [plan.streams["time_series"] for plan in plans])
+        return [_rescale_counts(row[:plan.days_active], plan.detected_videos) for row, plan in zip(curves, plans)]
+    
+    def _spread_hourly(self, daily_values: np.ndarray, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """Split each day's count over its 24 hours; the hours add back up to the day exactly.
+
+        Hours follow the daily activity profile, ramped from the day's level toward
+        the next day's so growth and decline carry on within each day.
+        """
+        rng = self.rng if rng is None else rng
+        level = np.asarray(daily_values, dtype=float)
+        following = np.append(level[1:], level[-1:])
+        ramp = level[:, None] + (following - level)[:, None] * (np.arange(24) / 24)
+        weights = _HOURLY_PROFILE * np.maximum(ramp, 1e-9)
+        return rng.multinomial(daily_values, weights / weights.sum(axis=1, keepdims=True)).ravel()
+    
+    def _generate_time_series(self, virality_level: int, start_date: datetime, days: int, trend_type: str,
+                              rng: Optional[np.random.Generator] = None) -> TimeSeries:
+        """Generate realistic time series data for trend growth over the given days"""
+        values = self._simulate_time_series(virality_level, start_date, days, trend_type, rng=rng)
+        return TimeSeries.from_start(start_date, values)
     
     def _generate_momentum_status(self, virality_level: int, days_since_start: int, total_days: int) -> str:
-        """Calculate momentum status based on trend phase in 30-day timeline"""
+        """Calculate momentum status based on trend phase in the analysis window"""
         # Calculate what phase we're in based on days since trend started
         phase_percentage = days_since_start / total_days
         
@@ -402,66 +1171,16 @@ class TikTokTrendMockDataGenerator:
         else:
             return "Fade-out"
     
-    def _generate_weekly_summary(self, time_series: List[Dict]) -> List[Dict]:
+    def _generate_weekly_summary(self, time_series: TimeSeries) -> List[Dict]:
         """Generate weekly aggregated data from daily time series"""
-        weekly_data = []
-        current_week = []
-        week_start = None
-        
-        for day_data in time_series:
-            date = datetime.strptime(day_data["date"], "%Y-%m-%d")
-            
-            if week_start is None:
-                week_start = date
-            
-            # Check if we've moved to a new week
-            if (date - week_start).days >= 7:
-                if current_week:
-                    # Calculate weekly metrics
-                    weekly_data.append({
-                        "week_start": week_start.strftime("%Y-%m-%d"),
-                        "week_end": (week_start + timedelta(days=6)).strftime("%Y-%m-%d"),
-                        "total_videos": sum(d["value"] for d in current_week),
-                        "avg_daily_videos": round(sum(d["value"] for d in current_week) / len(current_week), 1),
-                        "peak_day_videos": max(d["value"] for d in current_week),
-                        "growth_rate": self._calculate_weekly_growth(weekly_data, current_week)
-                    })
-                
-                # Start new week
-                current_week = [day_data]
-                week_start = date
-            else:
-                current_week.append(day_data)
-        
-        # Add final week if there's data
-        if current_week:
-            weekly_data.append({
-                "week_start": week_start.strftime("%Y-%m-%d"),
-                "week_end": (datetime.strptime(current_week[-1]["date"], "%Y-%m-%d")).strftime("%Y-%m-%d"),
-                "total_videos": sum(d["value"] for d in current_week),
-                "avg_daily_videos": round(sum(d["value"] for d in current_week) / len(current_week), 1),
-                "peak_day_videos": max(d["value"] for d in current_week),
-                "growth_rate": self._calculate_weekly_growth(weekly_data, current_week)
-            })
-        
-        return weekly_data
-    
-    def _calculate_weekly_growth(self, previous_weeks: List[Dict], current_week: List[Dict]) -> float:
-        """Calculate week-over-week growth rate"""
-        if not previous_weeks:
-            return 0.0
-        
-        current_total = sum(d["value"] for d in current_week)
-        previous_total = previous_weeks[-1]["total_videos"]
-        
-        if previous_total == 0:
-            return 100.0 if current_total > 0 else 0.0
-        
-        growth_rate = ((current_total - previous_total) / previous_total) * 100
-        return round(growth_rate, 1)
+        if not len(time_series):
+            return []
+        time_series = TimeSeries.coerce(time_series)
+        return rollup_series(time_series.values, time_series.date_strings()[0], ("week",))["week"]
     
-    def _generate_demographics(self, trend_type: str) -> Dict:
+    def _generate_demographics(self, trend_type: str, rng: Optional[np.random.Generator] = None) -> Dict:
         """Generate detailed demographic distributions"""
+        rng = self.rng if rng is None else rng
         # Use input demographics if available, otherwise generate based on trend type
         if self.input_demographics.get('age'):
             # Use provided age demographics with some variation
@@ -469,7 +1188,7 @@ class TikTokTrendMockDataGenerator:
             total = 0
             for age_range, percentage in self.input_demographics['age'].items():
                 # Add some random variation (±10% of the original value)
-                variation = random.uniform(-0.1, 0.1) * percentage
+                variation = rng.uniform(-0.1, 0.1) * percentage
                 age_distribution[age_range] = round(max(0.01, percentage + variation), 3)
                 total += age_distribution[age_range]
             
@@ -484,20 +1203,20 @@ class TikTokTrendMockDataGenerator:
             # Default age distribution based on trend type
             if "dance" in trend_type or "challenge" in trend_type:
                 age_distribution = {
-                    "13-17": round(random.uniform(0.25, 0.35), 3),
-                    "18-24": round(random.uniform(0.35, 0.45), 3),
-                    "25-34": round(random.uniform(0.15, 0.25), 3),
-                    "35-44": round(random.uniform(0.05, 0.10), 3),
-                    "45+": round(random.uniform(0.02, 0.05), 3)
+                    "13-17": round(rng.uniform(0.25, 0.35), 3),
+                    "18-24": round(rng.uniform(0.35, 0.45), 3),
+                    "25-34": round(rng.uniform(0.15, 0.25), 3),
+                    "35-44": round(rng.uniform(0.05, 0.10), 3),
+                    "45+": round(rng.uniform(0.02, 0.05), 3)
                 }
                 primary_age = "18-24"
             else:
                 age_distribution = {
-                    "13-17": round(random.uniform(0.10, 0.20), 3),
-                    "18-24": round(random.uniform(0.30, 0.40), 3),
-                    "25-34": round(random.uniform(0.25, 0.35), 3),
-                    "35-44": round(random.uniform(0.10, 0.20), 3),
-                    "45+": round(random.uniform(0.05, 0.10), 3)
+                    "13-17": round(rng.uniform(0.10, 0.20), 3),
+                    "18-24": round(rng.uniform(0.30, 0.40), 3),
+                    "25-34": round(rng.uniform(0.25, 0.35), 3),
+                    "35-44": round(rng.uniform(0.10, 0.20), 3),
+                    "45+": round(rng.uniform(0.05, 0.10), 3)
                 }
                 primary_age = "25-34"
         
@@ -508,7 +1227,7 @@ class TikTokTrendMockDataGenerator:
             total = 0
             for gender, percentage in self.input_demographics['gender'].items():
                 # Add some random variation (±10% of the original value)
-                variation = random.uniform(-0.1, 0.1) * percentage
+                variation = rng.uniform(-0.1, 0.1) * percentage
                 gender_split[gender] = round(max(0.01, percentage + variation), 3)
                 total += gender_split[gender]
             
@@ -528,83 +1247,88 @@ class TikTokTrendMockDataGenerator:
             # Default gender distribution based on trend type
             if "fashion" in trend_type or "transformation" in trend_type:
                 gender_split = {
-                    "female": round(random.uniform(0.70, 0.85), 3),
-                    "male": round(random.uniform(0.10, 0.25), 3),
-                    "other": round(random.uniform(0.03, 0.08), 3)
+                    "female": round(rng.uniform(0.70, 0.85), 3),
+                    "male": round(rng.uniform(0.10, 0.25), 3),
+                    "other": round(rng.uniform(0.03, 0.08), 3)
                 }
                 dominant_gender = "Female"
             else:
                 gender_split = {
-                    "female": round(random.uniform(0.45, 0.55), 3),
-                    "male": round(random.uniform(0.40, 0.50), 3),
-                    "other": round(random.uniform(0.03, 0.08), 3)
+                    "female": round(rng.uniform(0.45, 0.55), 3),
+                    "male": round(rng.uniform(0.40, 0.50), 3),
+                    "other": round(rng.uniform(0.03, 0.08), 3)
                 }
                 dominant_gender = "Mixed"
         
         return {
             "age_range": primary_age,
             "age_distribution": age_distribution,
-            "age_confidence": round(random.uniform(0.65, 0.85), 3),
+            "age_confidence": round(rng.uniform(0.65, 0.85), 3),
             "gender": dominant_gender,
             "gender_split": gender_split,
-            "gender_confidence": round(random.uniform(0.70, 0.90), 3),
+            "gender_confidence": round(rng.uniform(0.70, 0.90), 3),
             "race_and_ethnicity": ["White", "Hispanic/Latino", "Asian", "Black", "Other"],
-            "race_ethnicity_confidence": round(random.uniform(0.75, 0.95), 3)
+            "race_ethnicity_confidence": round(rng.uniform(0.75, 0.95), 3)
         }
     
-    def _generate_creator_archetypes(self, trend_type: str, trend_index: int = 0) -> Dict:
+    def _generate_creator_archetypes(self, trend_type: str, trend_index: int = 0,
+                                     rng: Optional[np.random.Generator] = None) -> Dict:
         """Generate creator archetype distribution"""
+        rng = self.rng if rng is None else rng
         # Different archetypes based on specific trend
-        if self.input_context and "magnetic pull" in self.input_context.lower() and trend_index == 0:
+        if "magnetic pull" in self.context_flags and trend_index == 0:
             # Couples Dance - Relationship creators dominate
             return {
-                "Relationship": round(random.uniform(0.40, 0.45), 3),
-                "Dancer": round(random.uniform(0.25, 0.30), 3),
-                "Lifestyle": round(random.uniform(0.15, 0.20), 3),
-                "Beauty": round(random.uniform(0.08, 0.12), 3)
+                "Relationship": round(rng.uniform(0.40, 0.45), 3),
+                "Dancer": round(rng.uniform(0.25, 0.30), 3),
+                "Lifestyle": round(rng.uniform(0.15, 0.20), 3),
+                "Beauty": round(rng.uniform(0.08, 0.12), 3)
             }
-        elif self.input_context and "magnetic pull" in self.input_context.lower() and trend_index == 1:
+        elif "magnetic pull" in self.context_flags and trend_index == 1:
             # Car Trend - Lifestyle creators dominate
             return {
-                "Lifestyle": round(random.uniform(0.38, 0.43), 3),
-                "Relationship": round(random.uniform(0.25, 0.30), 3),
-                "Dancer": round(random.uniform(0.15, 0.20), 3),
-                "Beauty": round(random.uniform(0.10, 0.15), 3)
+                "Lifestyle": round(rng.uniform(0.38, 0.43), 3),
+                "Relationship": round(rng.uniform(0.25, 0.30), 3),
+                "Dancer": round(rng.uniform(0.15, 0.20), 3),
+                "Beauty": round(rng.uniform(0.10, 0.15), 3)
             }
         elif trend_index == 2:
             # Glow Up - Beauty creators dominate
             return {
-                "Beauty": round(random.uniform(0.45, 0.50), 3),
-                "Lifestyle": round(random.uniform(0.25, 0.30), 3),
-                "Dancer": round(random.uniform(0.12, 0.17), 3),
-                "Relationship": round(random.uniform(0.08, 0.12), 3)
+                "Beauty": round(rng.uniform(0.45, 0.50), 3),
+                "Lifestyle": round(rng.uniform(0.25, 0.30), 3),
+                "Dancer": round(rng.uniform(0.12, 0.17), 3),
+                "Relationship": round(rng.uniform(0.08, 0.12), 3)
             }
         else:
             # Default distribution with new archetypes
             return {
-                "Lifestyle": round(random.uniform(0.30, 0.35), 3),
-                "Beauty": round(random.uniform(0.25, 0.30), 3),
-                "Dancer": round(random.uniform(0.20, 0.25), 3),
-                "Relationship": round(random.uniform(0.15, 0.20), 3)
+                "Lifestyle": round(rng.uniform(0.30, 0.35), 3),
+                "Beauty": round(rng.uniform(0.25, 0.30), 3),
+                "Dancer": round(rng.uniform(0.20, 0.25), 3),
+                "Relationship": round(rng.uniform(0.15, 0.20), 3)
             }
     
-    def _generate_regional_distribution(self, num_regions: int = 5) -> List[Dict]:
+    def _generate_regional_distribution(self, num_regions: int = 5,
+                                        rng: Optional[np.random.Generator] = None) -> List[Dict]:
         """Generate regional distribution with percentages based on song genre and context"""
+        rng = self.rng if rng is None else rng
         # For Regional Mexican songs, prioritize Latin American countries
-        if self.input_genre and "mexican" in self.input_genre.lower():
+        if self.regional_mexican:
             # Prioritize Mexico, US (large Mexican diaspora), and other Latin American countries
             priority_regions = ["MX", "US", "BR", "CA", "FR"]
             # Set realistic percentages for Regional Mexican content
             base_percentages = {
-                "MX": random.uniform(0.35, 0.45),  # Mexico should dominate
-                "US": random.uniform(0.25, 0.35),  # Large Mexican-American population
-                "BR": random.uniform(0.08, 0.12),  # Brazil
-                "CA": random.uniform(0.03, 0.05),  # Canada
-                "FR": random.uniform(0.02, 0.04),  # France
+                "MX": rng.uniform(0.35, 0.45),  # Mexico should dominate
+                "US": rng.uniform(0.25, 0.35),  # Large Mexican-American population
+                "BR": rng.uniform(0.08, 0.12),  # Brazil
+                "CA": rng.uniform(0.03, 0.05),  # Canada
+                "FR": rng.uniform(0.02, 0.04),  # France
             }
         else:
             # Default distribution for other genres
-            regions = random.sample(self.config["regions"], min(num_regions, len(self.config["regions"])))
+            candidates = self.config["regions"]
+            regions = [candidates[i] for i in rng.choice(len(candidates), min(num_regions, len(candidates)), replace=False)]
             priority_regions = regions
             base_percentages = {}
         
@@ -616,17 +1340,17 @@ class TikTokTrendMockDataGenerator:
                 percentage = base_percentages[region]
             else:
                 # Random for non-prioritized regions
-                percentage = random.uniform(0.05, 0.15)
+                percentage = rng.uniform(0.05, 0.15)
             
             total_percentage += percentage
             
             # Higher engagement rates for primary markets
-            if region in ["MX", "US"] and self.input_genre and "mexican" in self.input_genre.lower():
-                engagement_rate = round(random.uniform(0.12, 0.18), 3)
-                video_count = random.randint(100, 500)
+            if region in ["MX", "US"] and self.regional_mexican:
+                engagement_rate = round(rng.uniform(0.12, 0.18), 3)
+                video_count = _randint(rng, 100, 500)
             else:
-                engagement_rate = round(random.uniform(0.08, 0.12), 3)
-                video_count = random.randint(20, 100)
+                engagement_rate = round(rng.uniform(0.08, 0.12), 3)
+                video_count = _randint(rng, 20, 100)
             
             distributions.append({
                 "code": region,
@@ -645,176 +1369,165 @@ class TikTokTrendMockDataGenerator:
     
     def _get_country_name(self, code: str) -> str:
         """Map country codes to names"""
-        mapping = {
-            "US": "United States",
-            "UK": "United Kingdom",
-            "CA": "Canada",
-            "AU": "Australia",
-            "BR": "Brazil",
-            "MX": "Mexico",
-            "FR": "France",
-            "DE": "Germany",
-            "JP": "Japan",
-            "KR": "South Korea"
-        }
-        return mapping.get(code, code)
+        return self.templates.countries.get(code, code)
     
-    def _generate_trend(self, trend_index: int) -> Dict:
-        """Generate a complete trend object"""
+    def _trend_type(self, trend_index: int) -> Tuple[str, str]:
+        """(trend type, text variant) of the trend at trend_index"""
         # Force first trend to be dance (Me Jalo "Pull" Couples Dance)
         if trend_index == 0:
             trend_type = "dance"
-            template = next((t for t in self.config["trend_templates"] if t["type"] == "dance"), 
-                          self.config["trend_templates"][0])
         elif self.suggested_trend_types and trend_index < len(self.suggested_trend_types):
             # Use suggested trend type
             trend_type = self.suggested_trend_types[trend_index]
-            # Find matching template
-            template = next((t for t in self.config["trend_templates"] if t["type"] == trend_type), 
-                          self.config["trend_templates"][0])
         else:
             # Select trend template normally
-            template = self.config["trend_templates"][trend_index % len(self.config["trend_templates"])]
-            trend_type = template["type"]
+            trend_type = self.templates.trend_templates[trend_index % len(self.templates.trend_templates)]["type"]
         
         # Generate trend names based on context
-        if self.input_context and "magnetic pull" in self.input_context.lower():
+        if "magnetic pull" in self.context_flags:
+            variant = "magnetic_pull"
             # Ensure specific order: Couples Dance first, Car Trend second, Glow Up third
-            if trend_index == 0:
-                trend_names = {"dance": f"Me Jalo 'Pull' Couples Dance"}
-                trend_type = "dance"
-                template = next((t for t in self.config["trend_templates"] if t["type"] == "dance"), 
-                              self.config["trend_templates"][0])
-            elif trend_index == 1:
-                trend_names = {"storytelling": f"Me Jalo 'Pull' Car Trend"}
-                trend_type = "storytelling"
-                template = next((t for t in self.config["trend_templates"] if t["type"] == "storytelling"), 
-                              self.config["trend_templates"][0])
-            elif trend_index == 2:
-                trend_names = {"transformation": f"Me Jalo Glow Up"}
-                trend_type = "transformation"
-                template = next((t for t in self.config["trend_templates"] if t["type"] == "transformation"), 
-                              self.config["trend_templates"][0])
-            else:
-                trend_names = {
-                    "dance": f"Me Jalo 'Pull' Couples Dance",
-                    "transformation": f"Me Jalo Glow Up",
-                    "storytelling": f"Me Jalo 'Pull' Car Trend",
-                    "lifestyle": f"Me Jalo Golden Hour Aesthetic",
-                    "challenge": f"Me Jalo Challenge"
-                }
-            trend_summaries = {
-                "dance": f"Couples recreate the iconic 'magnetic pull' gesture.",
-                "transformation": f"Dramatic outfit reveals synced to chorus drops.",
-                "storytelling": f"Creators recreate the viral 'pull' dance but with their cars.",
-                "lifestyle": f"Golden hour couple content showcasing romantic aesthetics.",
-                "challenge": f"The viral magnetic pull dance move challenge."
-            }
+            if trend_index < len(self.templates.magnetic_pull_order):
+                trend_type = self.templates.magnetic_pull_order[trend_index]
         else:
-            trend_names = {
-                "dance": f"Synchronized {self.song_title} Dance",
-                "transformation": f"{self.song_title} Transformation Challenge",
-                "storytelling": f"POV {self.song_title} Stories",
-                "lifestyle": f"{self.song_title} Aesthetic Vibes",
-                "challenge": f"{self.song_title} Challenge"
-            }
-            trend_summaries = {
-                "dance": f"Dance moves synced to {self.song_title}.",
-                "transformation": f"Quick outfit changes timed to beat drops.",
-                "storytelling": f"POV scenarios with {self.song_title}.",
-                "lifestyle": f"Aesthetic vibes matching the song mood.",
-                "challenge": f"Viral challenge using {self.song_title}."
-            }
-        
-        # Base metrics for 30-day period with 2000 total videos target
-        virality_level = random.randint(2, 5)
+            variant = "generic"
+        return trend_type, variant
+    
+    def _fixed_base_views(self, trend_index: int) -> Optional[int]:
+        """Total views pinned to real thumbnail data, or None for views drawn per video"""
+        # Special handling for specific trends based on real thumbnail data
+        if "magnetic pull" in self.context_flags and trend_index == 0:
+            # Me Jalo 'Pull' Couples Dance - most viral with actual high views
+            return 850000000  # 850M total views - biggest trend
+        elif "magnetic pull" in self.context_flags and trend_index == 1:
+            # Me Jalo 'Pull' Car Trend - moderate viral
+            return 425000000  # 425M total views - second biggest
+        elif trend_index == 2:
+            # Me Jalo Glow Up - smaller trend but still significant
+            return 212000000  # 212M total views - third biggest
+        return None
+    
+    def _plan_trend(self, trend_index: int) -> _TrendPlan:
+        """Draw what a trend's series depends on, so a batch of trends can be simulated together"""
+        streams = self._trend_streams(trend_index)
+        rng = streams["trend"]
+        trend_type, variant = self._trend_type(trend_index)
         
-        # Distribute 2000 videos across 3 trends proportionally based on virality
-        # Make the first trend (based on real data) perform best
-        if trend_index == 0:  # First trend - best performer (real data based)
-            virality_level = 5  # Force viral for the real data trend
-            detected_videos = random.randint(900, 1100)  # ~45-55% of total
-        elif trend_index == 1:  # Second trend - moderate performer
-            virality_level = 3
-            detected_videos = random.randint(500, 700)   # ~25-35% of total
-        else:  # Third trend - lowest performer
-            virality_level = 2
-            detected_videos = random.randint(200, 400)   # ~10-20% of total
+        # Base metrics for the analysis period with 2000 total videos target
+        virality_level, low, high = _TREND_TIERS[min(trend_index, len(_TREND_TIERS) - 1)]
+        detected_videos = _randint(rng, low, high)
         
-        # Generate time series for full 30-day period
         # Trends can start at different times within the analysis window
-        trend_start_offset = random.randint(0, 10)  # Can start up to 10 days into the period
-        days_active = min(30 - trend_start_offset, random.randint(20, 30))  # Active for 20-30 days
-        start_date = self.config["start_date"] + timedelta(days=trend_start_offset)
-        time_series = self._generate_time_series(virality_level, start_date, days_active, trend_type)
+        window = self.config["date_range_days"]
+        trend_start_offset = _randint(rng, 0, window // 3)  # Can start up to a third of the way into the period
+        days_active = min(window - trend_start_offset, _randint(rng, 2 * window // 3, window))  # Active for 2/3+ of it
+        return _TrendPlan(trend_index, streams, trend_type, variant, virality_level, detected_videos,
+                          trend_start_offset, days_active, self.config["start_date"] + timedelta(days=trend_start_offset))
+    
+    def _trend_series(self, plans: List[_TrendPlan]) -> List[Tuple]:
+        """(daily, weekly, hourly, display) series of each planned trend.
+
+        Series of an earlier watch() run are reused; the rest are simulated in
+        one batch, each trend from its own stream as if simulated alone.
+        """
+        granularity = self.config["granularity"]
+        display = (self.config["display_points"], self.config["display_method"])
+        keys = [(plan.index, plan.virality_level, plan.start_date, plan.days_active, plan.trend_type,
+                 plan.detected_videos, granularity, display) for plan in plans]
+        found = [self.series_reuse.get(key) for key in keys]
+        missing = [plan for plan, series in zip(plans, found) if series is None]
+        simulated = iter(self._simulate_trend_series(missing) if missing else [])
         
-        # Adjust time series to match detected_videos total
-        actual_total = sum(day["value"] for day in time_series)
-        if actual_total > 0:
-            scale_factor = detected_videos / actual_total
-            for day in time_series:
-                day["value"] = max(1, int(day["value"] * scale_factor))
+        results = []
+        for plan, key, series in zip(plans, keys, found):
+            if series is None:
+                values = next(simulated)
+                start_date = plan.start_date
+                hourly = None
+                if granularity == "hour":
+                    hourly = TimeSeries.from_start(start_date, self._spread_hourly(values, plan.streams["hourly"]),
+                                                   unit="h")
+                    daily = hourly.daily()
+                else:
+                    daily = TimeSeries.from_start(start_date, values)
+                # Thinned copies of each series for the dashboard graph, so long or hourly
+                # windows don't send thousands of points per trend; each keeps its own unit
+                displays = {"count_by_date_display": downsample_series(daily, *display),
+                            "count_by_hour_display": downsample_series(hourly, *display) if hourly is not None else None}
+                series = (daily, rollup_series(daily.values, start_date, ("week",))["week"], hourly,
+                          {key: thinned for key, thinned in displays.items() if thinned is not None})
+            if self.series_memo is not None:
+                self.series_memo[key] = series
+            results.append(series)
+        return results
+    
+    def _planned_trends(self, indices: Sequence[int]) -> Iterator[Tuple[_TrendPlan, Tuple]]:
+        """Plans and series of the given trends, simulated _SERIES_BATCH trends at a time"""
+        for start in range(0, len(indices), _SERIES_BATCH):
+            plans = [self._plan_trend(i) for i in indices[start:start + _SERIES_BATCH]]
+            yield from zip(plans, self._trend_series(plans))
+    
+    def _generate_trend(self, trend_index: int) -> Dict:
+        """Generate a complete trend object"""
+        return self._build_trend(next(self._planned_trends([trend_index])))
+    
+    def _build_trend(self, planned: Tuple[_TrendPlan, Tuple]) -> Dict:
+        """The trend object of a plan and its simulated series"""
+        plan, (time_series, weekly_summary, hourly, displays) = planned
+        trend_index, streams, trend_type, variant = plan.index, plan.streams, plan.trend_type, plan.variant
+        virality_level, detected_videos, days_active = plan.virality_level, plan.detected_videos, plan.days_active
+        trend_start_offset, start_date = plan.start_offset, plan.start_date
+        rng = streams["trend"]
+        template = self.templates.template(trend_type)
+        window = self.config["date_range_days"]
         
         # Calculate engagement stats proportional to video count
-        # Special handling for specific trends based on real thumbnail data
-        if self.input_context and "magnetic pull" in self.input_context.lower() and trend_index == 0:
-            # Me Jalo 'Pull' Couples Dance - most viral with actual high views
-            base_views = 850000000  # 850M total views - biggest trend
-        elif self.input_context and "magnetic pull" in self.input_context.lower() and trend_index == 1:
-            # Me Jalo 'Pull' Car Trend - moderate viral
-            base_views = 425000000  # 425M total views - second biggest
-        elif trend_index == 2:
-            # Me Jalo Glow Up - smaller trend but still significant
-            base_views = 212000000  # 212M total views - third biggest
-        elif virality_level >= 4:
-            avg_views_per_video = random.randint(30000, 50000)  # 30-50K per video for viral
-            base_views = detected_videos * avg_views_per_video
-        elif virality_level == 3:
-            avg_views_per_video = random.randint(10000, 25000)  # 10-25K per video for moderate
-            base_views = detected_videos * avg_views_per_video
-        else:
-            avg_views_per_video = random.randint(2000, 8000)    # 2-8K per video for niche
+        base_views = self._fixed_base_views(trend_index)
+        if base_views is None:
+            avg_views_per_video = _randint(rng, *_VIEWS_PER_VIDEO[_virality_profile(virality_level)])
             base_views = detected_videos * avg_views_per_video
         
         trend = {
-            "name": trend_names.get(trend_type, f"{self.song_title} Trend"),
-            "summary": trend_summaries.get(trend_type, f"Viral trend using {self.song_title}"),
+            "name": self._text("trend_names", variant, trend_type),
+            "summary": self._text("trend_summaries", variant, trend_type),
             "description": self._generate_detailed_description(trend_type),
             "virality_level": virality_level,
-            "momentum_status": self._generate_momentum_status(virality_level, trend_start_offset + days_active, 30),
+            "momentum_status": self._generate_momentum_status(virality_level, trend_start_offset + days_active, window),
             "recommended": trend_index == 0,  # First trend (real data based) is recommended
             "detected_videos": detected_videos,
-            "top_examples": self._generate_video_examples(3),
+            "top_examples": self._generate_video_examples(3, streams["examples"]),
             "engagement_stats": {
                 "avg_views": round(base_views / detected_videos, 2),
                 "median_views": round(base_views / detected_videos * 0.7, 2),
                 "avg_likes": round(base_views / detected_videos * 0.12, 2),
                 "avg_comments": round(base_views / detected_videos * 0.008, 2),
                 "avg_shares": round(base_views / detected_videos * 0.025, 2),
-                "avg_engagement_rate": round(random.uniform(0.08, 0.15), 4),
+                "avg_engagement_rate": round(rng.uniform(0.08, 0.15), 4),
                 "total_views": base_views,
                 "total_engagements": round(base_views * 0.153, 0)
             },
-            "demographics": self._generate_demographics(trend_type),
-            "creator_archetypes": self._generate_creator_archetypes(trend_type, trend_index),
-            "regional_distribution": self._generate_regional_distribution(),
+            "demographics": self._generate_demographics(trend_type, streams["demographics"]),
+            "creator_archetypes": self._generate_creator_archetypes(trend_type, trend_index, streams["creators"]),
+            "regional_distribution": self._generate_regional_distribution(rng=streams["regions"]),
             "type_of_content": template["content_types"],
-            "content_type_confidence": round(random.uniform(0.85, 0.98), 3),
+            "content_type_confidence": round(rng.uniform(0.85, 0.98), 3),
             "creative_analysis": self._generate_creative_analysis(trend_type),
             "creative_brief": self._generate_creative_brief(trend_type),
             "active_date_range": {
                 "start_date": start_date.strftime("%Y-%m-%d"),
                 "end_date": (start_date + timedelta(days=days_active)).strftime("%Y-%m-%d"),
                 "days_active": days_active,
-                "current_phase": self._get_trend_phase(trend_start_offset + days_active, 30)
+                "current_phase": self._get_trend_phase(trend_start_offset + days_active, window)
             },
             "count_by_date": time_series,
-            "weekly_summary": self._generate_weekly_summary(time_series),
+            **({"count_by_hour": hourly} if hourly is not None else {}),
+            **displays,
+            "weekly_summary": weekly_summary,
             "trending_hashtags": self._generate_hashtags(trend_type),
             "audio_features": {
-                "bpm": random.randint(100, 180),
+                "bpm": _randint(rng, 100, 180),
                 "key_moments": ["0:15", "0:32", "0:45", "1:02"],
-                "mood": self.mood_keywords[0] if self.mood_keywords else random.choice(["energetic", "emotional", "upbeat", "chill", "dramatic"])
+                "mood": self.mood_keywords[0] if self.mood_keywords else _choice(rng, ["energetic", "emotional", "upbeat", "chill", "dramatic"])
             }
         }
         
@@ -826,287 +1539,1222 @@ class TikTokTrendMockDataGenerator:
     
     def _generate_detailed_description(self, trend_type: str) -> str:
         """Generate detailed trend description"""
-        descriptions = {
-            "dance": f"This trend features creators performing synchronized choreography to {self.song_title}. The dance includes signature moves that match the song's rhythm and energy. Groups and solo performers alike showcase their interpretation, often adding personal flair while maintaining core choreographic elements.",
-            "transformation": f"Creators use {self.song_title} to showcase dramatic transformations, typically synced to beat drops or emotional peaks in the music. Common themes include outfit changes, makeup transformations, room reveals, and before/after scenarios that surprise and delight viewers.",
-            "storytelling": f"This narrative-driven trend uses {self.song_title} as a backdrop for relatable POV scenarios. Creators act out situations ranging from everyday experiences to fantastical scenarios, using facial expressions and gestures to bring stories to life.",
-            "lifestyle": f"Content creators capture aesthetic moments and vibes that complement {self.song_title}'s mood. This includes morning routines, study sessions, travel montages, and slice-of-life content that resonates with the song's emotional tone.",
-            "challenge": f"A viral challenge format where creators interpret {self.song_title} through specific tasks or creative constraints. Participants put their own spin on the challenge while maintaining recognizable elements that tie back to the original concept."
-        }
-        return descriptions.get(trend_type, f"A creative trend utilizing {self.song_title} by {self.artist}.")
+        return self._text("descriptions", "generic", trend_type)
     
     def _generate_creative_analysis(self, trend_type: str) -> Dict[str, str]:
         """Generate structured creative analysis text based on actual context from research"""
-        # Use context from the research files
-        if self.input_context:
-            context_lower = self.input_context.lower()
-            
-            # Context-aware descriptions
-            descriptions = {
-                "dance": "This trend revolves around the iconic 'magnetic pull' gesture, where partners create a drawn-forward effect. It's a duo/couple format that dominates the trend, relying on synchronized movements and dramatic flair.",
-                "storytelling": "The trend thrives on the forbidden romance narrative of 'el otro' (the other man). Creators use the song's lyrics to act out scenarios of dropping everything for a secret lover, making it highly relatable.",
-                "transformation": "Creators leverage the song's dramatic build from the accordion intro to the chorus drop for high-impact reveals. The theme of romantic rebellion inspires 'becoming who you really are' transformations.",
-                "challenge": "The #mejalo dance challenge is centered on the signature 'magnetic pull' move. Its accessibility and room for personal flair have driven widespread participation, especially among families.",
-                "lifestyle": "This trend captures the song's romantic yearning through aesthetics. Golden hour filming, couple activities, and a blend of Mexican culture with modern visuals are key to its success."
-            }
-            
-            # Context-aware strategies
-            strategies = {
-                "dance": "Peak performance comes from precise timing with the music: accordion intro (0:00-0:20) for setup, main chorus (0:45-1:15) for choreography, and the bridge (1:20-1:40) for spins/dips. Facial expressions conveying passion are crucial.",
-                "storytelling": "The most successful videos use the 'Que yo me voy pa' allá' refrain (1:20-1:40) for the climax. The narrative arc should build with the song's intensity, using text overlays to clarify the secret relationship.",
-                "transformation": "High contrast between 'before' and 'after' states is essential. The reveal must be perfectly synced to the chorus drop at 0:45. A second transformation can be added at the 2:15 chorus for a multi-stage reveal.",
-                "challenge": "Success requires hitting key timestamps for the moves (0:20, 0:45, 1:20). While the base moves are simple, adding unique personal touches or including multiple generations of family members increases engagement.",
-                "lifestyle": "The bicultural appeal is a major factor. Mixing English captions with the Spanish audio performs well. The content should feel authentic, using the main chorus (0:45-1:15) for the most visually appealing moments."
-            }
-            
-            return {
-                "description": descriptions.get(trend_type, "A creative trend using the song's key audio moments."),
-                "content_strategy": strategies.get(trend_type, "Success depends on syncing actions to the music's emotional peaks.")
-            }
-
-        # Fallback to generic analyses if no context
-        return {
-            "description": "This trend revolves around comedic timing and relatable scenarios using trending audio. Creators act out everyday situations with exaggerated reactions that sync perfectly with the audio cues.",
-            "content_strategy": "The trend thrives on relatability and perfect comedic timing. Top performing content uses the audio to highlight universal experiences that viewers instantly recognize."
-        }
+        # Context-aware text when the research has context, generic analyses otherwise
+        return dict(self._text("creative_analysis", "context" if self.input_context else "generic", trend_type))
     
     def _generate_creative_brief(self, trend_type: str) -> Dict:
         """Generate creative brief for content creators in structured format based on research context"""
-        
-        # Default values
-        quick_steps = []
-        key_tips = []
-        avoid = ["Poor audio sync", "Overcomplicating", "Bad lighting"]
-
-        if self.input_context:
-            context_lower = self.input_context.lower()
-            
-            if trend_type == "dance":
-                quick_steps = [
-                    "Set up phone at eye level with good lighting",
-                    "Practice the 'magnetic pull' at the chorus drop (0:45)",
-                    "Sync backward steps and shoulder shimmies with partner"
-                ]
-                key_tips = [
-                    "Duo/couple format works best",
-                    "Use dramatic spins and dips at the bridge (1:20)",
-                    "Express passion through facial expressions"
-                ]
-                avoid = ["Stiff movements", "Looking at feet instead of partner", "Poor framing"]
-            elif trend_type == "storytelling":
-                 quick_steps = [
-                    "Set up a 'forbidden romance' scenario",
-                    "Act out dropping everything at 'me voy pa' allá' (1:20)",
-                    "Use intense, emotional facial expressions"
-                ]
-                 key_tips = [
-                    "Use text overlays to explain the secret relationship",
-                    "Build the story's intensity with the music",
-                    "Focus on relatability and the 'el otro' theme"
-                ]
-                 avoid = ["Vague storytelling", "Weak emotional acting", "Poor lip-syncing"]
-            elif trend_type == "transformation":
-                quick_steps = [
-                    "Show 'before' state during accordion intro (0:00-0:20)",
-                    "Time the reveal to the main chorus drop (0:45)",
-                    "Ensure a high-contrast, impactful 'after' look"
-                ]
-                key_tips = [
-                    "Use a smooth transition technique (e.g., spin, swipe)",
-                    "Consider a second reveal at the 2:15 chorus",
-                    "Embody a confident, rebellious attitude"
-                ]
-                avoid = ["Messy transitions", "Low-impact 'after' state", "Reveal doesn't match the beat"]
-            # Fallback for other types
-            else:
-                quick_steps = [
-                    "Set up phone at eye level with good lighting",
-                    "Practice audio timing (0:04, 0:08, 0:12)",
-                    "Build emotional intensity throughout"
-                ]
-                key_tips = [
-                    "Natural lighting works best",
-                    "Film in 1080p minimum",
-                    "Post 8-10 PM for best reach"
-                ]
-        else:
-            quick_steps = [
-                "Set up phone at eye level with good lighting",
-                "Practice audio timing (0:04, 0:08, 0:12)",
-                "Build emotional intensity throughout"
-            ]
-            key_tips = [
-                "Natural lighting works best",
-                "Film in 1080p minimum",
-                "Post 8-10 PM for best reach"
-            ]
-
+        brief = self._text("creative_brief", "context" if self.input_context else "generic", trend_type)
         return {
-            "quick_steps": quick_steps,
-            "key_tips": key_tips
+            "quick_steps": list(brief["quick_steps"]),
+            "key_tips": list(brief["key_tips"])
         }
     
-    def _generate_video_examples(self, count: int) -> List[Dict]:
+    def _generate_video_examples(self, count: int, rng: Optional[np.random.Generator] = None) -> List[VideoExample]:
         """Generate example video data"""
-        examples = []
-        for i in range(count):
-            examples.append({
-                "id": self._generate_id(),
-                "author_uid": self._generate_id(),
-                "music_id": self.music_id,
-                "desc": self._generate_video_description(),
-                "share_url": f"https://www.tiktok.com/@creator{i}/video/{self._generate_id()}",
-                "create_time": int((datetime.now() - timedelta(days=random.randint(1, 30))).timestamp()),
-                "region": random.choice(["US", "UK", "CA"]),
-                "thumbnail": f"https://tiktokthumbnails.s3.us-east-2.amazonaws.com/thumb_{self._generate_id()}.png",
-                "statistics": {
-                    "play_count": random.randint(100000, 10000000),
-                    "share_count": random.randint(1000, 100000),
-                    "comment_count": random.randint(100, 50000),
-                    "like_count": random.randint(10000, 2000000)
-                }
-            })
-        return sorted(examples, key=lambda x: x["statistics"]["play_count"], reverse=True)
+        rng = self.rng if rng is None else rng
+        # Drawn as columns and ranked with a partial top-k rather than a full sort
+        return self.generate_video_corpus(count, rng).top_k(count)
+    
+    def generate_video_corpus(self, count: int, rng: Optional[np.random.Generator] = None) -> VideoCorpus:
+        """Draw `count` example videos as columns; _generate_video_examples ranks a small one"""
+        rng = self._song_stream("video_corpus") if rng is None else rng
+        povs = self.templates.data["pov_openers"]
+        templates = self.templates.data["video_descriptions"]
+        regions = ["US", "UK", "CA"]
+        window = self.config["date_range_days"]
+        
+        # All four ID columns in one draw, as each rng call has a fixed cost that dominates small corpora
+        ids = rng.integers(7400000000000000000, 7599999999999999999, size=(4, count), endpoint=True)
+        columns = {
+            "id": ids[0],
+            "author_uid": ids[1],
+            "desc": rng.integers(len(templates) * len(povs), size=count).astype(np.int16),
+            "video_id": ids[2],
+            "create_time": self._day_timestamps(rng.integers(window, size=count)),
+            "region": rng.integers(len(regions), size=count).astype(np.int8),
+            "thumbnail_id": ids[3],
+            "play_count": rng.integers(100000, 10000000, size=count, endpoint=True),
+            "share_count": rng.integers(1000, 100000, size=count, endpoint=True),
+            "comment_count": rng.integers(100, 50000, size=count, endpoint=True),
+            "like_count": rng.integers(10000, 2000000, size=count, endpoint=True)
+        }
+        return VideoCorpus(columns, self.music_id, self._video_descriptions, regions)
+    
+    @functools.cached_property
+    def _video_descriptions(self) -> List[str]:
+        """Every description template with every POV opener, rendered for this song"""
+        povs = self.templates.data["pov_openers"]
+        return [template.format(pov=pov, **self._fields)
+                for template in self.templates.data["video_descriptions"] for pov in povs]
+    
+    def _day_timestamps(self, offsets: np.ndarray) -> np.ndarray:
+        """create_time of videos posted `offsets + 1` days before the window's end.
+
+        Each is a midnight, as end_date is day-aligned, computed with datetime so
+        DST handling stays exact; a few videos only pay for the days they landed on.
+        """
+        end_date = self.config["end_date"]
+        window = self.config["date_range_days"]
+        days = np.unique(offsets) if len(offsets) < window else np.arange(window)
+        stamps = np.array([int((end_date - timedelta(days=int(d) + 1)).timestamp()) for d in days], dtype=np.int64)
+        return stamps[offsets] if len(days) == window else stamps[np.searchsorted(days, offsets)]
     
-    def _generate_video_description(self) -> str:
+    def _generate_video_description(self, rng: Optional[np.random.Generator] = None) -> str:
         """Generate realistic video description"""
-        templates = [
-            f"Wait for it... 😱 #{self.song_title.replace(' ', '')} #viral #fyp",
-            f"POV: {random.choice(['you finally get it', 'its 3am and', 'your friend says'])} ✨ #relatable",
-            f"{self.song_title} hits different 🔥 #trend #foryou",
-            f"Nobody: ... Me: *does this* 💀 #{self.artist.replace(' ', '')}",
-            f"Which one are you? 👀 #challenge #viral"
-        ]
-        return random.choice(templates)
+        rng = self.rng if rng is None else rng
+        pov = _choice(rng, self.templates.data["pov_openers"])
+        return _choice(rng, self.templates.data["video_descriptions"]).format(pov=pov, **self._fields)
     
     def _generate_hashtags(self, trend_type: str) -> List[str]:
         """Generate trending hashtags based on research context"""
         # Extract hashtags from context if available
         if self.input_context:
-            context_lower = self.input_context.lower()
+            flags = self.context_flags
             
             # Base tags from research
             base_tags = []
             
             # Check for specific hashtags mentioned in research
-            if "#mejalo" in context_lower:
+            if "#mejalo" in flags:
                 base_tags.extend(["#mejalo", "#mejalotrend", "#mejalodance", "#mejalocouple"])
             else:
-                base_tags.append(f"#{self.song_title.replace(' ', '').lower()}")
+                base_tags.append(f"#{self._fields['song_tag_lower']}")
             
             # Add artist tags
-            if "fuerzaregida" in context_lower:
+            if "fuerzaregida" in flags:
                 base_tags.append("#fuerzaregida")
-            if "grupofrontera" in context_lower:
+            if "grupofrontera" in flags:
                 base_tags.append("#grupofrontera")
             
             # Always include these
             base_tags.extend(["#parati", "#fyp", "#viral"])
             
             # Add genre-specific tags for Regional Mexican
-            if self.input_genre and "mexican" in self.input_genre.lower():
+            if self.regional_mexican:
                 base_tags.extend(["#corridos", "#mexicanmusic", "#regionalmusic"])
             
-            # Type-specific tags based on trend
-            type_tags = {
-                "dance": ["#dance", "#duo", "#couples"] if "couple" in context_lower else ["#dance", "#choreography"],
-                "transformation": ["#transformation", "#glowup", "#beforeandafter"],
-                "storytelling": ["#pov", "#elotro", "#romance"] if "el otro" in context_lower else ["#pov", "#storytime"],
-                "lifestyle": ["#aesthetic", "#goldenhour", "#mexicanculture"] if "golden hour" in context_lower else ["#aesthetic", "#vibes"],
-                "challenge": ["#challenge", f"#{self.song_title.replace(' ', '').lower()}challenge"]
-            }
+            type_tags = self._text("hashtags", "context", trend_type)
         else:
             # Fallback to generic tags
-            base_tags = [
-                f"#{self.song_title.replace(' ', '')}",
-                f"#{self.artist.replace(' ', '')}",
-                "#fyp",
-                "#foryoupage",
-                "#viral"
-            ]
-            
-            type_tags = {
-                "dance": ["#dance", "#choreography", "#dancechallenge"],
-                "transformation": ["#transformation", "#transition", "#beforeandafter"],
-                "storytelling": ["#pov", "#storytime", "#relatable"],
-                "lifestyle": ["#aesthetic", "#vibes", "#lifestyle"],
-                "challenge": ["#challenge", "#trend", "#attempt"]
-            }
+            base_tags = _render(self.templates.data["generic_base_hashtags"], self._fields)
+            type_tags = self._text("hashtags", "generic", trend_type)
         
-        return base_tags + type_tags.get(trend_type, [])
+        # Type-specific tags, picked by the first condition the context mentions
+        for keyword, tags in type_tags.items():
+            if keyword == "*" or keyword in self.context_flags:
+                return base_tags + tags
+        return base_tags
+    
+    def _generate_song_metadata(self, rng: Optional[np.random.Generator] = None) -> Dict:
+        """Generate song-level metadata"""
+        rng = self._song_stream("song_metadata") if rng is None else rng
+        return {
+            "title": self.song_title,
+            "artist": self.artist,
+            "music_id": self.music_id,
+            "duration_ms": _randint(rng, 150000, 240000),
+            "release_date": (self.config["end_date"] - timedelta(days=_randint(rng, 30, 365))).strftime("%Y-%m-%d"),
+            "genre": self.input_genre or _choice(rng, ["Pop", "Hip-Hop", "Electronic", "Indie", "R&B"])
+        }
     
-    def generate_complete_dataset(self) -> Dict:
+    def enable_profiling(self, profiler: Optional["StageProfiler"] = None) -> "StageProfiler":
+        """Instrument this generator's private stages; returns the StageProfiler collecting their stats"""
+        profiler = profiler or StageProfiler()
+        stages = [name for name in vars(TikTokTrendMockDataGenerator) if name.startswith(('_generate_', '_simulate_', '_get_'))]
+        profiler.instrument(self, stages + ["generate_complete_dataset"])
+        return profiler
+    
+    def iter_trends(self, accumulator: Optional["TrendAccumulator"] = None,
+                    workers: Optional[int] = None) -> Iterator[Dict]:
+        """Yield trends one at a time as they are generated.
+
+        Series are simulated _SERIES_BATCH trends at a time, and nothing is kept
+        after a trend is yielded, so consumers can stop early or pipe trends
+        straight into a sink. Pass a TrendAccumulator to have each
+        yielded trend folded into running aggregate metrics. With workers > 1,
+        trends are generated on a thread pool but still yielded in order, and
+        come out identical to a serial run since each draws from its own streams.
+        """
+        planned = self._planned_trends(range(self.config["num_trends"]))
+        if workers and workers > 1:
+            executor = ThreadPoolExecutor(max_workers=workers)
+            trends = executor.map(self._build_trend, planned)
+        else:
+            executor = None
+            trends = map(self._build_trend, planned)
+        try:
+            yield from self._accumulate(trends, accumulator)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+    
+    def _accumulate(self, trends: Iterator[Dict], accumulator: Optional["TrendAccumulator"]) -> Iterator[Dict]:
+        for trend in trends:
+            if accumulator is not None:
+                accumulator.add(trend)
+            yield trend
+    
+    def top_trends(self, n: int, key: Callable[[Dict], Any] = None) -> Tuple[List[Dict], "TrendAccumulator"]:
+        """Generate every candidate trend but keep only the n best (by total views unless key is given).
+
+        Returns the kept trends, best first, and an accumulator covering all candidates.
+        """
+        key = key or (lambda trend: trend["engagement_stats"]["total_views"])
+        accumulator = TrendAccumulator()
+        return heapq.nlargest(n, self.iter_trends(accumulator), key=key), accumulator
+    
+    def generate_complete_dataset(self, workers: Optional[int] = None) -> Dict:
         """Generate the complete mock dataset"""
-        trends = []
-        for i in range(self.config["num_trends"]):
-            trends.append(self._generate_trend(i))
-        
-        # Calculate aggregate metrics
-        total_videos = sum(t["detected_videos"] for t in trends)
-        total_views = sum(t["engagement_stats"]["total_views"] for t in trends)
+        totals = TrendAccumulator()
+        trends = list(self.iter_trends(totals, workers))
         
         return {
-            "song_metadata": {
-                "title": self.song_title,
-                "artist": self.artist,
-                "music_id": self.music_id,
-                "duration_ms": random.randint(150000, 240000),
-                "release_date": (datetime.now() - timedelta(days=random.randint(30, 365))).strftime("%Y-%m-%d"),
-                "genre": self.input_genre or random.choice(["Pop", "Hip-Hop", "Electronic", "Indie", "R&B"])
-            },
+            "song_metadata": self._generate_song_metadata(),
             "spotify_data": self._generate_spotify_data(),
             "trends": trends,
-            "aggregate_metrics": {
-                "total_trends": len(trends),
-                "total_videos": total_videos,
-                "total_views": total_views,
-                "avg_virality": round(sum(t["virality_level"] for t in trends) / len(trends), 1),
-                "platform_reach": {
-                    "tiktok": total_views,
-                    "instagram_reels": round(total_views * 0.4),
-                    "youtube_shorts": round(total_views * 0.25),
-                    "estimated_total": round(total_views * 1.65)
-                },
-                "timeline_summary": {
-                    "analysis_period": "30 days",
-                    "start_date": self.config["start_date"].strftime("%Y-%m-%d"),
-                    "end_date": self.config["end_date"].strftime("%Y-%m-%d"),
-                    "peak_trend": max(trends, key=lambda t: t["engagement_stats"]["total_views"])["name"],
-                    "trend_phases": [{"name": t["name"], "phase": t["active_date_range"]["current_phase"]} for t in trends]
-                }
-            },
+            "aggregate_metrics": totals.aggregate_metrics(self.config),
             "generated_at": datetime.now().isoformat(),
             "data_version": "2.0"
         }
+    
+    def scenario_bands(self, scenarios: int, percentiles: Tuple[int, ...] = (10, 50, 90)) -> Dict:
+        """Percentile bands over many independent draws of every trend.
 
-# Example usage
-def main():
-    import sys
-    import os
-    
-    # Check for command line arguments or use default files
-    if len(sys.argv) > 2:
-        perplexity_file = sys.argv[1]
-        openai_file = sys.argv[2]
+        Each trend's random inputs (detected_videos, start offset, days active,
+        curve shape, views per video, engagement rate) are drawn `scenarios`
+        times at once with a scenario axis in NumPy, as if the dataset were
+        generated that many times with different seeds. Daily counts are placed
+        on the analysis window so the bands line up with count_by_date.
+        """
+        keys = [f"p{p}" for p in percentiles]
+        window = self.config["date_range_days"]
+        dates = [(self.config["start_date"] + timedelta(days=d)).strftime("%Y-%m-%d") for d in range(window)]
+        
+        def band(values: np.ndarray) -> Dict[str, float]:
+            return dict(zip(keys, np.percentile(values, percentiles).round(4).tolist()))
+        
+        trends = []
+        for trend_index in range(self.config["num_trends"]):
+            rng = self._stream(_SCENARIO_STREAM, trend_index)
+            trend_type, variant = self._trend_type(trend_index)
+            virality_level, low, high = _TREND_TIERS[min(trend_index, len(_TREND_TIERS) - 1)]
+            
+            detected_videos = rng.integers(low, high + 1, scenarios)
+            start_offset = rng.integers(0, window // 3 + 1, scenarios)
+            days_active = np.minimum(window - start_offset, rng.integers(2 * window // 3, window + 1, scenarios))
+            weekdays = (self.config["start_date"].weekday() + start_offset) % 7
+            curves = simulate_trend_curves(np.full(scenarios, virality_level), days_active,
+                                           [trend_type] * scenarios, weekdays, rng)
+            # Rescale each curve to its detected_videos, as _simulate_time_series does
+            active = np.arange(curves.shape[1])[None, :] < days_active[:, None]
+            scale = detected_videos / np.maximum(curves.sum(axis=1), 1)
+            counts = np.where(active, np.maximum(1, (curves * scale[:, None]).astype(np.int64)), 0)
+            
+            daily = np.zeros((scenarios, window), dtype=np.int64)
+            rows, cols = np.nonzero(active)
+            daily[rows, start_offset[rows] + cols] = counts[rows, cols]
+            daily_bands = np.percentile(daily, percentiles, axis=0).round(1)
+            
+            base_views = self._fixed_base_views(trend_index)
+            if base_views is None:
+                views_low, views_high = _VIEWS_PER_VIDEO[_virality_profile(virality_level)]
+                total_views = detected_videos * rng.integers(views_low, views_high + 1, scenarios)
+            else:
+                total_views = np.full(scenarios, base_views)
+            
+            trends.append({
+                "name": self._text("trend_names", variant, trend_type),
+                "detected_videos": band(detected_videos),
+                "total_views": band(total_views),
+                "total_engagements": band(np.round(total_views * 0.153)),
+                "avg_engagement_rate": band(rng.uniform(0.08, 0.15, scenarios)),
+                "count_by_date": [{"date": date, **dict(zip(keys, column))}
+                                  for date, column in zip(dates, daily_bands.T.tolist())]
+            })
+        
+        return {
+            "song_metadata": {"title": self.song_title, "artist": self.artist, "music_id": self.music_id},
+            "scenarios": scenarios,
+            "percentiles": list(percentiles),
+            "trends": trends,
+            "generated_at": datetime.now().isoformat()
+        }
+
+class TrendAccumulator:
+    """Incrementally maintained aggregate_metrics, so trends can be summarised without keeping them"""
+    
+    def __init__(self):
+        self.total_trends = 0
+        self.total_videos = 0
+        self.total_views = 0
+        self.virality_sum = 0
+        self.peak_trend = None
+        self.peak_views = None
+        self.trend_phases = []
+    
+    def add(self, trend: Dict):
+        views = trend["engagement_stats"]["total_views"]
+        self.total_trends += 1
+        self.total_videos += trend["detected_videos"]
+        self.total_views += views
+        self.virality_sum += trend["virality_level"]
+        # Strict comparison keeps the first trend on ties, like max()
+        if self.peak_views is None or views > self.peak_views:
+            self.peak_views = views
+            self.peak_trend = trend["name"]
+        self.trend_phases.append({"name": trend["name"], "phase": trend["active_date_range"]["current_phase"]})
+    
+    def aggregate_metrics(self, config: Dict) -> Dict:
+        total_views = self.total_views
+        return {
+            "total_trends": self.total_trends,
+            "total_videos": self.total_videos,
+            "total_views": total_views,
+            "avg_virality": round(self.virality_sum / self.total_trends, 1) if self.total_trends else 0.0,
+            "platform_reach": {
+                "tiktok": total_views,
+                "instagram_reels": round(total_views * 0.4),
+                "youtube_shorts": round(total_views * 0.25),
+                "estimated_total": round(total_views * 1.65)
+            },
+            "timeline_summary": {
+                "analysis_period": f"{config['date_range_days']} days",
+                "start_date": config["start_date"].strftime("%Y-%m-%d"),
+                "end_date": config["end_date"].strftime("%Y-%m-%d"),
+                "peak_trend": self.peak_trend,
+                "trend_phases": self.trend_phases
+            }
+        }
+
+def write_dataset_stream(generator: TikTokTrendMockDataGenerator, f,
+                         on_trend: Optional[Callable[[Dict], None]] = None,
+                         serializer: Optional[DatasetSerializer] = None) -> Dict:
+    """Stream generate_complete_dataset() output to f, writing each trend as it is produced.
+
+    The bytes match json.dump(dataset, f) with the serializer's indent and
+    separators (indent=2 by default), but only one trend is held in memory at a
+    time; aggregate_metrics is built from running totals and written last.
+    on_trend, if given, sees each trend after it is written. Returns the
+    aggregate_metrics dict.
+    """
+    serializer = serializer or DEFAULT_SERIALIZER
+    newline = serializer.newline
+    
+    def member(name: str) -> str:
+        return f'{newline(1)}"{name}"{serializer.separators[1]}'
+    
+    f.write('{')
+    f.write(f'{member("song_metadata")}{serializer.dumps(generator._generate_song_metadata(), 1)},')
+    f.write(f'{member("spotify_data")}{serializer.dumps(generator._generate_spotify_data(), 1)},')
+    
+    totals = TrendAccumulator()
+    f.write(f'{member("trends")}[')
+    for i, trend in enumerate(generator.iter_trends(totals)):
+        f.write(f'{"," if i else ""}{newline(2)}')
+        f.write(serializer.dumps(trend, 2))
+        f.flush()
+        if on_trend:
+            on_trend(trend)
+    f.write(f'{newline(1)}],' if totals.total_trends else '],')
+    
+    aggregate_metrics = totals.aggregate_metrics(generator.config)
+    f.write(f'{member("aggregate_metrics")}{serializer.dumps(aggregate_metrics, 1)},')
+    f.write(f'{member("generated_at")}{json.dumps(datetime.now().isoformat())},')
+    f.write(f'{member("data_version")}"2.0"{newline(0)}}}')
+    return aggregate_metrics
+
+def write_dataset_ndjson(generator: TikTokTrendMockDataGenerator, f,
+                         on_trend: Optional[Callable[[Dict], None]] = None,
+                         serializer: Optional[DatasetSerializer] = None) -> Dict:
+    """Stream the dataset to f as compact NDJSON, one record per line.
+
+    The first line is a "song" record (song_metadata, spotify_data), then one
+    "trend" record per trend, then a closing "aggregate" record. on_trend works
+    as in write_dataset_stream; only the serializer's float precision applies.
+    Returns the aggregate_metrics dict.
+    """
+    line = DatasetSerializer(indent=None, float_digits=serializer.float_digits if serializer else None)
+    
+    def write_record(record: Dict):
+        f.write(line.dumps(record))
+        f.write('\n')
+    
+    write_record({
+        "record": "song",
+        "song_metadata": generator._generate_song_metadata(),
+        "spotify_data": generator._generate_spotify_data(),
+        "data_version": "2.0"
+    })
+    
+    totals = TrendAccumulator()
+    for i, trend in enumerate(generator.iter_trends(totals)):
+        write_record({"record": "trend", "index": i, "trend": trend})
+        f.flush()
+        if on_trend:
+            on_trend(trend)
+    
+    aggregate_metrics = totals.aggregate_metrics(generator.config)
+    write_record({
+        "record": "aggregate",
+        "aggregate_metrics": aggregate_metrics,
+        "generated_at": datetime.now().isoformat()
+    })
+    return aggregate_metrics
+
+SHARD_MANIFEST = "manifest.json"
+SHARD_INDEX = "index.json"
+
+def trend_headline(trend: Dict) -> Dict:
+    """The numbers a trend list shows before its shard is opened"""
+    return {
+        "name": trend["name"],
+        "summary": trend["summary"],
+        "virality_level": trend["virality_level"],
+        "momentum_status": trend["momentum_status"],
+        "recommended": trend["recommended"],
+        "detected_videos": trend["detected_videos"],
+        "total_views": trend["engagement_stats"]["total_views"],
+        "avg_engagement_rate": trend["engagement_stats"]["avg_engagement_rate"],
+        "active_date_range": trend["active_date_range"],
+        "type_of_content": trend["type_of_content"]
+    }
+
+def write_dataset_sharded(generator: TikTokTrendMockDataGenerator, song_dir: str,
+                          on_trend: Optional[Callable[[Dict], None]] = None,
+                          serializer: Optional[DatasetSerializer] = None) -> Dict:
+    """Write the dataset as a small manifest plus one shard file per trend.
+
+    song_dir/manifest.json holds song_metadata, spotify_data, aggregate_metrics
+    and each trend's headline numbers with the name of its shard; each
+    trend_NNN.json shard holds the complete trend (count_by_date, top_examples,
+    creative text...). Shards are written as trends are generated and the
+    manifest last, so a reader never finds a manifest pointing at missing
+    shards. on_trend works as in write_dataset_stream. Without a serializer,
+    shards are compact and the manifest indented. Returns the aggregate_metrics dict.
+    """
+    shard_serializer = serializer or DatasetSerializer(indent=None)
+    manifest_serializer = serializer or DEFAULT_SERIALIZER
+    os.makedirs(song_dir, exist_ok=True)
+    headlines = []
+    totals = TrendAccumulator()
+    for i, trend in enumerate(generator.iter_trends(totals)):
+        shard = f"trend_{i:03d}.json"
+        shard_serializer.write(os.path.join(song_dir, shard), trend)
+        headlines.append(dict(trend_headline(trend), shard=shard))
+        if on_trend:
+            on_trend(trend)
+    
+    aggregate_metrics = totals.aggregate_metrics(generator.config)
+    manifest_serializer.write(os.path.join(song_dir, SHARD_MANIFEST), {
+        "song_metadata": generator._generate_song_metadata(),
+        "spotify_data": generator._generate_spotify_data(),
+        "trends": headlines,
+        "aggregate_metrics": aggregate_metrics,
+        "generated_at": datetime.now().isoformat(),
+        "data_version": "2.0"
+    })
+    
+    # Drop shards left over from an earlier run with more trends
+    for name in os.listdir(song_dir):
+        match = re.fullmatch(r'trend_(\d+)\.json(?:\.gz)?', name)
+        if match and int(match.group(1)) >= len(headlines):
+            os.remove(os.path.join(song_dir, name))
+    return aggregate_metrics
+
+def write_shard_index(out_dir: str, serializer: Optional[DatasetSerializer] = None) -> List[Dict]:
+    """Write out_dir/index.json listing every sharded song in out_dir; returns its entries"""
+    songs = []
+    for name in sorted(os.listdir(out_dir)):
+        manifest_path = os.path.join(out_dir, name, SHARD_MANIFEST)
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            continue
+        songs.append({
+            "id": name,
+            "title": manifest["song_metadata"]["title"],
+            "artist": manifest["song_metadata"]["artist"],
+            "manifest": f"{name}/{SHARD_MANIFEST}",
+            "total_trends": manifest["aggregate_metrics"]["total_trends"],
+            "total_views": manifest["aggregate_metrics"]["total_views"]
+        })
+    (serializer or DEFAULT_SERIALIZER).write(os.path.join(out_dir, SHARD_INDEX), {"songs": songs})
+    return songs
+
+def read_dataset_trends(path: str) -> Iterator[Dict]:
+    """Yield the trends of a dataset written as JSON, NDJSON or a shard manifest"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.ndjson'):
+            for line in f:
+                record = json.loads(line)
+                if record.get("record") == "trend":
+                    yield record["trend"]
+            return
+        trends = json.load(f)["trends"]
+    for trend in trends:
+        if "shard" in trend:
+            with open(os.path.join(os.path.dirname(path), trend["shard"]), 'r', encoding='utf-8') as f:
+                trend = json.load(f)
+        yield trend
+
+# Raw columnar layout: magic, little-endian uint32 header length, JSON header,
+# then each array at a 64-byte aligned offset recorded in the header
+COLUMNAR_MAGIC = b"TRNDCOL1"
+_COLUMNAR_ALIGN = 64
+
+class ColumnarSeriesExport:
+    """Collects count_by_date and weekly_summary of trends as flat typed columns.
+
+    Point columns (date, value, trend) hold one row per day; week_* columns hold
+    one row per weekly_summary entry. Dates are int32 days since 1970-01-01 and
+    trend is the index of the trend in the dataset. Feed it trends with add(),
+    e.g. as the on_trend hook of a dataset writer, then save().
+    """
+    
+    def __init__(self):
+        self.trend_names = []
+        self._columns = {name: [] for name in (
+            "date", "value", "trend",
+            "week_trend", "week_start", "week_end", "week_total", "week_avg", "week_peak", "week_growth")}
+    
+    def add(self, trend: Dict):
+        index = len(self.trend_names)
+        self.trend_names.append(trend["name"])
+        columns = self._columns
+        
+        # Trends read back from a dataset file carry count_by_date as records
+        series = TimeSeries.coerce(trend["count_by_date"])
+        columns["date"].append(series.days.astype(np.int32))
+        columns["value"].append(series.values)
+        columns["trend"].append(np.full(len(series), index, dtype=np.int32))
+        
+        weeks = trend["weekly_summary"]
+        columns["week_trend"].append(np.full(len(weeks), index, dtype=np.int32))
+        columns["week_start"].append(_epoch_days([w["week_start"] for w in weeks]))
+        columns["week_end"].append(_epoch_days([w["week_end"] for w in weeks]))
+        for name, field, dtype in (("week_total", "total_videos", np.int32), ("week_avg", "avg_daily_videos", np.float32),
+                                   ("week_peak", "peak_day_videos", np.int32), ("week_growth", "growth_rate", np.float32)):
+            columns[name].append(np.fromiter((w[field] for w in weeks), dtype=dtype, count=len(weeks)))
+    
+    def arrays(self) -> Dict[str, np.ndarray]:
+        dtypes = {"week_avg": np.float32, "week_growth": np.float32}
+        return {name: np.concatenate(parts) if parts else np.empty(0, dtype=dtypes.get(name, np.int32))
+                for name, parts in self._columns.items()}
+    
+    def save(self, path: str):
+        """Write the columns to path: .npz via numpy, anything else as the raw mmap layout"""
+        arrays = self.arrays()
+        if path.endswith('.npz'):
+            np.savez(path, trend_names=np.array(self.trend_names, dtype=str), **arrays)
+            return
+        
+        # Offsets are relative to the end of the header block, which is itself aligned
+        layout, offset = {}, 0
+        for name, array in arrays.items():
+            layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset += -(-array.nbytes // _COLUMNAR_ALIGN) * _COLUMNAR_ALIGN
+        header = json.dumps({"version": 1, "trend_names": self.trend_names, "arrays": layout}).encode('utf-8')
+        header_end = len(COLUMNAR_MAGIC) + 4 + len(header)
+        header += b' ' * (-header_end % _COLUMNAR_ALIGN)
+        
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(COLUMNAR_MAGIC)
+            f.write(len(header).to_bytes(4, 'little'))
+            f.write(header)
+            for name, array in arrays.items():
+                data = array.astype(array.dtype.newbyteorder('<'), copy=False).tobytes()
+                f.write(data)
+                f.write(b'\0' * (-len(data) % _COLUMNAR_ALIGN))
+        os.replace(tmp_path, path)
+
+def _epoch_days(dates: List[str]) -> np.ndarray:
+    return np.array(dates, dtype='datetime64[D]').astype(np.int32)
+
+def load_columnar(path: str) -> Dict[str, Any]:
+    """Load a columnar series export without parsing: raw files are memory-mapped.
+
+    Returns the column arrays by name plus "trend_names" (a list of str).
+    """
+    if path.endswith('.npz'):
+        with np.load(path) as data:
+            columns = {name: data[name] for name in data.files}
+        columns["trend_names"] = columns["trend_names"].tolist()
+        return columns
+    
+    with open(path, 'rb') as f:
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"{path} is not a columnar series export")
+        header_length = int.from_bytes(f.read(4), 'little')
+        header = json.loads(f.read(header_length))
+    data_start = len(COLUMNAR_MAGIC) + 4 + header_length
+    
+    columns = {"trend_names": header["trend_names"]}
+    for name, spec in header["arrays"].items():
+        shape = tuple(spec["shape"])
+        if not np.prod(shape):
+            columns[name] = np.empty(shape, dtype=spec["dtype"])  # mmap can't map zero bytes
+        else:
+            columns[name] = np.memmap(path, dtype=spec["dtype"], mode='r', offset=data_start + spec["offset"], shape=shape)
+    return columns
+
+DEFAULT_CACHE_DIR = ".mock_data_cache"
+
+class PipelineCache:
+    """On-disk, content-addressed cache for parsed research and generated datasets.
+
+    Entries live at <root>/<kind>/<key[:2]>/<key>. A hit refreshes the entry's
+    mtime. The cache's size is tracked from each put, and only a put that takes
+    it over max_bytes walks the directory, evicting least-recently-used entries
+    down to 90% of the limit. Keys include a fingerprint of the source of this
+    module, research_parser and spotify_streams, so editing the parser, the
+    stream reader or the generator invalidates old entries.
+    """
+    
+    _fingerprint = None
+    
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_bytes: int = 512 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._size = None  # Bytes in the cache as of the last walk, plus puts since
+    
+    @classmethod
+    def _code_fingerprint(cls) -> bytes:
+        if cls._fingerprint is None:
+            digest = hashlib.sha256()
+            for module_file in (__file__, research_parser.__file__, spotify_streams.__file__):
+                with open(os.path.abspath(module_file), 'rb') as f:
+                    digest.update(f.read())
+            cls._fingerprint = digest.digest()
+        return cls._fingerprint
+    
+    def key(self, kind: str, content: bytes) -> str:
+        """Content hash for an entry of the given kind"""
+        digest = hashlib.sha256(self._code_fingerprint())
+        digest.update(kind.encode('utf-8') + b'\0')
+        digest.update(content)
+        return digest.hexdigest()
+    
+    def _path(self, kind: str, key: str) -> str:
+        return os.path.join(self.root, kind, key[:2], key)
+    
+    def get_path(self, kind: str, key: str) -> Optional[str]:
+        """Path of a cached entry (marking it recently used), or None on a miss"""
+        path = self._path(kind, key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+    
+    def put_file(self, kind: str, key: str, source_path: str):
+        """Copy source_path into the cache under key"""
+        import shutil
+        
+        path = self._path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique temp name so concurrent batch workers never see a half-written entry
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        shutil.copyfile(source_path, tmp_path)
+        os.replace(tmp_path, path)
+        self._added(path)
+    
+    def get_json(self, kind: str, key: str) -> Optional[Any]:
+        path = self.get_path(kind, key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None  # Evicted or replaced concurrently
+    
+    def put_json(self, kind: str, key: str, value: Any):
+        path = self._path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+        self._added(path)
+    
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+    
+    def _added(self, path: str):
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        else:
+            # Replacing an entry counts it twice; overestimating just means an earlier walk
+            self._size += os.path.getsize(path)
+        if self._size > self.max_bytes:
+            # Leave headroom, so a full cache isn't walked again on the very next put
+            self.evict(int(self.max_bytes * 0.9))
+    
+    def evict(self, target: Optional[int] = None):
+        """Delete least-recently-used entries until the cache fits in target (default: max_bytes)"""
+        target = self.max_bytes if target is None else target
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._size = total
+    
+    def clear(self):
+        import shutil
+        
+        shutil.rmtree(self.root, ignore_errors=True)
+        self._size = None
+
+def _cache_key_default(value: Any) -> Any:
+    # Config dates move with the clock; a dataset generated today is reusable all day
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    return str(value)
+
+def dataset_cache_key(cache: PipelineCache, generator: TikTokTrendMockDataGenerator, seed: int,
+                      output_format: str) -> str:
+    """Cache key for a generated dataset: merged research, seed, generator config and output format"""
+    payload = {
+        "format": output_format,
+        "seed": seed,
+        "song_title": generator.song_title,
+        "artist": generator.artist,
+        "real_creative_example": generator.real_creative_example,
+        "parsed_data": generator.parsed_data,
+        "config": generator.config,
+        "templates": generator.templates.data
+    }
+    if generator.stream_series is not None:
+        series = generator.stream_series
+        payload["stream_series"] = hashlib.sha256(
+            series.days.tobytes() + series.streams.tobytes() + series.change.tobytes()).hexdigest()
+    return cache.key("dataset", json.dumps(payload, sort_keys=True, default=_cache_key_default).encode('utf-8'))
+
+def write_dataset_cached(generator: TikTokTrendMockDataGenerator, output_path: str, seed: Optional[int] = None,
+                         cache: Optional[PipelineCache] = None, ndjson: bool = False,
+                         on_trend: Optional[Callable[[Dict], None]] = None,
+                         serializer: Optional[DatasetSerializer] = None) -> Optional[Dict]:
+    """Write the generator's dataset to output_path, reusing a cached copy when one exists.
+
+    Datasets are only cached for seeded runs, since unseeded output is meant to
+    differ every time. on_trend sees every trend, whether generated or read back
+    from the cached file. Returns aggregate_metrics, or None when the file came
+    from the cache.
+    """
+    serializer = serializer or DEFAULT_SERIALIZER
+    key = None
+    if cache is not None and seed is not None:
+        output_format = "ndjson" if ndjson else "json"
+        key = dataset_cache_key(cache, generator, seed, f"{output_format}:{serializer.name}")
+        cached_path = cache.get_path("dataset", key)
+        if cached_path is not None:
+            import shutil
+            
+            try:
+                with open(cached_path, "r") as cached, serializer.open(output_path) as f:
+                    shutil.copyfileobj(cached, f)
+                if on_trend:
+                    for trend in read_dataset_trends(output_path):
+                        on_trend(trend)
+                return None
+            except FileNotFoundError:
+                pass  # Evicted between lookup and copy; regenerate
+    
+    # Write to a temp file first so an interrupted run never leaves a truncated output
+    with serializer.open(output_path) as f:
+        if ndjson:
+            aggregate_metrics = write_dataset_ndjson(generator, f, on_trend, serializer)
+        else:
+            aggregate_metrics = write_dataset_stream(generator, f, on_trend, serializer)
+    
+    if key is not None:
+        cache.put_file("dataset", key, output_path)
+    return aggregate_metrics
+
+# Optional real creative example attached to the first trend
+REAL_CREATIVE_EXAMPLE = {
+    "description": "Original dance created by @originalcreator",
+    "video_url": "https://www.tiktok.com/@originalcreator/video/123456",
+    "engagement": {
+        "views": 5000000,
+        "likes": 750000,
+        "shares": 100000
+    }
+}
+
+BATCH_CHECKPOINT = "batch_checkpoint.jsonl"
+
+def merge_all_parsed_data(parsed: List[Optional[Dict]]) -> Dict[str, Any]:
+    """Merge any number of parse results with equal weights, skipping failed parses"""
+    return merge_research_sources(list(parsed))
+
+def load_research(paths: List[str], cache: Optional[PipelineCache] = None,
+                  weights: Optional[List[float]] = None) -> Dict[str, Any]:
+    """Read research files or URLs concurrently and merge them into one parsed-data dict"""
+    return ingest_research(paths, weights, cache)[0]
+
+def song_seed(base_seed: int, song_id: str) -> int:
+    """Derive a stable per-song seed, independent of worker scheduling and PYTHONHASHSEED"""
+    digest = hashlib.sha256(f"{base_seed}:{song_id}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:4], 'big')
+
+def load_manifest(manifest: str) -> List[Dict[str, Any]]:
+    """Load batch entries from a JSONL manifest or a directory of research files.
+
+    JSONL lines look like {"id": ..., "research": [paths or URLs], "weights":
+    optional [float per source], "seed": optional int, "spotify_csv": optional
+    path, "days"/"granularity": optional analysis window, "display_points"/
+    "display_method": optional display series settings}; relative paths are
+    resolved against the manifest's directory. In a directory, every
+    subdirectory of .txt files is one song, and so is every loose .txt file.
+    """
+    entries = []
+    if os.path.isdir(manifest):
+        for name in sorted(os.listdir(manifest)):
+            path = os.path.join(manifest, name)
+            if os.path.isdir(path):
+                research = sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith('.txt'))
+                if research:
+                    entries.append({"id": name, "research": research})
+            elif name.endswith('.txt'):
+                entries.append({"id": os.path.splitext(name)[0], "research": [path]})
     else:
-        # Default filenames
-        perplexity_file = "perplexity_research.txt"
-        openai_file = "openai_research.txt"
+        base_dir = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                research = entry.get("research") or []
+                if isinstance(research, str):
+                    research = [research]
+                if not research:
+                    raise ValueError(f"{manifest}:{line_number}: entry has no research files")
+                entry["research"] = [p if os.path.isabs(p) or _is_url(p) else os.path.join(base_dir, p) for p in research]
+                if entry.get("spotify_csv") and not os.path.isabs(entry["spotify_csv"]):
+                    entry["spotify_csv"] = os.path.join(base_dir, entry["spotify_csv"])
+                entry.setdefault("id", os.path.splitext(os.path.basename(entry["research"][0]))[0])
+                entries.append(entry)
+    
+    # Song ids name the output files, so they must stay unique once made file-safe
+    seen = {}
+    for entry in entries:
+        name = _safe_id(entry["id"])
+        if name in seen:
+            clash = "" if seen[name] == entry["id"] else f" (same output name as {seen[name]!r})"
+            raise ValueError(f"{manifest}: duplicate song id {entry['id']!r}{clash}")
+        seen[name] = entry["id"]
+    return entries
+
+def _safe_id(song_id: str) -> str:
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', str(song_id)).strip('._') or "song"
+
+def _batch_output_path(out_dir: str, song_id: str, sharded: bool = False) -> str:
+    if sharded:
+        return os.path.join(out_dir, _safe_id(song_id), SHARD_MANIFEST)
+    return os.path.join(out_dir, f"{_safe_id(song_id)}.json")
+
+def _generate_batch_entry(entry: Dict[str, Any], seed: int, output_path: str,
+                          cache: Optional[PipelineCache] = None, templates: Optional[str] = None,
+                          sharded: bool = False, serializer: Optional[DatasetSerializer] = None) -> Dict[str, Any]:
+    """Worker: generate and write the dataset for one manifest entry"""
+    merged_data = load_research(entry["research"], cache, entry.get("weights"))
+    generator = TikTokTrendMockDataGenerator(
+        song_title=entry.get("song_title") or merged_data['song_title'],
+        artist=entry.get("artist") or merged_data['artist'],
+        real_creative_example=entry.get("real_creative_example", REAL_CREATIVE_EXAMPLE),
+        parsed_data=merged_data,
+        stream_series=StreamsReader(entry["spotify_csv"], state_path="").read() if entry.get("spotify_csv") else None,
+        seed=seed,
+        templates=load_template_registry(templates)
+    )
+    if entry.get("num_trends"):
+        generator.config["num_trends"] = int(entry["num_trends"])
+    generator.set_analysis_window(int(entry.get("days") or 30), entry.get("granularity") or "day")
+    generator.set_display_series(int(entry.get("display_points", DEFAULT_DISPLAY_POINTS)),
+                                 entry.get("display_method") or "minmax")
+    
+    if sharded:
+        aggregate_metrics = write_dataset_sharded(generator, os.path.dirname(output_path), serializer=serializer)
+    else:
+        aggregate_metrics = write_dataset_cached(generator, output_path, seed, cache, serializer=serializer)
+    
+    return {
+        "id": entry["id"],
+        "output": output_path,
+        "seed": seed,
+        "cached": aggregate_metrics is None
+    }
+
+def _batch_params(entry: Dict[str, Any], templates: Optional[str], sharded: bool) -> Dict[str, Any]:
+    """Everything but the seed that a song's batch output depends on, in the form its checkpoint stores"""
+    params = {key: value for key, value in entry.items() if key not in ("id", "seed")}
+    params.update(templates=templates, sharded=sharded)
+    return json.loads(json.dumps(params, sort_keys=True))
+
+def _load_checkpoint(checkpoint_path: str) -> Dict[str, Dict]:
+    done = {}
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Partial line from an interrupted run
+                done[record["id"]] = record
+    return done
+
+def run_batch(manifest: str, out_dir: str, workers: Optional[int] = None, base_seed: int = 0,
+              resume: bool = True, cache: Optional[PipelineCache] = None,
+              templates: Optional[str] = None, sharded: bool = False,
+              serializer: Optional[DatasetSerializer] = None,
+              defaults: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Generate one dataset per manifest entry across a process pool.
+
+    Completed songs are appended to a checkpoint file in out_dir with their seed
+    and generation settings; with resume enabled, songs already checkpointed with
+    the same seed and settings (and whose output still exists) are skipped.
+    With sharded, each song is written by write_dataset_sharded to its own
+    subdirectory and out_dir/index.json lists them all. defaults holds entry
+    keys (e.g. "days") for every song; each manifest entry overrides them.
+    """
+    entries = load_manifest(manifest)
+    os.makedirs(out_dir, exist_ok=True)
+    checkpoint_path = os.path.join(out_dir, BATCH_CHECKPOINT)
+    done = _load_checkpoint(checkpoint_path) if resume else {}
+    
+    pending = []
+    params = {}
+    for entry in entries:
+        entry = {**(defaults or {}), **entry}
+        seed = entry["seed"] if entry.get("seed") is not None else song_seed(base_seed, entry["id"])
+        params[entry["id"]] = _batch_params(entry, templates, sharded)
+        record = done.get(entry["id"])
+        if record and os.path.exists(record["output"]):
+            if record.get("seed") == seed and record.get("params") == params[entry["id"]]:
+                continue
+            print(f"Warning: {entry['id']}: seed or settings changed since it was checkpointed; regenerating")
+        pending.append((entry, seed, _batch_output_path(out_dir, entry["id"], sharded), cache, templates, sharded, serializer))
+    
+    print(f"📦 {len(entries)} songs in manifest, {len(entries) - len(pending)} already done, {len(pending)} to generate")
+    
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor, \
+            open(checkpoint_path, 'a' if resume else 'w', encoding='utf-8') as checkpoint:
+        futures = {executor.submit(_generate_batch_entry, *job): job[0]["id"] for job in pending}
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except Exception as e:
+                print(f"Error generating {futures[future]}: {e}")
+                continue
+            record["params"] = params[record["id"]]
+            checkpoint.write(json.dumps(record) + "\n")
+            checkpoint.flush()
+            results.append(record)
+    
+    if sharded:
+        write_shard_index(out_dir, serializer)
+    print(f"✅ Generated {len(results)} of {len(pending)} songs into {out_dir}")
+    return results
+
+class DatasetWatcher:
+    """Keeps output_path in step with a set of research sources and a Spotify stream export.
+    
+    Every poll() compares the mtime and size of each local source and the export
+    with what was last seen, and regenerates only the sections that depend on
+    what changed. A research edit re-derives song_metadata and the trends, but
+    a count_by_date whose simulation inputs are unchanged is taken from the
+    previous run instead of being simulated again; a grown export only redoes
+    spotify_data. Generation is seeded and dates are kept from the first run,
+    so each write equals a full run with the same seed. URLs are read but not
+    watched.
+    """
+    
+    def __init__(self, sources: List[str], output_path: str = "trend_analysis_output.json",
+                 spotify_csv: Optional[str] = None, weights: Optional[List[float]] = None,
+                 seed: Optional[int] = None, templates: Optional[str] = None,
+                 cache: Optional[PipelineCache] = None, concurrency: int = 8,
+                 serializer: Optional[DatasetSerializer] = None, days: int = 30, granularity: str = "day",
+                 display_points: int = DEFAULT_DISPLAY_POINTS, display_method: str = "minmax"):
+        self.sources = sources
+        self.output_path = output_path
+        self.spotify_csv = spotify_csv
+        self.weights = weights
+        self.seed = np.random.SeedSequence().entropy if seed is None else seed
+        self.templates = load_template_registry(templates)
+        self.cache = cache
+        self.concurrency = concurrency
+        self.serializer = serializer or DEFAULT_SERIALIZER
+        self.days = days
+        self.granularity = granularity
+        self.display = (display_points, display_method)
+        self.reader = StreamsReader(spotify_csv) if spotify_csv else None
+        self.stream_series = None
+        self.watched = [source for source in sources if not _is_url(source)] + ([spotify_csv] if spotify_csv else [])
+        self.stamps = {}
+        self.merged = None
+        self.generator = None
+        self.dataset = None
+    
+    def _stamp(self, path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def poll(self) -> List[str]:
+        """Regenerate and rewrite the output if any watched file changed; returns the changed files"""
+        stamps = {path: self._stamp(path) for path in self.watched}
+        changed = [path for path in self.watched if stamps[path] != self.stamps.get(path)]
+        if self.generator is not None and not changed:
+            return []
+        self.stamps = stamps
+        
+        if self.reader is not None and (self.generator is None or self.spotify_csv in changed):
+            self.stream_series = self.reader.read() if stamps[self.spotify_csv] else None
+        
+        if self.generator is None or any(path != self.spotify_csv for path in changed):
+            merged, _ = ingest_research(self.sources, self.weights, self.cache, self.concurrency)
+            self._regenerate(merged)
+        else:
+            # Only the export changed: trends and song metadata don't depend on it
+            self.generator.stream_series = self.stream_series
+            self.dataset["spotify_data"] = self.generator._generate_spotify_data()
+            self.dataset["generated_at"] = datetime.now().isoformat()
+            print("🔁 Spotify streams changed: regenerated spotify_data")
+        self.write()
+        return changed
+    
+    def _regenerate(self, merged: Dict[str, Any]):
+        previous = self.generator
+        generator = TikTokTrendMockDataGenerator(
+            song_title=merged['song_title'],
+            artist=merged['artist'],
+            real_creative_example=REAL_CREATIVE_EXAMPLE,
+            parsed_data=merged,
+            stream_series=self.stream_series,
+            seed=self.seed,
+            templates=self.templates
+        )
+        generator.series_memo = {}
+        if previous is not None:
+            generator.config = previous.config
+            generator.series_reuse = previous.series_memo
+        else:
+            generator.set_analysis_window(self.days, self.granularity)
+            generator.set_display_series(*self.display)
+        
+        totals = TrendAccumulator()
+        trends = list(generator.iter_trends(totals))
+        if previous is not None and previous.stream_series is self.stream_series:
+            spotify_data = self.dataset["spotify_data"]
+        else:
+            spotify_data = generator._generate_spotify_data()
+        self.dataset = {
+            "song_metadata": generator._generate_song_metadata(),
+            "spotify_data": spotify_data,
+            "trends": trends,
+            "aggregate_metrics": totals.aggregate_metrics(generator.config),
+            "generated_at": datetime.now().isoformat(),
+            "data_version": "2.0"
+        }
         
-        # Fall back to input.txt if neither research file exists
-        if not os.path.exists(perplexity_file) and not os.path.exists(openai_file):
-            if os.path.exists("input.txt"):
-                print("📝 Research files not found. Using input.txt as fallback.")
-                perplexity_file = "input.txt"
-                openai_file = "input.txt"
-    
-    # Parse both input files
+        if previous is None:
+            print(f"🎵 Generated '{generator.song_title}' by {generator.artist} (seed {self.seed})")
+        else:
+            fields = [field for field in merged if merged[field] != self.merged.get(field)]
+            reused = sum(key in generator.series_reuse for key in generator.series_memo)
+            print(f"🔁 Research changed ({', '.join(fields) or 'no parsed fields'}): "
+                  f"regenerated trends, reused {reused} of {len(trends)} count_by_date series")
+        self.merged = merged
+        self.generator = generator
+    
+    def write(self):
+        """Atomically replace output_path with the current dataset"""
+        self.serializer.write(self.output_path, self.dataset)
+    
+    def run(self, interval: float = 1.0):
+        """Poll every interval seconds until interrupted"""
+        print(f"👀 Watching {', '.join(self.watched) or 'nothing local'} (Ctrl+C to stop)")
+        try:
+            while True:
+                try:
+                    if self.poll():
+                        print(f"💾 Saved to: {self.output_path}")
+                except (OSError, ValueError, KeyError) as e:
+                    # A file caught mid-save parses badly; the next change retries
+                    print(f"Warning: regeneration failed: {e}")
+                    if self.generator is None:
+                        raise
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("\n👋 Stopped watching")
+
+def _read_research_sources(research_files: List[str], weights: Optional[List[float]] = None,
+                           cache: Optional[PipelineCache] = None,
+                           concurrency: int = 8) -> Tuple[Dict[str, Any], List[str]]:
+    """Read and merge the given research sources, or the default perplexity/openai pair; returns (merged data, sources used)"""
+    sources = research_files or _default_research_sources()
     print(f"📖 Reading research files...")
-    perplexity_data = parse_input_file(perplexity_file)
-    openai_data = parse_input_file(openai_file)
+    return ingest_research(sources, weights, cache, concurrency)
+
+def _default_research_sources() -> List[str]:
+    # Default filenames
+    perplexity_file = "perplexity_research.txt"
+    openai_file = "openai_research.txt"
+    
+    # Fall back to input.txt if neither research file exists
+    if not os.path.exists(perplexity_file) and not os.path.exists(openai_file):
+        if os.path.exists("input.txt"):
+            print("📝 Research files not found. Using input.txt as fallback.")
+            perplexity_file = "input.txt"
+            openai_file = "input.txt"
+    return [perplexity_file, openai_file]
+
+# Example usage
+def main(argv: Optional[List[str]] = None):
+    import argparse
     
-    # Merge the data
-    merged_data = merge_parsed_data(perplexity_data, openai_data)
+    parser = argparse.ArgumentParser(description="Generate TikTok trend mock data from research files")
+    parser.add_argument("research_files", nargs="*",
+                        help="research files or http(s) URLs, read concurrently (default: perplexity and openai research)")
+    parser.add_argument("--weights", type=lambda value: [float(w) for w in value.split(',')], metavar="W1,W2,...",
+                        help="per-source weights for merging demographics (default: equal)")
+    parser.add_argument("--concurrency", type=int, default=8, help="research sources read at once")
+    parser.add_argument("--seed", type=int, help="seed for reproducible output (base seed in batch mode)")
+    parser.add_argument("--days", type=int, default=30,
+                        help=f"analysis window in days ({MIN_WINDOW_DAYS}-{MAX_WINDOW_DAYS})")
+    parser.add_argument("--granularity", choices=GRANULARITIES, default="day",
+                        help="trend series resolution; hourly adds count_by_hour, which rolls up into count_by_date")
+    parser.add_argument("--display-points", type=int, default=DEFAULT_DISPLAY_POINTS, metavar="N",
+                        help="point budget of count_by_date_display and count_by_hour_display (0: never)")
+    parser.add_argument("--display-method", choices=DOWNSAMPLE_METHODS, default="minmax",
+                        help="downsampling for the *_display series: bucket min/max or largest-triangle-three-buckets")
+    parser.add_argument("--ndjson", action="store_true",
+                        help="stream compact NDJSON (one trend per line) to trend_analysis_output.ndjson")
+    parser.add_argument("--sharded", action="store_true",
+                        help="write a small manifest plus one file per trend under trend_analysis_output/<song>/ "
+                             "(under --out-dir/<id>/ in batch mode), with an index.json of all songs")
+    parser.add_argument("--compact", action="store_true",
+                        help="write JSON without indentation (smaller and several times faster to encode)")
+    parser.add_argument("--float-digits", type=int, metavar="N", help="round every float in the output to N digits")
+    parser.add_argument("--gzip", type=int, nargs="?", const=9, metavar="LEVEL",
+                        help="also write a precompressed .gz next to every output file, in the same pass")
+    parser.add_argument("--columnar", metavar="PATH",
+                        help="also export count_by_date/weekly_summary columns (.npz, or raw mmap layout otherwise)")
+    parser.add_argument("--profile", nargs="?", const="profile_report.json", metavar="REPORT",
+                        help="record per-stage time, call counts and memory peaks to a JSON report")
+    parser.add_argument("--profile-cprofile", metavar="PATH", help="with --profile, also dump cProfile stats to PATH")
+    parser.add_argument("--spotify-csv", nargs="?", const=DEFAULT_STREAMS_CSV, metavar="CSV",
+                        help=f"use a real Spotify stream export for spotify_data (default: {DEFAULT_STREAMS_CSV})")
+    parser.add_argument("--video-corpus", type=int, metavar="N",
+                        help="also generate N example videos in bulk (for load testing) and write them to --corpus-out")
+    parser.add_argument("--corpus-out", default="video_corpus.jsonl",
+                        help="video corpus output: .jsonl/.ndjson lines, anything else as .npz columns")
+    parser.add_argument("--scenarios", type=int, metavar="K",
+                        help="also draw K scenarios per trend and write p10/p50/p90 bands to --bands-out")
+    parser.add_argument("--bands-out", default="trend_bands.json", help="output for --scenarios percentile bands")
+    parser.add_argument("--templates", metavar="JSON",
+                        help="trend templates and text tables replacing the built-in ones section by section")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and rewrite trend_analysis_output.json whenever the research files "
+                             "or --spotify-csv change, regenerating only the affected sections")
+    parser.add_argument("--watch-interval", type=float, default=1.0, metavar="SECONDS",
+                        help="how often --watch checks the files for changes")
+    parser.add_argument("--research-dir", metavar="DIR",
+                        help="parse and merge every .txt research file in DIR instead of a file pair")
+    parser.add_argument("--batch", metavar="MANIFEST", help="JSONL manifest or directory of songs to generate")
+    parser.add_argument("--out-dir", default="batch_output", help="output directory for batch mode")
+    parser.add_argument("--workers", type=int, help="worker processes for batch mode and --research-dir (default: CPU count)")
+    parser.add_argument("--no-resume", action="store_true", help="ignore the batch checkpoint and regenerate everything")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="parse/dataset cache directory")
+    parser.add_argument("--cache-max-mb", type=int, default=512, help="cache size limit before LRU eviction")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the parse/dataset cache")
+    parser.add_argument("--clear-cache", action="store_true", help="empty the cache before running")
+    args = parser.parse_args(argv)
+    if not MIN_WINDOW_DAYS <= args.days <= MAX_WINDOW_DAYS:
+        parser.error(f"--days must be between {MIN_WINDOW_DAYS} and {MAX_WINDOW_DAYS}")
+    if args.display_points and args.display_points < 3:
+        parser.error("--display-points must be 0 or at least 3")
+    if args.profile and (args.batch or args.watch):
+        parser.error("--profile covers a single run; it can't be combined with --batch or --watch")
+    if args.weights is not None:
+        if any(w <= 0 for w in args.weights):
+            parser.error("--weights must all be positive")
+        sources = args.research_files or _default_research_sources()
+        if not (args.batch or args.research_dir) and len(args.weights) != len(sources):
+            parser.error(f"got {len(args.weights)} --weights for {len(sources)} research sources")
+    serializer = None
+    if args.compact or args.float_digits is not None or args.gzip is not None:
+        # Otherwise each output keeps its own default (indented JSON, compact shards)
+        serializer = DatasetSerializer(None if args.compact else 2, args.float_digits, args.gzip)
+    
+    cache = None if args.no_cache else PipelineCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+    if args.clear_cache:
+        PipelineCache(args.cache_dir).clear()
+        print(f"🧹 Cleared cache at {args.cache_dir}")
+    
+    profiler = None
+    if args.profile:
+        # Profile real work: cache hits would skip the stages being measured
+        cache = None
+        profiler = StageProfiler().start()
+        if args.profile_cprofile:
+            import cProfile
+            
+            cprofiler = cProfile.Profile()
+            cprofiler.enable()
+    
+    if args.batch:
+        run_batch(args.batch, args.out_dir, workers=args.workers, base_seed=args.seed or 0,
+                  resume=not args.no_resume, cache=cache, templates=args.templates, sharded=args.sharded,
+                  serializer=serializer,
+                  defaults={"days": args.days, "granularity": args.granularity,
+                            "display_points": args.display_points, "display_method": args.display_method})
+        return
+    
+    if args.watch:
+        watcher = DatasetWatcher(args.research_files or _default_research_sources(), "trend_analysis_output.json",
+                                 spotify_csv=args.spotify_csv, weights=args.weights, seed=args.seed,
+                                 templates=args.templates, cache=cache, concurrency=args.concurrency,
+                                 serializer=serializer, days=args.days, granularity=args.granularity,
+                                 display_points=args.display_points, display_method=args.display_method)
+        watcher.run(args.watch_interval)
+        return
+    
+    with profiler.stage("read_research") if profiler else contextlib.nullcontext():
+        if args.research_dir:
+            print(f"📖 Reading research files from {args.research_dir}...")
+            parsed_files = parse_directory(args.research_dir, workers=args.workers, cache=cache)
+            used_files = [path for path, parsed in parsed_files.items() if parsed]
+            merged_data = merge_all_parsed_data(parsed_files[path] for path in used_files)
+        else:
+            merged_data, used_files = _read_research_sources(args.research_files, args.weights, cache, args.concurrency)
     
     # Extract song and artist info
     song_title = merged_data['song_title']
@@ -1127,43 +2775,77 @@ def main():
         print(f"📱 Suggested trend types: {', '.join(merged_data['trend_types'])}")
     
     # Show which files were used
-    if perplexity_data and openai_data and perplexity_file != openai_file:
-        print(f"🔄 Merged data from: {perplexity_file} + {openai_file}")
-    elif perplexity_data:
-        print(f"📄 Using data from: {perplexity_file}")
-    elif openai_data:
-        print(f"📄 Using data from: {openai_file}")
-    
-    # Optional: Add a real creative example
-    real_creative = {
-        "description": "Original dance created by @originalcreator",
-        "video_url": "https://www.tiktok.com/@originalcreator/video/123456",
-        "engagement": {
-            "views": 5000000,
-            "likes": 750000,
-            "shares": 100000
-        }
-    }
+    if len(used_files) > 3:
+        print(f"🔄 Merged data from {len(used_files)} research files")
+    elif len(used_files) > 1:
+        print(f"🔄 Merged data from: {' + '.join(used_files)}")
+    elif used_files:
+        print(f"📄 Using data from: {used_files[0]}")
     
     # Generate the data
     generator = TikTokTrendMockDataGenerator(
         song_title=song_title,
         artist=artist,
-        real_creative_example=real_creative,  # Optional
-        parsed_data=merged_data  # Pass the merged data
+        real_creative_example=REAL_CREATIVE_EXAMPLE,  # Optional
+        parsed_data=merged_data,  # Pass the merged data
+        stream_series=StreamsReader(args.spotify_csv).read() if args.spotify_csv else None,
+        seed=args.seed,
+        templates=load_template_registry(args.templates)
     )
+    generator.set_analysis_window(args.days, args.granularity)
+    generator.set_display_series(args.display_points, args.display_method)
+    if profiler:
+        generator.enable_profiling(profiler)
     
-    mock_data = generator.generate_complete_dataset()
-    
-    # Save to file with standard name
-    output_filename = "trend_analysis_output.json"
-    with open(output_filename, "w") as f:
-        json.dump(mock_data, f, indent=2)
+    # Stream to file with standard name, one trend at a time
+    output_filename = "trend_analysis_output.ndjson" if args.ndjson else "trend_analysis_output.json"
+    columnar = ColumnarSeriesExport() if args.columnar else None
+    if args.sharded:
+        output_filename = _batch_output_path("trend_analysis_output", song_title, sharded=True)
+        aggregate_metrics = write_dataset_sharded(generator, os.path.dirname(output_filename),
+                                                  on_trend=columnar.add if columnar else None, serializer=serializer)
+        write_shard_index("trend_analysis_output", serializer)
+    else:
+        aggregate_metrics = write_dataset_cached(generator, output_filename, args.seed, cache, ndjson=args.ndjson,
+                                                 on_trend=columnar.add if columnar else None, serializer=serializer)
+    if columnar:
+        columnar.save(args.columnar)
     
-    print(f"\n✅ Generated mock data for '{song_title}' by {artist}")
-    print(f"📊 Created {len(mock_data['trends'])} trends with {mock_data['aggregate_metrics']['total_videos']} total videos")
-    print(f"📈 Total views: {mock_data['aggregate_metrics']['total_views']:,}")
+    if aggregate_metrics is None:
+        print(f"\n♻️  Reused cached mock data for '{song_title}' by {artist}")
+    else:
+        print(f"\n✅ Generated mock data for '{song_title}' by {artist}")
+        print(f"📊 Created {aggregate_metrics['total_trends']} trends with {aggregate_metrics['total_videos']} total videos")
+        print(f"📈 Total views: {aggregate_metrics['total_views']:,}")
     print(f"💾 Saved to: {output_filename}")
+    if columnar:
+        print(f"🧮 Columnar series: {args.columnar}")
+    
+    if args.scenarios:
+        with profiler.stage("scenario_bands") if profiler else contextlib.nullcontext():
+            (serializer or DEFAULT_SERIALIZER).write(args.bands_out, generator.scenario_bands(args.scenarios))
+        print(f"🎲 p10/p50/p90 bands over {args.scenarios:,} scenarios saved to: {args.bands_out}")
+    
+    if args.video_corpus:
+        with profiler.stage("video_corpus") if profiler else contextlib.nullcontext():
+            corpus = generator.generate_video_corpus(args.video_corpus)
+            corpus.save(args.corpus_out)
+        top = corpus.top_k(1)
+        print(f"🎬 {len(corpus):,} example videos saved to: {args.corpus_out}"
+              + (f" (top play count {top[0].play_count:,})" if top else ""))
+    
+    if profiler:
+        profiler.stop()
+        report = profiler.report()
+        if args.profile_cprofile:
+            cprofiler.disable()
+            cprofiler.dump_stats(args.profile_cprofile)
+            report["cprofile"] = args.profile_cprofile
+        with open(args.profile, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"⏱️  Profile report: {args.profile}")
+        for name, stats in list(report["stages"].items())[:5]:
+            print(f"   {name}: {stats['total_s'] * 1000:.1f} ms over {stats['calls']} calls")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,326 @@
+"""Research file parsing and merging, kept free of NumPy.
+
+parse_input_file() extracts the artist, song, demographics, context and mood
+of one research text; ingest_research() reads several files or URLs at once
+and merge_research_sources() combines them. mock_data re-exports all of these,
+but importing this module alone keeps `trend_cli.py parse` fast to start.
+"""
+import heapq
+import os
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Field labels as (lowercase words located with str.find, pattern checked at each
+# hit). str.find skips through the text far faster than a case-insensitive regex
+# scan; a field uses its first hit the pattern accepts, as re.search would.
+_LABELS = {
+    'artist': (('artist',), re.compile(r'artist(?:\s+name)?:', re.IGNORECASE)),
+    'song_title': (('song',), re.compile(r'song(?:\s+(?:title|name))?:', re.IGNORECASE)),
+    'age': (('age',), re.compile(r'age(?:\s+demographics)?:', re.IGNORECASE)),
+    'gender': (('gender',), re.compile(r'gender(?:\s+demographics)?:', re.IGNORECASE)),
+    'genre': (('genre',), re.compile(r'genre:', re.IGNORECASE)),
+    'context': (('context',), re.compile(r'context:', re.IGNORECASE)),
+    'mood': (('mood', 'vibe', 'style'), re.compile(r'(?:mood|vibe|style):', re.IGNORECASE)),
+}
+_LINE_VALUE_RE = re.compile(r'\s*(.+?)(?:\n|$)')
+_AGE_BUCKET_RES = [(age_range, re.compile(re.escape(age_range) + r'[:\s]+(\d+)'))
+                   for age_range in ('13-17', '18-24', '25-34', '35-44', '45+')]
+_GENDER_LINE_RES = [(gender, re.compile(rf'^{gender}[:\s]+(\d+)', re.IGNORECASE | re.MULTILINE))
+                    for gender in ('female', 'male', 'other')]
+
+# Common mood keywords
+_POSSIBLE_MOODS = ['energetic', 'emotional', 'upbeat', 'chill', 'dramatic', 'melancholic',
+                   'aggressive', 'romantic', 'nostalgic', 'dark', 'happy', 'sad', 'powerful', 'vulnerable']
+
+# Context keywords suggesting each trend type, in the order trend types are reported
+_TREND_TYPE_KEYWORDS = {
+    'dance': ['dance', 'choreography', 'moves'],
+    'transformation': ['transformation', 'transition', 'reveal', 'before/after'],
+    'storytelling': ['pov', 'story', 'scenario', 'relatable'],
+    'lifestyle': ['aesthetic', 'vibe', 'mood', 'lifestyle'],
+    'challenge': ['challenge', 'trend'],
+}
+
+class _LabelFinder:
+    """First label of each field in one research text, located with str.find"""
+    
+    def __init__(self, content: str):
+        self.content = content
+        lower = content.lower()
+        # A few characters lowercase to two; keep them as-is so offsets still match content
+        if len(lower) != len(content):
+            lower = ''.join(c.lower() if len(c.lower()) == 1 else c for c in content)
+        self.lower = lower
+    
+    def ends(self, field: str) -> Iterator[int]:
+        """End offsets of the field's labels, in text order"""
+        words, label_re = _LABELS[field]
+        hits = heapq.merge(*(self._hits(word) for word in words))
+        for pos in hits:
+            match = label_re.match(self.content, pos)
+            if match:
+                yield match.end()
+    
+    def _hits(self, word: str) -> Iterator[int]:
+        pos = self.lower.find(word)
+        while pos != -1:
+            yield pos
+            pos = self.lower.find(word, pos + 1)
+    
+    def first(self, field: str) -> Optional[int]:
+        return next(self.ends(field), None)
+    
+    def section(self, start: int, *end_words: str) -> str:
+        """Text from start up to the nearest of end_words (or, with none found, the end)"""
+        ends = [end for end in (self.lower.find(word, start) for word in end_words) if end != -1]
+        return self.content[start:min(ends, default=len(self.content))]
+
+def parse_research_text(content: str) -> Dict[str, Any]:
+    """Extract artist, song, and context information from research text"""
+    labels = _LabelFinder(content)
+    
+    def line_value(field: str) -> Optional[str]:
+        for pos in labels.ends(field):
+            value = _LINE_VALUE_RE.match(content, pos)
+            if value:
+                return value.group(1).strip()
+        return None
+    
+    artist = line_value('artist') or "Unknown Artist"
+    song_title = line_value('song_title') or "Unknown Song"
+    genre = line_value('genre')
+    
+    # Extract demographics if present
+    demographics = {}
+    age_start = labels.first('age')
+    if age_start is not None:
+        age_text = labels.section(age_start, 'gender')
+        demographics['age'] = {}
+        for age_range, pattern in _AGE_BUCKET_RES:
+            match = pattern.search(age_text)
+            if match:
+                demographics['age'][age_range] = float(match.group(1)) / 100
+    gender_start = labels.first('gender')
+    if gender_start is not None:
+        gender_text = labels.section(gender_start, 'region', 'location', 'additional')
+        demographics['gender'] = {}
+        for gender, pattern in _GENDER_LINE_RES:
+            match = pattern.search(gender_text)
+            if match:
+                demographics['gender'][gender] = float(match.group(1)) / 100
+    
+    # Extract any additional context
+    context_start = labels.first('context')
+    context = labels.section(context_start, 'demographics').strip() if context_start is not None else ""
+    
+    # Extract mood/vibe keywords
+    mood_keywords = []
+    mood_start = labels.first('mood')
+    if mood_start is not None:
+        mood_end = content.find('\n\n', mood_start)
+        mood_text = labels.lower[mood_start:mood_end if mood_end != -1 else len(content)]
+        mood_keywords = [mood for mood in _POSSIBLE_MOODS if mood in mood_text]
+    
+    # Extract trend types mentioned in context
+    context_lower = context.lower()
+    trend_types = [trend_type for trend_type, words in _TREND_TYPE_KEYWORDS.items()
+                   if any(word in context_lower for word in words)]
+    
+    return {
+        'artist': artist,
+        'song_title': song_title,
+        'demographics': demographics,
+        'genre': genre,
+        'context': context,
+        'mood_keywords': mood_keywords,
+        'trend_types': trend_types
+    }
+
+def _parse_cached(content: str, cache: Optional["PipelineCache"] = None) -> Dict[str, Any]:
+    if cache is None:
+        return parse_research_text(content)
+    
+    # Parsed research is keyed by the file's content, not its name or mtime
+    key = cache.key("parse", content.encode('utf-8'))
+    parsed = cache.get_json("parse", key)
+    if parsed is None:
+        parsed = parse_research_text(content)
+        cache.put_json("parse", key, parsed)
+    return parsed
+
+def parse_input_file(filename: str, cache: Optional["PipelineCache"] = None) -> Dict[str, Any]:
+    """Parse input file to extract artist, song, and context information"""
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            content = f.read()
+        return _parse_cached(content, cache)
+        
+    except FileNotFoundError:
+        print(f"Warning: {filename} not found. Using default values.")
+        return None
+    except Exception as e:
+        print(f"Error parsing {filename}: {e}. Using default values.")
+        return None
+
+def parse_directory(directory: str, pattern: str = "*.txt", workers: Optional[int] = None,
+                    cache: Optional["PipelineCache"] = None) -> Dict[str, Optional[Dict]]:
+    """Parse every research file in a directory across a worker pool.
+
+    Returns {path: parse_input_file(path)} in sorted path order. Small directories
+    are parsed in-process, where pool start-up would cost more than it saves.
+    """
+    import glob
+    from concurrent.futures import ProcessPoolExecutor
+    from functools import partial
+    
+    paths = sorted(glob.glob(os.path.join(directory, pattern)))
+    if len(paths) < 32 or workers == 1:
+        return {path: parse_input_file(path, cache) for path in paths}
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunksize = max(1, len(paths) // ((workers or os.cpu_count() or 1) * 4))
+        return dict(zip(paths, executor.map(partial(parse_input_file, cache=cache), paths, chunksize=chunksize)))
+
+def _is_url(source: str) -> bool:
+    return source.startswith(('http://', 'https://'))
+
+def _read_source(source: str, timeout: float) -> str:
+    if _is_url(source):
+        from urllib.request import urlopen
+        
+        with urlopen(source, timeout=timeout) as response:
+            return response.read().decode(response.headers.get_content_charset() or 'utf-8')
+    with open(source, 'r', encoding='utf-8') as f:
+        return f.read()
+
+async def ingest_research_async(sources: List[str], cache: Optional["PipelineCache"] = None,
+                                concurrency: int = 8, timeout: float = 30.0) -> List[Optional[Dict]]:
+    """Read and parse research sources (file paths or http(s) URLs) concurrently.
+
+    At most `concurrency` sources are in flight at once. Returns one parse result
+    per source, in source order, with None for sources that could not be read.
+    """
+    import asyncio
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def ingest(source: str) -> Optional[Dict]:
+        async with semaphore:
+            try:
+                # Blocking reads and parsing run on the default thread pool
+                content = await asyncio.to_thread(_read_source, source, timeout)
+                return await asyncio.to_thread(_parse_cached, content, cache)
+            except FileNotFoundError:
+                print(f"Warning: {source} not found. Using default values.")
+            except Exception as e:
+                print(f"Error reading {source}: {e}. Using default values.")
+            return None
+    
+    return list(await asyncio.gather(*(ingest(source) for source in sources)))
+
+def ingest_research(sources: List[str], weights: Optional[List[float]] = None,
+                    cache: Optional["PipelineCache"] = None, concurrency: int = 8) -> Tuple[Dict[str, Any], List[str]]:
+    """Ingest N research sources concurrently and merge them in one pass; returns (merged data, sources used)"""
+    import asyncio
+    
+    parsed = asyncio.run(ingest_research_async(sources, cache, concurrency))
+    used = list(dict.fromkeys(source for source, data in zip(sources, parsed) if data))
+    return merge_research_sources(parsed, weights), used
+
+def merge_parsed_data(data1: Optional[Dict], data2: Optional[Dict]) -> Dict[str, Any]:
+    """Merge data from two input files, averaging demographics and combining other fields"""
+    return merge_research_sources([data1, data2])
+
+def merge_research_sources(parsed: List[Optional[Dict]], weights: Optional[List[float]] = None) -> Dict[str, Any]:
+    """Merge any number of parse results in a single pass, weighting each source's demographics.
+
+    Failed parses (None) are skipped. Song and artist come from the first source,
+    genre from the first that has one; contexts are concatenated and labelled by
+    source, keywords combined in first-seen order. Age shares are the weighted
+    mean over sources reporting age (a missing bucket counts as 0); gender shares
+    average only the sources reporting that gender. Both are renormalised to
+    sum to 1. A single usable source is returned unchanged.
+    """
+    if weights is None:
+        weights = [1.0] * len(parsed)
+    if len(weights) != len(parsed):
+        raise ValueError(f"got {len(weights)} weights for {len(parsed)} research sources")
+    if any(w <= 0 for w in weights):
+        raise ValueError("research source weights must be positive")
+    
+    sources = [(data, weight) for data, weight in zip(parsed, weights) if data]
+    if not sources:
+        return {
+            'artist': 'Unknown Artist',
+            'song_title': 'Unknown Song',
+            'demographics': {},
+            'genre': None,
+            'context': '',
+            'mood_keywords': [],
+            'trend_types': []
+        }
+    if len(sources) == 1:
+        return sources[0][0]
+    
+    first = sources[0][0]
+    merged = {
+        'artist': first['artist'],
+        'song_title': first['song_title'],
+        'genre': next((data['genre'] for data, _ in sources if data['genre']), None),
+        'context': '',
+        'mood_keywords': [],
+        'trend_types': [],
+        'demographics': {}
+    }
+    
+    contexts = []
+    mood_keywords = {}
+    trend_types = {}
+    # Weighted sums and the weight behind each age bucket / gender
+    age_sums, age_weight, age_sources = {}, 0.0, []
+    gender_sums, gender_weights, gender_sources = {}, {}, []
+    for number, (data, weight) in enumerate(sources, 1):
+        if data['context']:
+            contexts.append(f"[Research {number}]: {data['context']}")
+        # Unique, in first-seen order so the result doesn't depend on hash seeds
+        mood_keywords.update(dict.fromkeys(data['mood_keywords']))
+        trend_types.update(dict.fromkeys(data.get('trend_types', [])))
+        
+        age = data['demographics'].get('age')
+        if age:
+            age_sources.append(age)
+            age_weight += weight
+            for age_range, share in age.items():
+                age_sums[age_range] = age_sums.get(age_range, 0) + weight * share
+        
+        gender = data['demographics'].get('gender')
+        if gender:
+            gender_sources.append(gender)
+            for name, share in gender.items():
+                gender_sums[name] = gender_sums.get(name, 0) + weight * share
+                if share > 0:
+                    gender_weights[name] = gender_weights.get(name, 0) + weight
+    
+    merged['context'] = '\n\n'.join(contexts)
+    merged['mood_keywords'] = list(mood_keywords)
+    merged['trend_types'] = list(trend_types)
+    
+    if len(age_sources) > 1:
+        merged_age = {age_range: total / age_weight for age_range, total in age_sums.items()}
+        # Normalize to ensure sum is 1
+        total = sum(merged_age.values())
+        if total > 0:
+            merged['demographics']['age'] = {k: v/total for k, v in merged_age.items()}
+    elif age_sources:
+        merged['demographics']['age'] = age_sources[0]
+    
+    if len(gender_sources) > 1:
+        merged_gender = {name: total / gender_weights[name] for name, total in gender_sums.items()
+                         if name in gender_weights}
+        total = sum(merged_gender.values())
+        if total > 0:
+            merged['demographics']['gender'] = {k: round(v/total, 3) for k, v in merged_gender.items()}
+    elif gender_sources:
+        merged['demographics']['gender'] = gender_sources[0]
+    
+    return merged
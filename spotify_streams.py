@@ -0,0 +1,184 @@
+"""Columnar ingestion of Spotify stream exports such as `Spotify Streams.csv`.
+
+The export has one quoted "May 31, 2025" date per row followed by the
+cumulative stream count and the day's change. Rows are parsed straight into
+NumPy arrays, gaps are filled on a daily grid, and StreamsReader remembers
+how far into the file it has read so a grown export only parses its new tail.
+"""
+import hashlib
+import json
+import os
+import re
+from datetime import date, datetime
+from typing import Optional, Tuple
+
+import numpy as np
+
+DEFAULT_STREAMS_CSV = "Spotify Streams.csv"
+
+_MONTHS = {name: number for number, name in enumerate(
+    [b"Jan", b"Feb", b"Mar", b"Apr", b"May", b"Jun", b"Jul", b"Aug", b"Sep", b"Oct", b"Nov", b"Dec"], 1)}
+# Change may be blank on the first row of an export
+_ROW_RE = re.compile(rb'^"?([A-Z][a-z]{2})[a-z]* (\d{1,2}), (\d{4})"?,"?(\d+)"?,"?(-?\d*)"?\r?$', re.MULTILINE)
+
+class StreamSeries:
+    """Daily Spotify streams as parallel arrays: epoch day, cumulative streams, daily change"""
+    
+    __slots__ = ("days", "streams", "change")
+    
+    def __init__(self, days: np.ndarray, streams: np.ndarray, change: np.ndarray):
+        self.days = days
+        self.streams = streams
+        self.change = change
+    
+    def __len__(self) -> int:
+        return len(self.days)
+    
+    def filled(self) -> "StreamSeries":
+        """The series on a gap-free daily grid: cumulative streams interpolated, change re-derived"""
+        if len(self.days) < 2 or self.days[-1] - self.days[0] + 1 == len(self.days):
+            return self
+        grid = np.arange(self.days[0], self.days[-1] + 1, dtype=np.int64)
+        streams = np.rint(np.interp(grid, self.days, self.streams)).astype(np.int64)
+        change = np.diff(streams, prepend=streams[0] - self.change[0])
+        # Reported rows keep their reported change
+        change[self.days - self.days[0]] = self.change
+        return StreamSeries(grid, streams, change)
+    
+    def overlaps(self, start_date, days: int) -> bool:
+        """Whether any exported day falls in the `days` days from start_date"""
+        if isinstance(start_date, datetime):
+            start_date = start_date.date()
+        first = np.datetime64(start_date, 'D').astype(np.int64)
+        return bool(len(self.days)) and self.days[0] < first + days and self.days[-1] >= first
+    
+    def resample(self, start_date, days: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(cumulative streams, daily change) on the same daily grid as count_by_date.
+        
+        Days before the export starts or after it ends hold the nearest
+        cumulative value and a change of 0.
+        """
+        series = self.filled()
+        if isinstance(start_date, datetime):
+            start_date = start_date.date()
+        grid = np.datetime64(start_date, 'D').astype(np.int64) + np.arange(days)
+        if not len(series):
+            return np.zeros(days, dtype=np.int64), np.zeros(days, dtype=np.int64)
+        streams = np.rint(np.interp(grid, series.days, series.streams)).astype(np.int64)
+        inside = (grid >= series.days[0]) & (grid <= series.days[-1])
+        change = np.zeros(days, dtype=np.int64)
+        change[inside] = series.change[grid[inside] - series.days[0]]
+        return streams, change
+    
+    def date_strings(self) -> np.ndarray:
+        return self.days.astype('datetime64[D]').astype(str)
+
+def parse_stream_rows(data: bytes) -> StreamSeries:
+    """Parse export rows (any header line is skipped) into a StreamSeries sorted by day"""
+    rows = _ROW_RE.findall(data)
+    if not rows:
+        empty = np.empty(0, dtype=np.int64)
+        return StreamSeries(empty, empty, empty)
+    
+    months, day_numbers, years, streams, change = zip(*rows)
+    iso_dates = [f"{int(y):04d}-{_MONTHS[m]:02d}-{int(d):02d}" for m, d, y in zip(months, day_numbers, years)]
+    days = np.array(iso_dates, dtype='datetime64[D]').astype(np.int64)
+    streams = np.array(streams, dtype=np.int64)
+    change = np.array([int(c) if c else 0 for c in change], dtype=np.int64)
+    return _merge(StreamSeries(days, streams, change))
+
+def _merge(series: StreamSeries, newer: Optional[StreamSeries] = None) -> StreamSeries:
+    """Sort by day, keeping the latest row read for any repeated day"""
+    if newer is not None:
+        series = StreamSeries(*(np.concatenate((getattr(series, name), getattr(newer, name)))
+                                for name in StreamSeries.__slots__))
+    # np.unique keeps the first occurrence, so look at the rows newest-first
+    reversed_days = series.days[::-1]
+    days, first = np.unique(reversed_days, return_index=True)
+    rows = len(series.days) - 1 - first
+    return StreamSeries(days, series.streams[rows], series.change[rows])
+
+def load_streams(path: str = DEFAULT_STREAMS_CSV) -> StreamSeries:
+    """Parse a whole export into a gap-filled StreamSeries"""
+    with open(path, 'rb') as f:
+        return parse_stream_rows(f.read()).filled()
+
+class StreamsReader:
+    """Incremental reader for an export that grows by appended rows.
+    
+    The byte offset of the last complete line read is kept, in memory and in a
+    small sidecar state file, with the file's size and mtime and a hash of the
+    CHECK_WINDOW bytes before the offset. An untouched file is not read at all.
+    When it changed but those bytes still match, it is taken to have grown and
+    read() parses just the new tail; if it shrank below the offset or the bytes
+    differ, the file is parsed again from the start. An unterminated final line
+    is parsed but re-read next time, in case it was still being written.
+    """
+    
+    # Bytes before the offset that must be unchanged for the file to count as appended to
+    CHECK_WINDOW = 1 << 16
+    
+    def __init__(self, path: str = DEFAULT_STREAMS_CSV, state_path: Optional[str] = None):
+        self.path = path
+        self.state_path = state_path if state_path is not None else f"{path}.state.npz"
+        self.offset = 0
+        self.stamp = None
+        self.window_hash = None
+        self.series = None
+        self._load_state()
+    
+    def _load_state(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with np.load(self.state_path) as state:
+                meta = json.loads(str(state["meta"]))
+                series = StreamSeries(state["days"], state["streams"], state["change"])
+            offset, stamp, window_hash = meta["offset"], tuple(meta["stamp"]), meta["window_hash"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return  # Unreadable or older state just means a full parse
+        self.series, self.offset, self.stamp, self.window_hash = series, offset, stamp, window_hash
+    
+    def _save_state(self):
+        if not self.state_path:
+            return
+        meta = json.dumps({"offset": self.offset, "stamp": self.stamp, "window_hash": self.window_hash})
+        tmp_path = f"{self.state_path}.tmp.npz"
+        np.savez(tmp_path, meta=np.array(meta), days=self.series.days,
+                 streams=self.series.streams, change=self.series.change)
+        os.replace(tmp_path, self.state_path)
+    
+    def _window_hash(self, f) -> str:
+        """Hash of the CHECK_WINDOW bytes (or fewer, near the start) before the offset"""
+        start = max(0, self.offset - self.CHECK_WINDOW)
+        f.seek(start)
+        return hashlib.sha256(f.read(self.offset - start)).hexdigest()
+    
+    def read(self) -> StreamSeries:
+        """Return the gap-filled series, parsing only what was appended since the last read"""
+        stat = os.stat(self.path)
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        known = self.series is not None and self.window_hash is not None and self.offset <= stat.st_size
+        if known and stamp == self.stamp:
+            return self.series.filled()
+        with open(self.path, 'rb') as f:
+            appended = known and self._window_hash(f) == self.window_hash
+            start = self.offset if appended else 0
+            f.seek(start)
+            data = f.read()
+            if data or not appended:
+                rows = parse_stream_rows(data)
+                self.series = _merge(self.series, rows) if appended else rows
+                self.offset = start + data.rfind(b'\n') + 1
+                self.window_hash = self._window_hash(f)
+        self.stamp = stamp
+        self._save_state()
+        return self.series.filled()
+
+def streams_by_date(series: StreamSeries, start_date: date, days: int) -> list:
+    """Daily stream changes on a count_by_date grid, as [{"date", "streams"}] records"""
+    if isinstance(start_date, datetime):
+        start_date = start_date.date()
+    _, change = series.resample(start_date, days)
+    dates = (np.datetime64(start_date, 'D') + np.arange(days)).astype(str)
+    return [{"date": d, "streams": c} for d, c in zip(dates.tolist(), change.tolist())]
@@ -0,0 +1,52 @@
+"""Startup checks for the light trend_cli.py subcommands.
+
+parse and regions are run thousands of times by orchestration scripts, so
+each must start within STARTUP_BUDGET_MS and never import NumPy:
+    
+    python3 -m pytest -q test_trend_cli.py
+"""
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from trend_cli import STARTUP_BUDGET_MS
+
+_REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+_CLI = os.path.join(_REPO_DIR, "trend_cli.py")
+
+LIGHT_COMMANDS = {
+    "help": ["--help"],
+    "parse": ["parse", os.path.join(_REPO_DIR, "perplexity_research.txt"), "--compact"],
+    "regions": ["regions", "show", os.path.join(_REPO_DIR, "trend_analysis_output.json"), "--top", "1"],
+}
+
+def _run(args, *flags) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *flags, _CLI, *args], capture_output=True, text=True, check=True)
+
+def _imported_modules(args) -> set:
+    # -X importtime reports every module imported, one "import time: ... | module" line each
+    stderr = _run(args, "-X", "importtime").stderr
+    return {line.rsplit("|", 1)[1].strip() for line in stderr.splitlines() if line.startswith("import time:")}
+
+@pytest.mark.parametrize("command", LIGHT_COMMANDS)
+def test_light_command_skips_numpy(command):
+    modules = _imported_modules(LIGHT_COMMANDS[command])
+    assert "numpy" not in modules
+    assert "mock_data" not in modules
+
+@pytest.mark.parametrize("command", LIGHT_COMMANDS)
+def test_light_command_starts_within_budget(command):
+    # Best of a few runs, so one slow scheduling hiccup doesn't fail the check
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        _run(LIGHT_COMMANDS[command])
+        best = min(best, time.perf_counter() - start)
+    assert best * 1000 <= STARTUP_BUDGET_MS, f"{command} took {best * 1000:.1f} ms"
+
+def test_parse_prints_merged_research():
+    output = _run(LIGHT_COMMANDS["parse"]).stdout
+    assert '"song_title": "Me Jalo"' in output
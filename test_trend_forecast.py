@@ -0,0 +1,47 @@
+"""Phase-classification checks for trend_forecast.py on simulated curves:
+    
+    python3 -m pytest -q test_trend_forecast.py
+"""
+import numpy as np
+import pytest
+
+from mock_data import PHASE_PROFILES, _virality_profile, simulate_trend_curves
+from trend_forecast import PHASES, _phase_bounds, fit_phase_models
+
+def _simulated_trends(n: int = 400, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    levels = rng.choice([2, 3, 5], size=n)
+    lengths = rng.integers(20, 121, size=n)
+    start_weekdays = rng.integers(0, 7, size=n)
+    curves = simulate_trend_curves(levels, lengths, rng.choice(["dance", "challenge", "lifestyle"], size=n),
+                                   start_weekdays, rng)
+    return levels, lengths, start_weekdays, curves
+
+def _true_phases(levels: np.ndarray, lengths: np.ndarray, observed: int) -> list:
+    """Phase of each simulated trend on its last observed day, from its real length and profile"""
+    fractions = np.array([PHASE_PROFILES[_virality_profile(int(level))][0] for level in levels])
+    growth_start, growth_end, peak_end, decline_days = _phase_bounds(fractions, lengths)
+    last = observed - 1
+    index = np.select([last < growth_start, last < growth_end, last < peak_end, last < peak_end + decline_days / 2],
+                      [0, 1, 2, 3], 4)[:, 0]
+    return [PHASES[i] for i in index]
+
+@pytest.mark.parametrize("observed, accuracy", [(5, 0.75), (12, 0.7), (25, 0.8), (60, 0.9)])
+def test_phase_accuracy_from_early_observations(observed, accuracy):
+    levels, lengths, start_weekdays, curves = _simulated_trends()
+    rows = lengths >= observed
+    fit = fit_phase_models(curves[rows, :observed], None, start_weekdays[rows])
+    truth = _true_phases(levels[rows], lengths[rows], observed)
+    assert np.mean([phase == true for phase, true in zip(fit.phases(), truth)]) >= accuracy
+
+def test_blocked_fit_matches_rows_fit_alone():
+    # Rows are fit in blocks of similar observed days; each must get the fit it gets alone.
+    # Equally good candidates can swap on rounding, so the error and phase are compared
+    _, lengths, start_weekdays, curves = _simulated_trends(60, seed=1)
+    observed_days = np.minimum(lengths, np.random.default_rng(1).integers(3, 121, size=len(lengths)))
+    fit = fit_phase_models(curves, observed_days, start_weekdays)
+    phases = fit.phases()
+    for i in range(0, len(lengths), 3):
+        alone = fit_phase_models(curves[i:i + 1], observed_days[i:i + 1], start_weekdays[i:i + 1])
+        assert np.isclose(alone.sse[0], fit.sse[i])
+        assert alone.phases() == [phases[i]]
@@ -0,0 +1,96 @@
+"""Single command-line entry point for the trend data tools.
+
+Each tool is a subcommand; everything after its name goes to that tool:
+    
+    python3 trend_cli.py parse perplexity_research.txt openai_research.txt
+    python3 trend_cli.py generate --seed 42 --days 90
+    python3 trend_cli.py batch catalog.jsonl --out-dir batch_output --workers 8
+    python3 trend_cli.py regions top BR --dir batch_output
+    python3 trend_cli.py forecast batch_output --horizon 14
+    python3 trend_cli.py bench --startup-only
+
+Orchestration scripts run these thousands of times, so this module imports
+nothing heavy: each subcommand imports its module only when it runs, and
+`parse` and `regions` never load NumPy at all.
+"""
+import argparse
+import json
+import sys
+from typing import Callable, Dict, List, Optional
+
+# Wall-clock budget for a cold start of the light subcommands (parse, regions, --help)
+STARTUP_BUDGET_MS = 150
+
+def _generate(argv: List[str]):
+    import mock_data
+    
+    mock_data.main(argv)
+
+def _batch(argv: List[str]):
+    if not argv or argv[0].startswith("-"):
+        sys.exit("usage: trend_cli.py batch MANIFEST [options of mock_data.py --batch]")
+    import mock_data
+    
+    mock_data.main(["--batch", *argv])
+
+def _regions(argv: List[str]):
+    import check_regions
+    
+    check_regions.main(argv)
+
+def _forecast(argv: List[str]):
+    import trend_forecast
+    
+    trend_forecast.main(argv)
+
+def _bench(argv: List[str]):
+    import bench_mock_data
+    
+    bench_mock_data.main(argv)
+
+# Subcommands that hand their arguments to an existing tool's own parser
+_TOOLS: Dict[str, Callable[[List[str]], None]] = {
+    "generate": _generate,
+    "batch": _batch,
+    "regions": _regions,
+    "forecast": _forecast,
+    "bench": _bench,
+}
+
+def parse_command(files: List[str], weights: Optional[List[float]] = None, indent: Optional[int] = 2) -> int:
+    """Print the merged parse of research files as JSON; 1 if none of them could be parsed"""
+    from research_parser import merge_research_sources, parse_input_file
+    
+    parsed = [parse_input_file(path) for path in files]
+    print(json.dumps(merge_research_sources(parsed, weights), indent=indent))
+    return 0 if any(parsed) else 1
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in _TOOLS:
+        _TOOLS[argv[0]](argv[1:])
+        return 0
+    
+    parser = argparse.ArgumentParser(description="Trend data tools: parse, generate, batch, regions, forecast, bench")
+    subparsers = parser.add_subparsers(dest="command", required=True, metavar="COMMAND")
+    
+    parse = subparsers.add_parser("parse", help="print the merged parse of research files as JSON")
+    parse.add_argument("files", nargs="+", help="research text files")
+    parse.add_argument("--weights", type=lambda value: [float(w) for w in value.split(',')], metavar="W1,W2,...",
+                       help="per-file weights for merged demographics")
+    parse.add_argument("--compact", action="store_true", help="single-line JSON")
+    # Listed for --help; main() dispatches these before parsing
+    subparsers.add_parser("generate", help="generate one dataset (mock_data.py options)", add_help=False)
+    subparsers.add_parser("batch", help="generate a catalog from a manifest (mock_data.py --batch)", add_help=False)
+    subparsers.add_parser("regions", help="regional distribution checks (check_regions.py)", add_help=False)
+    subparsers.add_parser("forecast", help="fit and forecast trend curves (trend_forecast.py)", add_help=False)
+    subparsers.add_parser("bench", help="pipeline and startup benchmarks (bench_mock_data.py)", add_help=False)
+    args = parser.parse_args(argv)
+    
+    try:
+        return parse_command(args.files, args.weights, None if args.compact else 2)
+    except ValueError as e:
+        parser.error(str(e))
+
+if __name__ == "__main__":
+    sys.exit(main())
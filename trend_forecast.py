@@ -0,0 +1,282 @@
+"""Phase-model fitting and short-horizon forecasts for observed trend curves.
+
+Fits the discovery/growth/peak/decline model that simulate_trend_curves draws
+from to daily counts. For a fixed phase profile, decline shape and trend
+length L the model is linear in its two scale parameters (discovery base and
+peak value), so every candidate on the profile x decline x L grid is a 2x2
+least-squares solve. Those solves run for the whole catalog at once:
+    
+    python3 trend_forecast.py trend_analysis_output.json
+    python3 trend_forecast.py batch_output --horizon 14 --out trend_forecast.json
+
+Phase and momentum come from where the last observed day falls on the best
+fitting curve, rather than from how many days the trend has been active.
+"""
+import argparse
+import json
+import os
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from mock_data import MAX_WINDOW_DAYS, PHASE_PROFILES, SHARD_INDEX, SHARD_MANIFEST, read_dataset_trends
+
+PROFILES = list(PHASE_PROFILES)
+# Decline shapes of simulate_trend_curves: dance trends fade slowly, challenges drop off quickly
+DECLINES = ["dance", "challenge", "steady"]
+PHASES = ["Discovery", "Growth", "Peak", "Decline", "Fade-out"]
+# Momentum labels the dashboard shows for each phase
+PHASE_MOMENTUM = {"Discovery": "New", "Growth": "Rising", "Peak": "Recommended",
+                  "Decline": "Dying", "Fade-out": "Dying"}
+# Mean of the simulated weekday multipliers (Mon..Sun): Fridays +5-10%, weekends +10-20%, weekdays ±5%
+WEEKDAY_FACTORS = np.array([1.0, 1.0, 1.0, 1.0, 1.075, 1.15, 1.15])
+# Cells (rows x candidates) per fitting block; each of the block's dozen float64
+# working arrays stays near 8 MB whatever the window length
+_CHUNK_CELLS = 1 << 20
+# Ratio between consecutive candidate lengths past twice the window; see _default_lengths()
+_TAIL_STEP = 1.05
+
+def _peak_multipliers() -> Tuple[np.ndarray, np.ndarray]:
+    """Lowest and highest peak/discovery-base ratio simulate_trend_curves draws, per profile"""
+    low, high = np.array([PHASE_PROFILES[name][2] for name in PROFILES], dtype=float).T
+    return low, high
+
+def _default_lengths(width: int) -> np.ndarray:
+    """Every trend length from 4 days to twice width, then 5% steps up to the longest generated trend.
+    
+    The long tail lets a row whose first days are all discovery be fit as the
+    start of a long trend; past the observed days only the discovery length
+    matters, so coarse steps lose nothing.
+    """
+    dense = np.arange(4, 2 * width + 1)
+    steps = np.arange(1, int(np.log(MAX_WINDOW_DAYS / 2) / np.log(_TAIL_STEP)) + 1)
+    tail = np.unique(np.rint(2 * width * _TAIL_STEP ** steps).astype(np.int64))
+    return np.concatenate([dense, tail[(tail > 2 * width) & (tail <= MAX_WINDOW_DAYS)]])
+
+def _phase_bounds(fractions: np.ndarray, lengths: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Discovery end, growth end, peak end and decline length, as column vectors"""
+    phases = (lengths[:, None] * fractions).astype(np.int64)
+    discovery, growth, peak, decline = (phases[:, k:k + 1] for k in range(4))
+    return discovery, discovery + growth, discovery + growth + peak, decline
+
+def phase_basis(fractions: np.ndarray, declines: np.ndarray, lengths: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """Model curve per unit discovery base and per unit peak value, shape (rows, days, 2).
+    
+    Row k uses phase fractions fractions[k], decline shape index declines[k] and
+    length lengths[k]; t is the day index, (days,) or (rows, days). A curve with
+    base b and peak p is basis @ [b, p], matching simulate_trend_curves without
+    its weekday multipliers and noise.
+    """
+    growth_start, growth_end, peak_end, decline_days = _phase_bounds(fractions, lengths)
+    t = np.broadcast_to(np.asarray(t, dtype=float), (len(lengths), np.shape(t)[-1]))
+    
+    discovery = 0.5 + 0.5 * (t / np.maximum(growth_start, 1))
+    growth = ((t - growth_start) / np.maximum(growth_end - growth_start, 1)) ** 2
+    peak = 1 - 0.2 * (t - growth_end) / np.maximum(peak_end - growth_end, 1)
+    progress = np.clip((t - peak_end) / np.maximum(decline_days, 1), 0, None)
+    kind = declines[:, None]
+    decline = 0.8 * np.where(kind == 0, 1 - 0.7 * progress,
+                             np.where(kind == 1, 1 - 0.85 * progress ** 0.5, 1 - 0.8 * progress))
+    
+    conditions = [t < growth_start, t < growth_end, t < peak_end]
+    basis = np.empty(t.shape + (2,))
+    basis[..., 0] = np.select(conditions, [discovery, 1 - growth, 0.0], 0.0)
+    basis[..., 1] = np.select(conditions, [0.0, growth, peak], decline)
+    basis[t >= lengths[:, None]] = 0.0
+    return basis
+
+class PhaseFit:
+    """Best-fitting phase model of each row of a count matrix"""
+    
+    def __init__(self, profile: np.ndarray, decline: np.ndarray, length: np.ndarray, params: np.ndarray,
+                 sse: np.ndarray, total_ss: np.ndarray, observed_days: np.ndarray, start_weekdays: np.ndarray):
+        self.profile = profile
+        self.decline = decline
+        self.length = length
+        self.params = params  # (rows, 2): discovery base, peak value
+        self.sse = sse
+        self.r2 = np.where(total_ss > 0, 1 - sse / np.maximum(total_ss, 1e-12), 0.0)
+        self.observed_days = observed_days
+        self.start_weekdays = start_weekdays
+    
+    def __len__(self) -> int:
+        return len(self.length)
+    
+    def _fractions(self) -> np.ndarray:
+        return np.array([PHASE_PROFILES[name][0] for name in PROFILES], dtype=float)[self.profile]
+    
+    def phases(self) -> List[str]:
+        """Phase of each trend on its last observed day"""
+        growth_start, growth_end, peak_end, decline_days = _phase_bounds(self._fractions(), self.length)
+        last = (self.observed_days - 1)[:, None]
+        late_decline = last >= peak_end + decline_days / 2
+        index = np.select([last < growth_start, last < growth_end, last < peak_end, ~late_decline],
+                          [0, 1, 2, 3], 4)[:, 0]
+        return [PHASES[i] for i in index]
+    
+    def momentum(self) -> List[str]:
+        return [PHASE_MOMENTUM[phase] for phase in self.phases()]
+    
+    def forecast(self, horizon: int = 7) -> np.ndarray:
+        """Expected daily counts for the horizon days after each trend's last observed day"""
+        t = self.observed_days[:, None] + np.arange(horizon)
+        basis = phase_basis(self._fractions(), self.decline, self.length, t)
+        weekdays = (self.start_weekdays[:, None] + t) % 7
+        values = np.einsum('ntk,nk->nt', basis, self.params) * WEEKDAY_FACTORS[weekdays]
+        return np.rint(np.maximum(values, 0)).astype(np.int64)
+
+def fit_phase_models(counts: np.ndarray, observed_days: Optional[np.ndarray] = None,
+                     start_weekdays: Optional[np.ndarray] = None,
+                     lengths: Optional[Sequence[int]] = None) -> PhaseFit:
+    """Fit every row of counts (trends x days since each trend started) in one batch.
+    
+    observed_days gives each row's number of observed days (default: all
+    columns); cells past it are ignored. start_weekdays (Monday=0) removes the
+    weekday pattern before fitting. Trend lengths are searched over `lengths`,
+    default _default_lengths(width); lengths shorter than a row's observations
+    are skipped for that row.
+    
+    Peaks are held to the profile's range of peak/base ratios, and a row seen
+    only during a candidate's discovery phase gets the middle of that range, so
+    a few early days aren't read as a short trend that already peaked.
+    """
+    counts = np.asarray(counts, dtype=float)
+    rows, width = counts.shape
+    observed_days = np.full(rows, width) if observed_days is None else np.asarray(observed_days, dtype=np.int64)
+    start_weekdays = np.zeros(rows, dtype=np.int64) if start_weekdays is None \
+        else np.asarray(start_weekdays, dtype=np.int64)
+    lengths = _default_lengths(width) if lengths is None else np.sort(np.asarray(lengths, dtype=np.int64))
+    
+    # Candidate grid: length x profile x decline, shortest lengths first
+    length, profile, decline = (axis.ravel() for axis in np.meshgrid(
+        lengths, np.arange(len(PROFILES)), np.arange(len(DECLINES)), indexing='ij'))
+    fractions = np.array([PHASE_PROFILES[name][0] for name in PROFILES], dtype=float)[profile]
+    low, high = (bound[profile] for bound in _peak_multipliers())
+    basis = phase_basis(fractions, decline, length, np.arange(width))  # (candidates, days, 2)
+    
+    # Deseasonalised observations, zero past each row's observed days
+    observed = np.arange(width)[None, :] < observed_days[:, None]
+    y = np.where(observed, counts / WEEKDAY_FACTORS[(start_weekdays[:, None] + np.arange(width)) % 7], 0.0)
+    
+    # Normal-equation terms over each row's observed prefix, from running sums per candidate,
+    # laid out (term, days + 1, candidates) so each block gathers contiguous rows
+    gram = np.zeros((3, width + 1, len(length)))
+    gram[:, 1:] = np.cumsum(np.stack([basis[..., 0] ** 2, basis[..., 0] * basis[..., 1], basis[..., 1] ** 2]),
+                            axis=2).transpose(0, 2, 1)
+    basis0, basis1 = np.ascontiguousarray(basis[..., 0].T), np.ascontiguousarray(basis[..., 1].T)  # (days, candidates)
+    
+    best = np.zeros(rows, dtype=np.int64)
+    params = np.zeros((rows, 2))
+    sse = np.zeros(rows)
+    chunk_rows = max(1, _CHUNK_CELLS // len(length))
+    # Blocks of rows with similar observed days, each fit only against the candidates
+    # at least as long as all its rows' observations
+    order = np.argsort(observed_days, kind='stable')
+    for start in range(0, rows, chunk_rows):
+        block = order[start:start + chunk_rows]
+        first = int(np.searchsorted(length, observed_days[block].min()))
+        s00, s01, s11 = (term[:, first:] for term in gram[:, observed_days[block]])  # each (block, candidates)
+        r0, r1 = y[block] @ basis0[:, first:], y[block] @ basis1[:, first:]
+        det = s00 * s11 - s01 ** 2
+        # Observations that only cover discovery say nothing about the peak (a
+        # singular system); those fit the base alone
+        solvable = np.abs(det) > 1e-9
+        discovery_only = ~solvable & (s00 > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            base = np.clip(np.where(solvable, (s11 * r0 - s01 * r1) / det, r0 / s00), 0, None)
+            peak = np.where(solvable, (s00 * r1 - s01 * r0) / det, base * ((low + high) / 2)[first:])
+        peak = np.clip(peak, base * low[first:], base * high[first:])
+        yy = (y[block] ** 2).sum(axis=1)[:, None]
+        error = yy - 2 * (base * r0 + peak * r1) + base ** 2 * s00 + 2 * base * peak * s01 + peak ** 2 * s11
+        # Empty systems and lengths the trend has already outlived can't explain the data
+        error[~(solvable | discovery_only) | (length[None, first:] < observed_days[block, None])] = np.inf
+        
+        choice = np.argmin(error, axis=1)
+        picked = np.arange(len(choice))
+        best[block] = first + choice
+        params[block] = np.stack([base[picked, choice], peak[picked, choice]], axis=1)
+        sse[block] = error[picked, choice]
+    
+    mean = y.sum(axis=1) / np.maximum(observed_days, 1)
+    total_ss = ((y - mean[:, None]) ** 2 * observed).sum(axis=1)
+    return PhaseFit(profile[best], decline[best], length[best], params, sse, total_ss, observed_days, start_weekdays)
+
+def _dataset_files(directory: str) -> List[str]:
+    """Datasets in a batch output directory: top-level JSON/NDJSON files and shard manifests"""
+    files = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isdir(path):
+            if os.path.exists(os.path.join(path, SHARD_MANIFEST)):
+                files.append(os.path.join(path, SHARD_MANIFEST))
+        elif name.endswith(('.json', '.ndjson')) and name != SHARD_INDEX:
+            files.append(path)
+    return files
+
+def _trend_series(paths: List[str]) -> Iterator[Tuple[str, str, List[str], List[int]]]:
+    """(source, trend name, dates, counts) of every trend in the given datasets or directories"""
+    for path in paths:
+        for source in _dataset_files(path) if os.path.isdir(path) else [path]:
+            try:
+                for trend in read_dataset_trends(source):
+                    records = trend.get("count_by_date") or []
+                    yield source, trend.get("name", ""), [r["date"] for r in records], [r["value"] for r in records]
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"Warning: skipping {source}: {e}")
+
+def forecast_datasets(paths: List[str], horizon: int = 7) -> List[Dict]:
+    """Fit and forecast every trend found in paths; one result dict per trend"""
+    series = [entry for entry in _trend_series(paths) if entry[3]]
+    if not series:
+        return []
+    width = max(len(counts) for _, _, _, counts in series)
+    counts = np.zeros((len(series), width))
+    for row, (_, _, _, values) in enumerate(series):
+        counts[row, :len(values)] = values
+    observed_days = np.array([len(values) for _, _, _, values in series])
+    start_dates = [date.fromisoformat(dates[0]) for _, _, dates, _ in series]
+    fit = fit_phase_models(counts, observed_days, np.array([d.weekday() for d in start_dates]))
+    
+    forecast = fit.forecast(horizon).tolist()
+    results = []
+    for row, ((source, name, dates, _), phase, momentum) in enumerate(zip(series, fit.phases(), fit.momentum())):
+        first = date.fromisoformat(dates[-1]) + timedelta(days=1)
+        results.append({
+            "source": source,
+            "trend": name,
+            "phase": phase,
+            "momentum_status": momentum,
+            "fit": {
+                "profile": PROFILES[fit.profile[row]],
+                "decline": DECLINES[fit.decline[row]],
+                "length_days": int(fit.length[row]),
+                "discovery_base": round(float(fit.params[row, 0]), 2),
+                "peak_value": round(float(fit.params[row, 1]), 2),
+                "r2": round(float(fit.r2[row]), 4)
+            },
+            "forecast": [{"date": (first + timedelta(days=d)).isoformat(), "value": value}
+                         for d, value in enumerate(forecast[row])]
+        })
+    return results
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Fit phase models to trend curves and forecast them")
+    parser.add_argument("paths", nargs="*", default=["trend_analysis_output.json"],
+                        help="datasets (JSON, NDJSON, shard manifests) or directories of them")
+    parser.add_argument("--horizon", type=int, default=7, help="days to forecast past the last observation")
+    parser.add_argument("--out", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+    
+    results = forecast_datasets(args.paths, args.horizon)
+    for result in results:
+        upcoming = sum(day["value"] for day in result["forecast"])
+        print(f"{result['momentum_status']:<12} {result['phase']:<10} r2={result['fit']['r2']:.2f}  "
+              f"next {args.horizon}d: {upcoming:>6}  {result['trend']}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Saved {len(results)} forecasts to: {args.out}")
+
+if __name__ == "__main__":
+    main()